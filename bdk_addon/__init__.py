@@ -15,6 +15,7 @@ if 'bpy' in locals():
     importlib.reload(repository_ui)
 
     importlib.reload(package_reader)
+    importlib.reload(package_index)
 
     importlib.reload(bdk_data)
     importlib.reload(bdk_helpers)
@@ -25,7 +26,10 @@ if 'bpy' in locals():
 
     importlib.reload(material_data)
     importlib.reload(material_reader)
+    importlib.reload(material_image_pool)
     importlib.reload(material_importer)
+    importlib.reload(material_metadata)
+    importlib.reload(material_warmup)
     importlib.reload(material_operators)
     importlib.reload(material_ui)
 
@@ -107,11 +111,15 @@ else:
 
     # Package
     from .package import reader as package_reader
+    from .package import index as package_index
 
     # Material
     from .material import data as material_data
     from .material import reader as material_reader
+    from .material import image_pool as material_image_pool
     from .material import importer as material_importer
+    from .material import metadata as material_metadata
+    from .material import warmup as material_warmup
     from .material import operators as material_operators
     from .material import ui as material_ui
 
@@ -295,10 +303,16 @@ def register():
         addon_keymaps.append((keymap, keymap.keymap_items.new(bsp_operators.BDK_OT_bsp_build.bl_idname, 'B', 'PRESS', ctrl=True, shift=True)))
         addon_keymaps.append((keymap, keymap.keymap_items.new(bdk_operators.BDK_OT_toggle_level_visibility.bl_idname, 'L', 'PRESS', alt=True, shift=True)))
 
+    package_index.register_handlers()
+    material_image_pool.register_handlers()
+
     clear_preferences_runtime_data()
 
 
 def unregister():
+    package_index.unregister_handlers()
+    material_image_pool.unregister_handlers()
+
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
 
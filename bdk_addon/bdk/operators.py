@@ -1,12 +1,13 @@
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict
 from pathlib import Path
-from typing import Set, cast
+from typing import Set, cast, Dict, List
 
 import bpy
 from bpy.types import Operator, Context, Node, Event, Armature, Mesh
 from bpy.props import StringProperty
 
 from ..helpers import get_addon_preferences, tag_redraw_all_windows
+from ..package.index import get_package_reference_index
 
 
 # TODO: figure out a better name for this operator
@@ -384,19 +385,30 @@ class BDK_OT_asset_import_data_linked(Operator):
         linked_count = 0
         skipped_count = 0
 
+        # Group the assets by library so that each library is only opened once.
+        library_material_names: Dict[str, List[str]] = defaultdict(list)
+
         for asset in assets:
             if asset.local_id is not None:
                 # Asset is local to this file.
                 skipped_count += 1
                 continue
 
-            with bpy.data.libraries.load(asset.full_library_path, link=True) as (data_from, data_to):
-                match asset.id_type:
-                    case 'MATERIAL':
-                        data_to.materials = [asset.name]
+            match asset.id_type:
+                case 'MATERIAL':
+                    library_material_names[asset.full_library_path].append(asset.name)
 
             linked_count += 1
 
+        package_reference_index = get_package_reference_index()
+        for library_path, material_names in library_material_names.items():
+            with bpy.data.libraries.load(library_path, link=True) as (data_from, data_to):
+                data_to.materials = material_names
+            # Add the linked materials to the index so that loading them by reference doesn't open the library again.
+            for material in data_to.materials:
+                if material is not None:
+                    package_reference_index.add_material(material)
+
         self.report({'INFO'}, f'Linked {linked_count} | Skipped {skipped_count}')
 
         return {'FINISHED'}
@@ -22,6 +22,10 @@ class BdkAddonPreferences(AddonPreferences):
     repositories_index: IntProperty()
     default_repository_id: StringProperty(name='Default Repository ID', options={'HIDDEN'})
 
+    material_cache_max_entries: IntProperty(name='Material Cache Size', default=4096, min=0,
+                                            description='The maximum number of materials to keep in memory per '
+                                                        'repository when importing materials (0 for unlimited)')
+
     developer_extras: BoolProperty(name='Developer Extras', default=False,
                                    description='Enable developer extras such as debug panels and operators')
 
@@ -114,6 +118,17 @@ class BdkAddonPreferences(AddonPreferences):
                         op = col.operator(BDK_OT_repository_rule_move.bl_idname, icon='TRIA_DOWN', text='')
                         op.direction = 'DOWN'
 
+                    textures_header, textures_panel = repositories_panel.panel('Textures', default_closed=True)
+                    textures_header.label(text='Textures')
+
+                    if textures_panel is not None:
+                        col = textures_panel.column()
+                        col.use_property_split = True
+                        col.prop(repository, 'use_texture_proxies')
+                        row = col.row()
+                        row.enabled = repository.use_texture_proxies
+                        row.prop(repository, 'texture_proxy_size')
+
                 paths_header, paths_panel = repositories_panel.panel('Paths', default_closed=True)
                 paths_header.label(text='Paths')
 
@@ -127,6 +142,7 @@ class BdkAddonPreferences(AddonPreferences):
                         col.prop(repository, 'mod', emboss=False)
                     col.prop(repository, 'cache_directory')
 
+        layout.prop(self, 'material_cache_max_entries')
         layout.prop(self, 'developer_extras')
 
 
@@ -5,6 +5,7 @@ from datetime import datetime
 import bpy
 import os.path
 import subprocess
+import sys
 from collections import defaultdict
 from configparser import NoOptionError
 from glob import glob
@@ -19,6 +20,8 @@ from typing import Optional, List, Dict
 from ...data import UReference
 from ...helpers import get_addon_preferences
 from ...io.config import ConfigParserMultiOpt
+from ...io.props_cache import close_props_cache, get_props_cache_path
+from ...io.props_index import get_props_index_path
 import json
 
 
@@ -163,6 +166,67 @@ class Manifest:
             json.dump(data, f, indent=2)
 
 
+class PackageAssetManifest:
+    """
+    A listing of the data-blocks contained in a package's asset library file, along with their package references.
+
+    This is written alongside the .blend file when the package is built so that we can determine whether an asset
+    exists in a library without having to open it with Blender's library loader.
+    """
+
+    def __init__(self):
+        # Map of data type (e.g., 'materials') to a map of data-block names to package references.
+        self.data: Dict[str, Dict[str, str]] = {
+            'materials': dict(),
+            'meshes': dict(),
+            'collections': dict(),
+        }
+        # Map of material names to the properties that are only known once the material has been built (see
+        # `material/metadata.py`).
+        self.material_metadata: Dict[str, dict] = dict()
+
+    def has(self, data_type: str, name: str) -> bool:
+        return name in self.data.get(data_type, {})
+
+    @staticmethod
+    def from_file(path: Path) -> 'PackageAssetManifest':
+        manifest = PackageAssetManifest()
+        with open(path) as f:
+            data = json.load(f)
+            for data_type in manifest.data.keys():
+                manifest.data[data_type].update(data.get(data_type, {}))
+            manifest.material_metadata.update(data.get('material_metadata', {}))
+        return manifest
+
+
+def get_package_asset_manifest_path(blend_path: Path) -> Path:
+    return blend_path.with_suffix('.assets.json')
+
+
+_package_asset_manifest_cache: Dict[Path, tuple[float, PackageAssetManifest]] = dict()
+
+
+def read_package_asset_manifest(blend_path: Path) -> Optional[PackageAssetManifest]:
+    """
+    Reads the asset manifest for a package library file, or returns None if the library has no (valid) manifest.
+    Manifests are cached until the manifest file is modified.
+    """
+    manifest_path = get_package_asset_manifest_path(blend_path)
+    try:
+        modified_time = os.path.getmtime(manifest_path)
+    except OSError:
+        return None
+    cached = _package_asset_manifest_cache.get(manifest_path, None)
+    if cached is not None and cached[0] == modified_time:
+        return cached[1]
+    try:
+        manifest = PackageAssetManifest.from_file(manifest_path)
+    except (OSError, ValueError):
+        return None
+    _package_asset_manifest_cache[manifest_path] = (modified_time, manifest)
+    return manifest
+
+
 def get_repository_manifest_path(repository: BDK_PG_repository) -> Path:
     return get_repository_cache_directory(repository) / 'manifest.json'
 
@@ -282,6 +346,9 @@ def repository_cache_delete(repository: BDK_PG_repository):
 
     cache_directory = get_repository_cache_directory(repository).resolve()
 
+    # Make sure the props cache database is closed before deleting it.
+    close_props_cache(get_repository_cache_directory(repository))
+
     # Because this is a destructive file system operation, we want to only delete files and directories that we
     # expect to be there. This is a safety measure to prevent accidental deletion of important files if the cache
     # directory is misconfigured (for example, if the cache directory is set to the root of the drive).
@@ -300,6 +367,15 @@ def repository_cache_delete(repository: BDK_PG_repository):
     if assets_directory.exists():
         shutil.rmtree(assets_directory)
 
+    blobs_directory = cache_directory / 'blobs'
+    if blobs_directory.exists():
+        shutil.rmtree(blobs_directory)
+
+    # Delete the props cache database (and its write-ahead log files).
+    props_cache_path = get_props_cache_path(cache_directory)
+    for suffix in ('', '-wal', '-shm'):
+        Path(str(props_cache_path) + suffix).unlink(missing_ok=True)
+
     # Delete the cache directory.
     if cache_directory.exists():
         cache_directory.rmdir()
@@ -337,13 +413,27 @@ def get_repository_metadata_file_path(repository: BDK_PG_repository) -> Path:
     return Path(repository.cache_directory) / f'{repository.id}.json'
 
 
+# Whether the repository metadata is being read. Restoring the properties from the metadata must not trigger their update
+# callbacks, which would write the metadata file while it is still being read.
+_is_reading_repository_metadata = False
+
+
+def is_reading_repository_metadata() -> bool:
+    return _is_reading_repository_metadata
+
+
 def repository_metadata_read(repository):
+    global _is_reading_repository_metadata
+
     repository_metadata_file = get_repository_metadata_file_path(repository).resolve()
     if not repository_metadata_file.exists():
         return
 
     with open(repository_metadata_file, 'r') as f:
         data = json.load(f)
+
+    _is_reading_repository_metadata = True
+    try:
         repository.game_directory = data['game_directory']
         repository.mod = data['mod']
         repository.rules.clear()
@@ -355,6 +445,14 @@ def repository_metadata_read(repository):
                 rule.type = rule_data['type']
                 rule.mute = rule_data['mute']
                 rule.asset_directory = rule_data.get('asset_directory', '')
+        repository.use_texture_proxies = data.get('use_texture_proxies', False)
+        repository.texture_proxy_size = data.get('texture_proxy_size', '512')
+    finally:
+        _is_reading_repository_metadata = False
+
+    # Apply the texture proxy settings once they have all been restored.
+    from ...material.cache import apply_repository_texture_proxy_size
+    apply_repository_texture_proxy_size(repository)
 
 
 def repository_metadata_write(repository):
@@ -374,6 +472,8 @@ def repository_metadata_write(repository):
             'game_directory': repository.game_directory,
             'mod': repository.mod,
             'rules': rules,
+            'use_texture_proxies': repository.use_texture_proxies,
+            'texture_proxy_size': repository.texture_proxy_size,
         }
         json.dump(data, f, indent=2)
 
@@ -552,6 +652,107 @@ def write_process_log_to_file(process: subprocess.CompletedProcess, log_path: Pa
             f.write('Failed to decode stderr')
 
 
+# The extensions of exported files that are stored in the content-addressed blob store.
+blob_file_extensions = {'.tga', '.pskx', '.psk'}
+
+
+def get_repository_blob_directory(repository: BDK_PG_repository) -> Path:
+    return get_repository_cache_directory(repository) / 'blobs'
+
+
+def _get_file_digest(path: Path) -> str:
+    import hashlib
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _link_file_to_blob(path: Path, blob_path: Path):
+    """
+    Atomically replaces the file at `path` with a hard link to `blob_path`.
+    """
+    temporary_path = path.with_name(path.name + '.tmp')
+    temporary_path.unlink(missing_ok=True)
+    os.link(blob_path, temporary_path)
+    os.replace(temporary_path, path)
+
+
+def repository_exports_deduplicate(repository: BDK_PG_repository, exports_directory: Path) -> int:
+    """
+    Moves the exported files (e.g., textures & static meshes) in the exports directory into the repository's
+    content-addressed blob store and replaces them with hard links to the stored blobs, so that identical exports (e.g.,
+    textures that are shared between mods) are only stored once on disk.
+
+    Files that cannot be hard linked (e.g., the blob store is on a different volume) are left in place.
+
+    :return: The number of bytes saved.
+    """
+    blob_directory = get_repository_blob_directory(repository)
+    bytes_saved = 0
+
+    for path in exports_directory.glob('**/*'):
+        if path.suffix.lower() not in blob_file_extensions or not path.is_file():
+            continue
+
+        stat = path.stat()
+
+        if stat.st_nlink > 1:
+            # This file is already linked to a blob.
+            continue
+
+        digest = _get_file_digest(path)
+        blob_path = blob_directory / digest[:2] / f'{digest}{path.suffix.lower()}'
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+
+        try:
+            try:
+                # Store the file as the blob.
+                os.link(path, blob_path)
+            except FileExistsError:
+                # An identical file has already been stored, link to that instead.
+                _link_file_to_blob(path, blob_path)
+                bytes_saved += stat.st_size
+        except OSError as e:
+            print(f'Failed to store {path} in blob store: {e}')
+
+    return bytes_saved
+
+
+def repository_blobs_collect_garbage(repository: BDK_PG_repository) -> int:
+    """
+    Deletes all blobs in the repository's blob store that are no longer linked to by any exported file.
+
+    :return: The number of blobs deleted.
+    """
+    blob_directory = get_repository_blob_directory(repository)
+    deleted_count = 0
+
+    if not blob_directory.exists():
+        return deleted_count
+
+    for blob_path in blob_directory.glob('*/*'):
+        try:
+            if blob_path.is_file() and blob_path.stat().st_nlink <= 1:
+                blob_path.unlink()
+                deleted_count += 1
+        except OSError as e:
+            print(f'Failed to delete blob {blob_path}: {e}')
+
+    return deleted_count
+
+
+def _unlink_blob_linked_files(directory: Path):
+    """
+    Removes the files in the directory that are linked to blobs so that re-exporting does not write through the hard
+    links and corrupt the shared blobs.
+    """
+    for path in directory.glob('**/*'):
+        if path.suffix.lower() in blob_file_extensions and path.is_file() and path.stat().st_nlink > 1:
+            path.unlink()
+
+
 def repository_package_export(repository: BDK_PG_repository, package: BDK_PG_repository_package):
     cache_directory = Path(repository.cache_directory).resolve()
     game_directory = Path(repository.game_directory).resolve()
@@ -559,6 +760,13 @@ def repository_package_export(repository: BDK_PG_repository, package: BDK_PG_rep
     package_path = game_directory / package.path
     package_build_directory = os.path.join(str(exports_directory),
                                            os.path.dirname(os.path.relpath(str(package_path), str(game_directory))))
+    package_exports_directory = Path(package_build_directory) / os.path.splitext(package.filename)[0]
+
+    if package_exports_directory.exists():
+        _unlink_blob_linked_files(package_exports_directory)
+        # The props index will be stale once the package is re-exported.
+        get_props_index_path(package_exports_directory).unlink(missing_ok=True)
+
     umodel_path = str(get_umodel_path())
     args = [umodel_path, '-export', '-nolinked', f'-out="{package_build_directory}"',
             f'-path="{repository.game_directory}"', str(package_path)]
@@ -570,8 +778,6 @@ def repository_package_export(repository: BDK_PG_repository, package: BDK_PG_rep
     # Build any cube maps that were exported.
     cubemap_file_paths = []
 
-    package_exports_directory = Path(package_build_directory) / os.path.splitext(package.filename)[0]
-
     for cubemap_file_path in Path(package_exports_directory).glob('**/Cubemap/*.props.txt'):
         cubemap_file_paths.append(cubemap_file_path)
 
@@ -579,9 +785,58 @@ def repository_package_export(repository: BDK_PG_repository, package: BDK_PG_rep
     for cubemap_file_path in cubemap_file_paths:
         process, output = build_cube_map(cubemap_file_path, package_exports_directory)
 
+    if package_exports_directory.exists():
+        # Build the texture proxies first so that they are deduplicated along with the textures.
+        repository_package_build_texture_proxies(repository, package_exports_directory)
+        repository_exports_deduplicate(repository, package_exports_directory)
+        repository_package_build_props_index(repository, package_exports_directory)
+
     return process, package
 
 
+# The maximum number of worker processes used to build the props index of a single package.
+PROPS_INDEX_MAX_WORKERS = 4
+
+
+def repository_package_build_props_index(repository: BDK_PG_repository, package_exports_directory: Path):
+    """
+    Parses all the .props.txt files of an exported package into a single index file (see `bin/props_index.py`).
+    This runs in a separate Python process so that the files can be parsed without importing Blender.
+    """
+    script_path = get_addon_path() / 'bin' / 'props_index.py'
+    # Packages are already exported in parallel, so the number of worker processes per package is kept small. The script
+    # only uses them for packages with enough files to be worth it.
+    max_workers = min(PROPS_INDEX_MAX_WORKERS, os.cpu_count() or 1)
+    args = [sys.executable, str(script_path), str(package_exports_directory), '--max_workers', str(max_workers)]
+    process = subprocess.run(args, capture_output=True)
+
+    log_path = get_repository_cache_directory(repository) / 'exports' / 'logs' / f'{package_exports_directory.name}.props_index.log'
+    write_process_log_to_file(process, log_path)
+
+    if process.returncode != 0:
+        print(f'Failed to build props index for {package_exports_directory}')
+
+    return process
+
+
+def repository_package_build_texture_proxies(repository: BDK_PG_repository, package_exports_directory: Path):
+    """
+    Writes the downscaled proxies of the textures of an exported package next to them (see `bin/texture_proxies.py`).
+    Like the props index, this runs in a separate Python process so that it does not need to import Blender.
+    """
+    script_path = get_addon_path() / 'bin' / 'texture_proxies.py'
+    args = [sys.executable, str(script_path), str(package_exports_directory)]
+    process = subprocess.run(args, capture_output=True)
+
+    log_path = get_repository_cache_directory(repository) / 'exports' / 'logs' / f'{package_exports_directory.name}.texture_proxies.log'
+    write_process_log_to_file(process, log_path)
+
+    if process.returncode != 0:
+        print(f'Failed to build texture proxies for {package_exports_directory}')
+
+    return process
+
+
 def get_repository_cache_directory(repository: BDK_PG_repository) -> Path:
     return Path(repository.cache_directory) / repository.id
 
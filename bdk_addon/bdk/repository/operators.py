@@ -16,10 +16,11 @@ from .kernel import Manifest, repository_runtime_update, ensure_repository_asset
     layered_topographical_sort, repository_package_export, is_game_directory_and_mod_valid, repository_metadata_write, \
     repository_metadata_read, repository_runtime_packages_update_rule_exclusions, get_repository_cache_directory, \
     get_repository_default_asset_library_directory, get_repository_package_asset_directory, \
-    get_repository_package_catalog_id
+    get_repository_package_catalog_id, get_package_asset_manifest_path, repository_blobs_collect_garbage
 from .properties import repository_rule_type_enum_items
-from ...catalog import AssetCatalogFile
+from ...catalog import AssetCatalog, update_catalog_file
 from ...helpers import get_addon_preferences, tag_redraw_all_windows
+from ...material.cache import invalidate_material_cache
 
 
 def poll_has_repository_selected(context):
@@ -89,6 +90,7 @@ class BDK_OT_repository_cache_delete(Operator):
         repository = addon_prefs.repositories[addon_prefs.repositories_index]
 
         repository_cache_delete(repository)
+        invalidate_material_cache(repository.id)
         repository_runtime_update(repository)
 
         return {'FINISHED'}
@@ -117,6 +119,8 @@ class BDK_OT_repository_package_build(Operator):
 
         process, _ = repository_package_build(repository, package.path)
 
+        invalidate_material_cache(repository.id)
+
         if process.returncode != 0:
             self.report({'ERROR'}, f'Failed to build package: {package.path}')
             return {'CANCELLED'}
@@ -277,13 +281,13 @@ class BDK_OT_repository_build_asset_library(Operator):
             asset_directory_packages[asset_directory].append(package)
 
         for asset_directory, packages in asset_directory_packages.items():
-            catalog_file = AssetCatalogFile(asset_directory)
+            catalogs = []
             for package in packages:
                 catalog_path = os.path.splitext(package.path)[0]
                 catalog_name = os.path.basename(catalog_path)
                 catalog_id = get_repository_package_catalog_id(repository, package.path)
-                catalog_file.add_catalog(catalog_name, catalog_path, catalog_id)
-            catalog_file.write()
+                catalogs.append(AssetCatalog(catalog_id, catalog_path, catalog_name))
+            update_catalog_file(asset_directory, catalogs)
 
         packages_that_failed_to_export = []
 
@@ -310,6 +314,10 @@ class BDK_OT_repository_build_asset_library(Operator):
                 progress += 1
                 context.window_manager.progress_update(progress)
 
+        # Materials that were read from the previous exports are now stale.
+        if len(packages_to_export) > 0:
+            invalidate_material_cache(repository.id)
+
         if failure_count > 0:
             self.report({'ERROR'},
                         f'Failed to export {failure_count} packages. Aborting build step. Check logs for more '
@@ -321,6 +329,10 @@ class BDK_OT_repository_build_asset_library(Operator):
         # We must write the manifest here because the build step will read from it when linking the assets.
         manifest.write()
 
+        # Re-exported packages may have left blobs behind that are no longer used by any export.
+        if len(packages_to_export) > 0:
+            repository_blobs_collect_garbage(repository)
+
         success_count = 0
         failure_count = 0
 
@@ -345,6 +357,8 @@ class BDK_OT_repository_build_asset_library(Operator):
 
         context.window_manager.progress_end()
 
+        invalidate_material_cache(repository.id)
+
         if failure_count > 0:
             self.report({'ERROR'}, f'Failed to build {failure_count} packages. Check logs for more information.')
             manifest.write()
@@ -654,6 +668,7 @@ class BDK_OT_repository_delete(Operator):
         repository = addon_prefs.repositories[addon_prefs.repositories_index]
 
         repository_cache_delete(repository)
+        invalidate_material_cache(repository.id)
         repository_asset_library_unlink(context, repository)
         repository_metadata_delete(repository)
         repository_remove(context, addon_prefs.repositories_index)
@@ -833,6 +848,7 @@ class BDK_OT_repository_purge_orphaned_assets(Operator):
         for orphaned_asset in repository.runtime.orphaned_assets:
             asset_file = get_repository_default_asset_library_directory(repository) / orphaned_asset.file_name
             asset_file.unlink(missing_ok=True)
+            get_package_asset_manifest_path(asset_file).unlink(missing_ok=True)
 
         repository.runtime.orphaned_assets.clear()
 
@@ -74,6 +74,24 @@ class BDK_PG_repository_runtime(PropertyGroup):
     orphaned_assets_index: IntProperty(name='Index', default=-1)
 
 
+# These must be kept in sync with `texture_proxy_sizes` in `material/cache.py`.
+repository_texture_proxy_size_enum_items = (
+    ('256', '256', 'Use the texture proxies that are at most 256 pixels in each dimension'),
+    ('512', '512', 'Use the texture proxies that are at most 512 pixels in each dimension'),
+    ('1024', '1024', 'Use the texture proxies that are at most 1024 pixels in each dimension'),
+)
+
+
+def repository_texture_proxies_update_cb(self, context):
+    from .kernel import is_reading_repository_metadata, repository_metadata_write
+    from ...material.cache import apply_repository_texture_proxy_size
+    if is_reading_repository_metadata():
+        # The settings are applied once the metadata has been read.
+        return
+    repository_metadata_write(self)
+    apply_repository_texture_proxy_size(self)
+
+
 class BDK_PG_repository(PropertyGroup):
     id: StringProperty(name='ID', options={'HIDDEN'}, description='Unique identifier')
     name: StringProperty(name='Name')
@@ -87,6 +105,14 @@ class BDK_PG_repository(PropertyGroup):
                                                 '\n\n'
                                                 'Relative paths are relative to the Game Directory',
                                     default='./.bdk/')
+    use_texture_proxies: BoolProperty(name='Use Texture Proxies', default=False,
+                                      update=repository_texture_proxies_update_cb,
+                                      description='Use downscaled proxies of the exported textures in the materials '
+                                                  'that are built in the current file (e.g., terrain paint layers) to '
+                                                  'save memory in the viewport. Disable this to switch back to the '
+                                                  'full-resolution textures for final work')
+    texture_proxy_size: EnumProperty(name='Texture Proxy Size', items=repository_texture_proxy_size_enum_items,
+                                     default='512', update=repository_texture_proxies_update_cb)
     runtime: PointerProperty(type=BDK_PG_repository_runtime, name='Runtime', options={'SKIP_SAVE'})
 
 
@@ -2,6 +2,8 @@ from bpy.types import Menu, Panel
 
 from ..bsp import operators as bsp_operators
 from ..fluid_surface import operators as fluid_surface_operators
+from ..helpers import get_active_repository
+from ..material.operators import BDK_OT_scene_materials_warm_up
 from ..projector import operators as projector_operators
 from ..projector.operators import BDK_OT_projectors_bake, BDK_OT_projectors_unbake
 from ..terrain import operators as terrain_operators
@@ -63,6 +65,12 @@ class BDK_PT_scene(Panel):
 
         layout.prop(scene.bdk, 'level_object', text='Level Object')
 
+        repository = get_active_repository(context)
+        if repository is not None:
+            layout.prop(repository, 'use_texture_proxies')
+
+        layout.operator(BDK_OT_scene_materials_warm_up.bl_idname, icon='SHADING_TEXTURE')
+
 
 class BDK_PT_bdk(Panel):
     bl_idname = 'BDK_PT_bdk'
@@ -1,3 +1,4 @@
+import json
 import sys
 import warnings
 from pathlib import Path
@@ -26,6 +27,21 @@ material_class_names = [
 ]
 
 
+def get_props_files(input_directory: Path) -> List[str]:
+    """
+    Returns the paths of the .props.txt files of the package, relative to the input directory.
+    The listing is read from the package's props index (see `props_index.py`) if it exists.
+    """
+    # This must be kept in sync with `props_index.py`.
+    props_index_path = input_directory / 'props_index.json'
+    try:
+        with open(props_index_path, 'r') as f:
+            keys = json.load(f)['objects'].keys()
+        return [f'{key}.props.txt' for key in keys]
+    except (OSError, ValueError, KeyError):
+        return glob.glob('**/*.props.txt', root_dir=input_directory)
+
+
 def build(args):
     input_directory = Path(args.input_directory).resolve()
 
@@ -40,7 +56,7 @@ def build(args):
     static_mesh_files = []
     new_ids: List[bpy.types.ID] = []
 
-    for file in glob.glob('**/*.props.txt', root_dir=args.input_directory):
+    for file in get_props_files(input_directory):
         # The class type of the object is the directory name of the parent folder.
         class_type = Path(os.path.join(args.input_directory, file)).parent.parts[-1]
 
@@ -51,13 +67,27 @@ def build(args):
         else:
             warnings.warn(f'Unhandled class type: {class_type}')
 
+    # A listing of the data-blocks in the library file, written alongside it.
+    # This allows the BDK to determine whether an asset exists in the library without opening it.
+    asset_manifest = {
+        'materials': {},
+        'meshes': {},
+        'collections': {},
+        # The properties of the materials that are only known once they are built, so that they can be looked up
+        # without linking the materials. This must be kept in sync with `material/metadata.py`.
+        'material_metadata': {},
+    }
+
     # Materials.
     for file in material_files:
         filepath = os.path.join(args.input_directory, file)
         object_name = os.path.basename(file).replace('.props.txt', '')
 
         try:
-            bpy.ops.bdk.import_material(filepath=filepath, repository_id=args.repository_id)
+            bpy.ops.bdk.import_material(filepath=filepath, repository_id=args.repository_id,
+                                        # The asset libraries are shared, so they always use the full-resolution
+                                        # textures.
+                                        should_use_texture_proxies=False)
         except Exception as e:
             print(e)
             continue
@@ -65,6 +95,13 @@ def build(args):
         new_material = bpy.data.materials[object_name]
         new_ids.append(new_material)
 
+        asset_manifest['materials'][new_material.name] = new_material.bdk.package_reference
+        asset_manifest['material_metadata'][new_material.name] = {
+            'size': [new_material.bdk.size_x, new_material.bdk.size_y],
+            'blend_method': new_material.blend_method,
+            'use_backface_culling': new_material.use_backface_culling,
+        }
+
     # TODO: add support for Unreal 1 VertMeshes
 
     # Static Meshes.
@@ -109,6 +146,9 @@ def build(args):
         # Add the collection to the new_ids list.
         new_ids.append(collection)
 
+        asset_manifest['meshes'][new_object.data.name] = package_reference
+        asset_manifest['collections'][collection.name] = package_reference
+
     # Generate previews.
     for new_id in new_ids:
         new_id.asset_mark()
@@ -128,6 +168,11 @@ def build(args):
         copy=True
     )
 
+    # Write the asset manifest.
+    asset_manifest_path = os.path.splitext(os.path.abspath(args.output_path))[0] + '.assets.json'
+    with open(asset_manifest_path, 'w') as f:
+        json.dump(asset_manifest, f, indent=2)
+
 
 if __name__ == '__main__':
     parser = ArgumentParser()
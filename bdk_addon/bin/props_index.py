@@ -0,0 +1,117 @@
+"""
+Builds the consolidated props index for an exported package.
+
+This parses all the .props.txt files in a package's export directory in a process pool and writes them to a single
+index file (see `io/props_index.py`) so that consumers can read the entire package with a single file open.
+
+This script does not depend on Blender, and is run with Blender's Python interpreter after a package is exported:
+
+    python props_index.py <package_exports_directory> [--max_workers N]
+"""
+import json
+import os
+import struct
+import sys
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, Tuple
+
+# Import the parser directly from the addon directory so that we don't import the addon package (and therefore bpy).
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from convert_props_txt_to_json import parse_props_txt_file
+
+# These must be kept in sync with `io/props_index.py`.
+PROPS_INDEX_FILENAME = 'props_index.json'
+PROPS_INDEX_FORMAT_VERSION = 1
+
+# Below this number of files, it is faster to parse the files in this process than to spin up a process pool.
+MIN_FILES_FOR_PROCESS_POOL = 64
+
+
+def read_image_size(path: str) -> Optional[Tuple[int, int]]:
+    """
+    Reads the dimensions of a TGA or PNG image from its header.
+    """
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(24)
+    except OSError:
+        return None
+    if path.endswith('.png'):
+        if len(header) < 24 or header[:8] != b'\x89PNG\r\n\x1a\n':
+            return None
+        return struct.unpack('>II', header[16:24])
+    if len(header) < 18:
+        return None
+    return struct.unpack('<HH', header[12:16])
+
+
+def parse_props_entry(path: str) -> Optional[dict]:
+    """
+    Parses a .props.txt file into an index entry, or returns None if the file could not be parsed.
+    """
+    try:
+        properties = parse_props_txt_file(path)
+    except Exception as e:
+        # A single malformed file should not prevent the rest of the package from being indexed.
+        print(f'Failed to parse {path}: {e}')
+        return None
+    entry = {'properties': properties}
+    base_path = path[:-len('.props.txt')]
+    for extension in ('.tga', '.png'):
+        image_path = base_path + extension
+        if os.path.isfile(image_path):
+            size = read_image_size(image_path)
+            if size is not None:
+                entry['size'] = list(size)
+            break
+    return entry
+
+
+def build(args):
+    input_directory = Path(args.input_directory).resolve()
+
+    keys = []
+    paths = []
+    for class_directory in os.scandir(input_directory):
+        if not class_directory.is_dir():
+            continue
+        for file in os.scandir(class_directory.path):
+            if file.name.endswith('.props.txt'):
+                keys.append(f'{class_directory.name}/{file.name[:-len(".props.txt")]}')
+                paths.append(file.path)
+
+    if len(paths) >= MIN_FILES_FOR_PROCESS_POOL and args.max_workers != 1:
+        with ProcessPoolExecutor(args.max_workers) as executor:
+            entries = list(executor.map(parse_props_entry, paths, chunksize=32))
+    else:
+        entries = [parse_props_entry(path) for path in paths]
+
+    # Files that failed to parse are left out of the index.
+    objects = {key: entry for key, entry in zip(keys, entries) if entry is not None}
+    skipped_count = len(entries) - len(objects)
+
+    index = {
+        'version': PROPS_INDEX_FORMAT_VERSION,
+        'objects': objects,
+    }
+
+    # Write to a temporary file first so that readers never see a partially written index.
+    index_path = input_directory / PROPS_INDEX_FILENAME
+    temporary_path = index_path.with_suffix('.tmp')
+    with open(temporary_path, 'w') as f:
+        json.dump(index, f, separators=(',', ':'))
+    os.replace(temporary_path, index_path)
+
+    print(f'Indexed {len(objects)} objects in {input_directory}')
+    if skipped_count > 0:
+        print(f'Skipped {skipped_count} objects that failed to parse')
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('input_directory')
+    parser.add_argument('--max_workers', type=int, required=False, default=None)
+    build(parser.parse_args())
@@ -0,0 +1,108 @@
+"""
+Builds the downscaled texture proxies for an exported package.
+
+For each exported texture that is larger than a proxy size, this writes a proxy next to it (e.g.,
+`Texture/Rock.proxy512.tga` for `Texture/Rock.tga`). The proxies are made mip-style: the texture is repeatedly halved
+with a 2x2 box filter, and each proxy is the first level whose largest dimension fits within its size. Materials can
+then bind the proxies instead of the full-resolution textures to save memory in the viewport.
+
+This script does not depend on Blender, and is run with Blender's Python interpreter after a package is exported:
+
+    python texture_proxies.py <package_exports_directory> [--sizes 256 512 1024]
+"""
+import os
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Iterable, List
+
+import numpy as np
+
+# Import the TGA module directly from the addon's `io` directory so that we don't import the addon package (and
+# therefore bpy). The directory can't be imported as a package, since its name clashes with the standard library.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'io'))
+
+from tga import read_tga, write_tga
+
+# These must be kept in sync with `material/cache.py`.
+TEXTURE_PROXY_SIZES = (256, 512, 1024)
+TEXTURE_DIRECTORY_NAME = 'Texture'
+
+
+def get_texture_proxy_path(path: Path, size: int) -> Path:
+    return path.with_name(f'{path.stem}.proxy{size}.tga')
+
+
+def is_texture_proxy_path(path: Path) -> bool:
+    return '.proxy' in path.stem
+
+
+def _write_texture_proxy(path: Path, pixels: np.ndarray):
+    # Write to a temporary file first so that readers never see a partially written file.
+    temporary_path = path.with_name(path.name + '.tmp')
+    write_tga(temporary_path, pixels)
+    os.replace(temporary_path, path)
+
+
+def downscale(pixels: np.ndarray) -> np.ndarray:
+    """
+    Halves the dimensions of the image with a 2x2 box filter. Odd dimensions are padded by repeating the last row or
+    column, and dimensions of 1 are left as they are.
+    """
+    height, width, channels = pixels.shape
+    if height > 1 and height % 2 == 1:
+        pixels = np.concatenate((pixels, pixels[-1:]), axis=0)
+    if width > 1 and width % 2 == 1:
+        pixels = np.concatenate((pixels, pixels[:, -1:]), axis=1)
+    factor_y = 2 if height > 1 else 1
+    factor_x = 2 if width > 1 else 1
+    pixels = pixels.reshape((pixels.shape[0] // factor_y, factor_y, pixels.shape[1] // factor_x, factor_x, channels))
+    # Round to the nearest value rather than truncating so that the image does not darken with each level.
+    return ((pixels.sum(axis=(1, 3), dtype=np.uint32) + (factor_y * factor_x) // 2) //
+            (factor_y * factor_x)).astype(np.uint8)
+
+
+def build_texture_proxies(path: Path, sizes: Iterable[int]) -> List[Path]:
+    """
+    Writes the proxies of the texture for each of the sizes that it is larger than, and removes any stale proxies for
+    the other sizes (e.g., if the texture was re-exported at a lower resolution).
+    """
+    sizes = sorted(sizes, reverse=True)
+    pixels = None
+    proxy_paths = []
+    for size in sizes:
+        proxy_path = get_texture_proxy_path(path, size)
+        if pixels is None:
+            pixels = read_tga(path)
+        if max(pixels.shape[:2]) <= size:
+            # The texture is small enough already.
+            proxy_path.unlink(missing_ok=True)
+            continue
+        while max(pixels.shape[:2]) > size:
+            pixels = downscale(pixels)
+        _write_texture_proxy(proxy_path, pixels)
+        proxy_paths.append(proxy_path)
+    return proxy_paths
+
+
+def main(args):
+    package_exports_directory = Path(args.package_exports_directory)
+    texture_directory = package_exports_directory / TEXTURE_DIRECTORY_NAME
+    if not texture_directory.is_dir():
+        print(f'No textures in {package_exports_directory}')
+        return
+    paths = [path for path in texture_directory.glob('*.tga') if not is_texture_proxy_path(path)]
+    proxy_count = 0
+    for path in paths:
+        try:
+            proxy_count += len(build_texture_proxies(path, args.sizes))
+        except (OSError, ValueError) as e:
+            print(f'Failed to build texture proxies for {path}: {e}')
+    print(f'Built {proxy_count} texture proxies for {len(paths)} textures in {package_exports_directory}')
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('package_exports_directory')
+    parser.add_argument('--sizes', type=int, nargs='+', required=False, default=list(TEXTURE_PROXY_SIZES))
+    main(parser.parse_args(sys.argv[1:]))
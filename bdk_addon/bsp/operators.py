@@ -5,6 +5,7 @@ from mathutils import Vector, Matrix
 from .builder import ensure_bdk_brush_uv_node_tree, create_bsp_brush_polygon, apply_level_to_brush_mapping, \
     ensure_bdk_level_visibility_modifier
 from ..helpers import should_show_bdk_developer_extras, dfs_view_layer_objects
+from ..material.metadata import get_material_metadata
 from .data import bsp_optimization_items, ORIGIN_ATTRIBUTE_NAME, TEXTURE_U_ATTRIBUTE_NAME, TEXTURE_V_ATTRIBUTE_NAME, \
     POLY_FLAGS_ATTRIBUTE_NAME, BRUSH_INDEX_ATTRIBUTE_NAME, BRUSH_POLYGON_INDEX_ATTRIBUTE_NAME, \
     MATERIAL_INDEX_ATTRIBUTE_NAME, READ_ONLY_ATTRIBUTE_NAME, bsp_surface_attributes
@@ -213,14 +214,14 @@ def _create_planar_texture_mapping_attributes(obj: Object, texture_width_fallbac
             unsupported_face_count += 1
         else:
             material = mesh_data.materials[face.material_index]
+            material_metadata = get_material_metadata(material)
             if material is None:
                 texture_width = 512
                 texture_height = 512
-            elif material.bdk.package_reference == '':
+            elif material_metadata is None:
                 unsupported_face_count += 1
             else:
-                texture_width = material.bdk.size_x
-                texture_height = material.bdk.size_y
+                texture_width, texture_height = material_metadata.size
 
         # Calculate the texture plane.
         origin, texture_u, texture_v = create_bsp_brush_polygon(
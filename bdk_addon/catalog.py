@@ -1,7 +1,10 @@
 # https://github.com/strike-digital/asset_bridge/blob/main/asset_bridge/helpers/catalog.py
 
+import os
+import stat
+import tempfile
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Iterable, Optional, Tuple
 from uuid import uuid4
 
 """A module for working with blender_assets.cats.txt files, and the asset catalogs that they contain"""
@@ -147,3 +150,84 @@ class AssetCatalogFile:
         import pprint
         pprint.pprint(self.catalogs)
         return None
+
+
+def _parse_catalog_line(line: str) -> AssetCatalog:
+    """Parse a catalog line, folding any extra : symbols in the path into ; (see AssetCatalogFile.validate_file)"""
+    parts = line.rstrip("\n").split(":")
+    if len(parts) > 3:
+        parts = [parts[0], ";".join(parts[1:-1]), parts[-1]]
+    try:
+        return AssetCatalog(*parts)
+    except Exception as e:
+        raise Exception(f"Error parsing line: {line}\n") from e
+
+
+def update_catalog_file(catalog_dir, catalogs: Iterable[AssetCatalog], remove_missing: bool = False,
+                        filename: str = "") -> Tuple[int, int]:
+    """
+    Update a catalog file so that it contains the given catalogs.
+
+    Unlike AssetCatalogFile, the file is only read once, and is only (atomically) rewritten if the catalogs have
+    actually changed.
+
+    :param catalog_dir: The directory of the catalog file.
+    :param catalogs: The catalogs that should exist in the file.
+    :param remove_missing: Whether to remove catalogs from the file that are not in the given catalogs.
+    :param filename: A custom catalog file name.
+    :return: The number of added (or changed) and removed catalogs.
+    """
+    catalog_file = Path(catalog_dir) / (filename or "blender_assets.cats.txt")
+
+    existing_catalogs: Dict[str, AssetCatalog] = {}
+    needs_rewrite = False
+
+    if catalog_file.exists():
+        with open(catalog_file, "r") as f:
+            for line in f:
+                if line.startswith(("#", "VERSION", "\n")):
+                    continue
+                catalog = _parse_catalog_line(line)
+                # Lines that needed sanitizing must be rewritten.
+                needs_rewrite |= line.rstrip("\n") != str(catalog)
+                existing_catalogs[catalog.path] = catalog
+    else:
+        needs_rewrite = True
+
+    new_catalogs = dict(existing_catalogs)
+    added_count = 0
+
+    desired_paths = set()
+    for catalog in catalogs:
+        desired_paths.add(catalog.path)
+        existing_catalog = existing_catalogs.get(catalog.path, None)
+        if existing_catalog is None or str(existing_catalog) != str(catalog):
+            new_catalogs[catalog.path] = catalog
+            added_count += 1
+
+    removed_count = 0
+    if remove_missing:
+        for path in existing_catalogs.keys() - desired_paths:
+            del new_catalogs[path]
+            removed_count += 1
+
+    if not needs_rewrite and added_count == 0 and removed_count == 0:
+        return 0, 0
+
+    out_string = CATALOG_HEADER + "".join(f"{catalog}\n" for catalog in new_catalogs.values())
+
+    # Write to a temporary file first and then swap it in so that readers never see a partially written file.
+    catalog_file.parent.mkdir(parents=True, exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=catalog_file.parent, prefix=catalog_file.name, suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "w") as f:
+            f.write(out_string)
+        # Temporary files are only readable by their owner, so keep the permissions of the file being replaced.
+        if catalog_file.exists():
+            os.chmod(temporary_path, stat.S_IMODE(os.stat(catalog_file).st_mode))
+        os.replace(temporary_path, catalog_file)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+    return added_count, removed_count
@@ -7,40 +7,31 @@ import json
 import re
 
 
-def get_line_key(line):
-    """Get key from line or return None if not found.
-    EG from 'VectorParameterValues[1] = \n' return 'VectorParameterValues[1]',
-    from 'ParameterName = Emissive Color' return 'ParameterName'
-    """
-    res = re.search(r"(?P<key>[a-zA-Z\d\[\]\s]+)=", line)
-    if not res:
-        return None
-    else:
-        return res.group("key").strip()
+_line_key_pattern = re.compile(r"(?P<key>[a-zA-Z\d\[\]\s]+)=")
+_bracket_pattern = re.compile(r"[{}]")
 
 
-def get_text_until_closing_bracket(lines, lines_starting_index):
+def find_nested_block(content, start, end):
     """
-    Get text from first opening bracket to corresponding closing bracket, return line numbers for this text block
+    Find the first bracketed block in content[start:end].
+    Returns the indices of the opening bracket, the closing bracket and the character that closed the block.
     """
-    text = ""
     bracket_detected = False
     bracket_counter = 0
-    lines_to_skip = []
-
-    for i, line in enumerate(lines):
-        for char in line:
-            if char == "{":
-                bracket_detected = True
-                bracket_counter += 1
-            if char == "}":
-                bracket_counter -= 1
-            text += char
-            if bracket_detected and bracket_counter == 0:
-                lines_to_skip.append(lines_starting_index + i)
-                return text, lines_to_skip
-        lines_to_skip.append(lines_starting_index + i)
-        text += "\n"
+    opening_index = -1
+    for match in _bracket_pattern.finditer(content, start, end):
+        if match.group() == "{":
+            if not bracket_detected:
+                opening_index = match.start()
+            bracket_detected = True
+            bracket_counter += 1
+        else:
+            bracket_counter -= 1
+        if bracket_detected and bracket_counter == 0:
+            closing_index = content.rfind("}", opening_index + 1, match.end())
+            if closing_index == -1:
+                raise ValueError("Closing bracket missing", content[start:match.end()])
+            return opening_index, closing_index, match.start()
     raise ValueError("Bracket not closed")
 
 
@@ -117,6 +108,45 @@ def parse_inline_value(string):
     return data
 
 
+def parse_props_txt_block(content, start, end):
+    """
+    Parse the lines of content[start:end] in a single pass. Nested blocks are parsed in place, without copying them.
+    """
+    data = {}
+    line_start = start
+
+    while line_start <= end:
+        line_end = content.find("\n", line_start, end)
+        if line_end == -1:
+            line_end = end
+        next_line_start = line_end + 1
+
+        match = _line_key_pattern.search(content, line_start, line_end)
+        key = match.group("key").strip() if match else None
+
+        if key:
+            equals_index = content.find("=", line_start, line_end)
+            value_raw = content[equals_index + 1:line_end].strip()
+
+            if not value_raw:
+                # Is nested structure, start from next line
+                opening_index, closing_index, stop_index = find_nested_block(content, next_line_start, end)
+                value = parse_props_txt_block(content, opening_index + 1, closing_index)
+                # Don't iterate through lines that are inside nested block
+                stop_line_end = content.find("\n", stop_index, end)
+                next_line_start = end + 1 if stop_line_end == -1 else stop_line_end + 1
+            elif "{" in value_raw:
+                # Still nested structure, but 1-line
+                value = parse_inline_value(strip_brackets_from_string_once_if_needed(value_raw))
+            else:
+                value = auto_convert(value_raw)
+            data[key] = value
+
+        line_start = next_line_start
+
+    return data
+
+
 def parse_props_txt_file_content(content):
     """
     Parse content similar to
@@ -141,39 +171,16 @@ def parse_props_txt_file_content(content):
     FlattenedTexture = None
     '''
     """
-    data = {}
-    lines = content.split("\n")
-
-    lines_to_skip = []
-    for i, line in enumerate(lines):
-        if i in lines_to_skip:
-            continue
-        key = get_line_key(line)
-        if not key:
-            continue
-        value_raw = "=".join(line.split("=")[1:]).strip()
-
-        if not value_raw:
-            # Is nested structure, start from next line
-            content, t_lines_to_skip = get_text_until_closing_bracket(lines[i + 1:], i + 1)
-            # Don't iterate through lines that are inside nested block
-            lines_to_skip += t_lines_to_skip
-
-            content = strip_brackets_from_string_once_if_needed(content)
-            value = parse_props_txt_file_content(content)
-        else:
-            if "{" in value_raw:
-                # Still nested structure, but 1-line
-                content = strip_brackets_from_string_once_if_needed(value_raw)
-                value = parse_inline_value(content)
-            else:
-                value = auto_convert(value_raw)
-        data[key] = value
-
-    return data
+    return parse_props_txt_block(content, 0, len(content))
 
 
-def parse_props_txt_file(filepath):
+def parse_props_txt_file(filepath, cache=None):
+    """
+    Parse a .props.txt file. If a cache (see io/props_cache.py) is provided, the file is only parsed if it has changed
+    since it was last cached.
+    """
+    if cache is not None:
+        return cache.parse(filepath)
     with open(filepath, "r") as f:
         content = f.read()
     return parse_props_txt_file_content(content)
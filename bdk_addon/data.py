@@ -1,10 +1,15 @@
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from pathlib import Path
+import functools
 import re
+import sys
+import weakref
 from .units import unreal_to_radians
 
 
 class UColor:
+    __slots__ = ('R', 'G', 'B', 'A')
+
     def __init__(self, r: int, g: int, b: int, a: int):
         self.R = r
         self.G = g
@@ -12,24 +17,76 @@ class UColor:
         self.A = a
 
 
+_type_qualified_reference_pattern = re.compile(r'(\w+)\'([\w\.\d\-\_ ]+)\'')
+_reference_part_pattern = re.compile(r'([\w\d\-\_ ]+)')
+
+
+def _is_word(string: str) -> bool:
+    # Equivalent to matching `\w+` in full.
+    return string.replace('_', 'a').isalnum()
+
+
+def _is_reference_part(string: str) -> bool:
+    # Equivalent to matching `[\w\d\-\_ ]+` in full.
+    return string.replace('_', 'a').replace('-', 'a').replace(' ', 'a').isalnum()
+
+
 class UReference:
+    """
+    A reference to an object in a package.
+
+    References created with `from_string` and `from_path` are interned so that identical references share a single
+    object. As such, references must be treated as immutable. The table only holds weak references, so references are
+    freed once nothing else (e.g., the material caches) uses them.
+    """
+    __slots__ = ('type_name', 'package_name', 'object_name', 'group_name', '__weakref__')
+
+    _interned: 'weakref.WeakValueDictionary[Tuple[str, str, Optional[str], Optional[str]], UReference]' = \
+        weakref.WeakValueDictionary()
+
     def __init__(self, package_name: str, object_name: str, type_name: Optional[str], group_name: Optional[str] = None):
         self.type_name = type_name
         self.package_name = package_name
         self.object_name = object_name
         self.group_name = group_name
 
+    @staticmethod
+    def intern(package_name: str, object_name: str, type_name: Optional[str], group_name: Optional[str] = None) -> 'UReference':
+        """
+        Returns the shared reference with the given names, creating it if it does not exist yet.
+        """
+        key = (package_name, object_name, type_name, group_name)
+        reference = UReference._interned.get(key, None)
+        if reference is None:
+            # Package & type names are repeated across many references, so intern the strings as well.
+            reference = UReference(sys.intern(package_name), object_name,
+                                   sys.intern(type_name) if type_name is not None else None,
+                                   group_name)
+            UReference._interned[key] = reference
+        return reference
+
     @staticmethod
     def from_string(string: str) -> Optional['UReference']:
         if string == 'None' or string == '':
             return None
+        return _parse_reference_string(string)
+
+    @staticmethod
+    def _parse_string(string: str) -> 'UReference':
+        # Fast path for the common type-qualified reference shape (e.g., Texture'MyPackage.MyName').
+        quote_index = string.find("'")
+        if quote_index > 0 and string[-1] == "'" and len(string) > quote_index + 2:
+            type_name = string[:quote_index]
+            parts = string[quote_index + 1:-1].split('.')
+            if (len(parts) >= 2 and _is_word(type_name) and
+                    all(part != '' and _is_reference_part(part) for part in parts)):
+                return UReference.intern(parts[0], parts[-1], type_name=type_name)
 
         # Test for a type-qualified reference (e.g. StaticMesh'MyPackage.MyGroup.MyName').
         type_name = None
         group_name = None
 
-        pattern = r'(\w+)\'([\w\.\d\-\_ ]+)\''
-        match = re.match(pattern, string)
+        match = _type_qualified_reference_pattern.match(string)
 
         if match is not None:
             # Type-qualified reference match succeeded.
@@ -39,12 +96,11 @@ class UReference:
             # Type-qualified reference match failed, try to parse the incoming string as an object path.
             object_path = string
 
-        reference_pattern = r'([\w\d\-\_ ]+)'
-        values = re.findall(reference_pattern, object_path)
+        values = _reference_part_pattern.findall(object_path)
         package_name = values[0]
         object_name = values[-1]
 
-        return UReference(package_name, object_name, type_name=type_name, group_name=group_name)
+        return UReference.intern(package_name, object_name, type_name=type_name, group_name=group_name)
 
     @staticmethod
     def from_path(path: Path):
@@ -52,7 +108,7 @@ class UReference:
         package_name = parts[0]
         type_name = parts[1]
         object_name = parts[2][0:parts[2].index('.')]
-        return UReference(package_name, object_name, type_name)
+        return UReference.intern(package_name, object_name, type_name)
 
     def __str__(self):
         string = f"{self.type_name}'{self.package_name}"
@@ -62,7 +118,18 @@ class UReference:
         return string
 
 
+# The number of distinct reference strings to remember the parsed reference of.
+REFERENCE_STRING_CACHE_SIZE = 65536
+
+
+@functools.lru_cache(maxsize=REFERENCE_STRING_CACHE_SIZE)
+def _parse_reference_string(string: str) -> UReference:
+    return UReference._parse_string(string)
+
+
 class URotator:
+    __slots__ = ('Pitch', 'Yaw', 'Roll')
+
     def __init__(self, pitch: int = 0, yaw: int = 0, roll: int = 0):
         self.Pitch = pitch
         self.Yaw = yaw
@@ -1,8 +1,11 @@
 from mathutils import Matrix
 
 from .data import UReference
-from bpy.types import Material, Object, Context, ByteColorAttribute, ViewLayer, LayerCollection, Collection
-from typing import Iterable, Optional, Tuple, Set, List
+from .package.index import get_package_reference_index
+from bpy.types import Material, Object, Context, ByteColorAttribute, ViewLayer, LayerCollection, Collection, ID
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterable, Optional, Tuple, Set, List, Dict
 import bpy
 import numpy
 import re
@@ -148,108 +151,173 @@ def get_active_repository(context: Context) -> Optional['BDK_PG_repository']:
     return get_repository_by_id(context, repository_id)
 
 
-def load_bdk_material(context: Context, reference: str, repository_id: Optional[str] = None) -> Optional[Material]:
+def _find_loaded_bdk_material(reference: UReference) -> Optional[Material]:
     """
-    Loads a material from a BDK repository.
-    :param context: The Blender context.
-    :param reference: The reference to the material.
-    :param repository_id: The ID of the repository to load the material from. If None, the repository ID from the scene.
+    Finds a material that is already present in the blend data (local or linked) for the given reference.
+    The group name of the reference is expected to already be stripped.
     """
-    reference = UReference.from_string(reference)
-
-    if reference is None:
-        return None
-
-    # Strip the group name (useless for materials).
-    reference.group_name = None
-
     if reference.package_name == 'myLevel':
         # The second argument is a library, which we pass as None to get the local material.
         # https://blender.stackexchange.com/questions/238342/how-to-recognize-local-and-linked-material-with-python
         material = bpy.data.materials.get((reference.object_name, None), None)
+        if material is not None and material.bdk.package_reference == str(reference):
+            return material
+        return None
+
+    # Only the package and object names are compared since the class type is not always present in the reference.
+    return get_package_reference_index().find_material(reference)
+
+
+def _find_loaded_bdk_static_mesh(reference: UReference) -> Optional[Collection]:
+    """
+    Finds a static mesh collection that is already present in the blend data for the given reference.
+    The group name of the reference is expected to already be stripped.
+    """
+    return get_package_reference_index().find_collection(reference)
+
+
+def link_bdk_package_data(context: Context, references: Iterable[str], data_type: str,
+                          repository_id: Optional[str] = None) -> Dict[str, Optional[ID]]:
+    """
+    Links the data-blocks for many references at once from a BDK repository.
+
+    The references are grouped by the library file of their package so that each library is opened only once, with all
+    the names requested from it.
+
+    :param context: The Blender context.
+    :param references: The references to link.
+    :param data_type: The type of data to link (either 'materials' or 'collections').
+    :param repository_id: The ID of the repository to load the data from. If None, the active repository is used.
+    :return: A dictionary mapping each of the requested references to its data-block, or None if it could not be found.
+    """
+    if data_type == 'materials':
+        find_loaded_function = _find_loaded_bdk_material
+        assets_only = True
+    elif data_type == 'collections':
+        find_loaded_function = _find_loaded_bdk_static_mesh
+        assets_only = False
     else:
-        # See if we already have the material linked from elsewhere.
-        material = bpy.data.materials.get(reference.object_name, None)
-        if material is not None:
-            # Make sure the material reference matches the package reference.
-            # TODO: for some reason I can't remember, the full reference is not passed in here (the class type is missing).
-            #  Which is why we only check the package name and object name.
-            material_package_reference = UReference.from_string(material.bdk.package_reference)
-            if material_package_reference.package_name == reference.package_name and material_package_reference.object_name == reference.object_name:
-                return material
-        # TODO: There is a bug here where if you linked a material with the same name as another package, depending on the
-        #  order it may try to load the "wrong" one, then it will always go and fetch the linked material instead of the
-        #  local one. Not the end of the world, but it makes things slightly slower.
-        #  A strategy here would be to traverse all the materials and check if the package reference matches, then return
-        #  that material if it does. Traversing all the materials is still faster than trying to load from a file.
-
-    if material is not None and material.bdk.package_reference == str(reference):
-        return material
+        raise ValueError(f'Unhandled data type: {data_type}')
+
+    from .bdk.repository.kernel import read_package_asset_manifest
 
     if repository_id is None:
         repository_id = get_active_repository_id(context)
 
-    blend_file = get_blend_file_for_package(context, reference.package_name, repository_id)
+    data: Dict[str, Optional[ID]] = {}
 
-    if blend_file is None:
-        print('Failed to find blend file for package reference: ' + reference.package_name)
-        return None
+    # Map of library file paths to the object names (and the references that requested them).
+    library_requests: Dict[str, Dict[str, List[str]]] = defaultdict(lambda: defaultdict(list))
+    package_blend_files: Dict[str, Optional[str]] = {}
 
-    print(f'Loading material {reference} from blend file: {blend_file}')
+    for reference_string in references:
+        if reference_string in data:
+            continue
 
-    with bpy.data.libraries.load(blend_file, link=True, relative=False, assets_only=True) as (data_in, data_out):
-        if reference.object_name in data_in.materials:
-            data_out.materials = [reference.object_name]
-        else:
-            return None
+        data[reference_string] = None
 
-    # The bug here is that NAMES are the same! You can have a material with the same name as another material, but
-    #  only if one is linked and the other is local. So we need to check if the material is local or not.
-    materials = [material for material in bpy.data.materials if material.name == reference.object_name]
+        reference = UReference.from_string(reference_string)
 
-    if len(materials) == 0:
-        return None
+        if reference is None:
+            continue
 
-    # If there are multiple materials with the same name, we need to find the one that is linked.
-    # If there are no linked materials, we just return the first one.
-    for material in materials:
-        if material.library is not None:
-            return material
+        # Strip the group name since we don't use it in the BDK library files.
+        # References are interned and shared, so make a new one rather than modifying it.
+        if reference.group_name is not None:
+            reference = UReference.intern(reference.package_name, reference.object_name, reference.type_name)
+
+        if reference.package_name == 'myLevel':
+            if data_type == 'materials':
+                data[reference_string] = find_loaded_function(reference)
+            else:
+                # Failed to find object in myLevel package. (handle reporting this error downstream)
+                data[reference_string] = bpy.data.collections.get(reference.object_name, None)
+            continue
 
-    return materials[0]
+        datablock = find_loaded_function(reference)
 
+        if datablock is not None:
+            data[reference_string] = datablock
+            continue
 
-# TODO: should actually do the object, not the mesh data
-def load_bdk_static_mesh(context: Context, reference: str, repository_id: Optional[str] = None) -> Optional[Collection]:
-    reference = UReference.from_string(reference)
+        package_key = reference.package_name.upper()
+        if package_key not in package_blend_files:
+            package_blend_files[package_key] = get_blend_file_for_package(context, reference.package_name, repository_id)
+        blend_file = package_blend_files[package_key]
 
-    if reference is None:
-        return None
+        if blend_file is None:
+            print('Failed to find blend file for package reference: ' + reference.package_name)
+            continue
 
-    if reference.package_name == 'myLevel':
-        # Failed to find object in myLevel package. (handle reporting this error downstream)
-        return bpy.data.collections.get(reference.object_name, None)
+        # Check the package's asset manifest so that we don't need to open the library to find out that the data-block
+        # doesn't exist in it.
+        asset_manifest = read_package_asset_manifest(Path(blend_file))
+        if asset_manifest is not None and not asset_manifest.has(data_type, reference.object_name):
+            print(f'Could not find {reference} in package library: {blend_file}')
+            continue
 
-    # TODO: we need to check if the collection is already linked into the scene (make sure the package reference matches as well!)
-    # This will dramatically improve the performance of this because it won't need to do any File I/O.
+        library_requests[blend_file][reference.object_name].append(reference_string)
 
-    # Strip the group name since we don't use it in the BDK library files.
-    reference.group_name = None
+    for blend_file, object_references in library_requests.items():
+        print(f'Linking {len(object_references)} {data_type} from blend file: {blend_file}')
 
-    blend_file = get_blend_file_for_package(context, reference.package_name, repository_id)
+        with bpy.data.libraries.load(blend_file, link=True, relative=False, assets_only=assets_only) as (data_in, data_out):
+            available_names = set(getattr(data_in, data_type))
+            object_names = [name for name in object_references.keys() if name in available_names]
+            setattr(data_out, data_type, object_names)
 
-    if blend_file is None:
-        return None
+        # After the library has been loaded, the names are replaced with the linked data-blocks.
+        package_reference_index = get_package_reference_index()
+        for object_name, datablock in zip(object_names, getattr(data_out, data_type)):
+            if datablock is None:
+                continue
+            # Add the linked data-block to the index so that later lookups don't have to link it again.
+            if data_type == 'materials':
+                package_reference_index.add_material(datablock)
+            else:
+                package_reference_index.add_collection(datablock)
+            for reference_string in object_references[object_name]:
+                data[reference_string] = datablock
+
+    return data
+
+
+def load_bdk_materials(context: Context, references: Iterable[str], repository_id: Optional[str] = None) -> Dict[str, Optional[Material]]:
+    """
+    Loads many materials from a BDK repository, opening each package library file only once.
+    :param context: The Blender context.
+    :param references: The references to the materials.
+    :param repository_id: The ID of the repository to load the materials from. If None, the repository ID from the scene.
+    :return: A dictionary mapping each reference to its material, or None if it could not be loaded.
+    """
+    return link_bdk_package_data(context, references, 'materials', repository_id)
 
-    with bpy.data.libraries.load(blend_file, link=True, relative=False, assets_only=False) as (data_in, data_out):
-        if reference.object_name in data_in.collections:
-            data_out.collections = [reference.object_name]
-        else:
-            return None
 
-    collection = bpy.data.collections[reference.object_name]
+def load_bdk_static_meshes(context: Context, references: Iterable[str], repository_id: Optional[str] = None) -> Dict[str, Optional[Collection]]:
+    """
+    Loads many static mesh collections from a BDK repository, opening each package library file only once.
+    :param context: The Blender context.
+    :param references: The references to the static meshes.
+    :param repository_id: The ID of the repository to load the static meshes from. If None, the repository ID from the
+    scene.
+    :return: A dictionary mapping each reference to its collection, or None if it could not be loaded.
+    """
+    return link_bdk_package_data(context, references, 'collections', repository_id)
+
 
-    return collection
+def load_bdk_material(context: Context, reference: str, repository_id: Optional[str] = None) -> Optional[Material]:
+    """
+    Loads a material from a BDK repository.
+    :param context: The Blender context.
+    :param reference: The reference to the material.
+    :param repository_id: The ID of the repository to load the material from. If None, the repository ID from the scene.
+    """
+    return load_bdk_materials(context, [reference], repository_id)[reference]
+
+
+# TODO: should actually do the object, not the mesh data
+def load_bdk_static_mesh(context: Context, reference: str, repository_id: Optional[str] = None) -> Optional[Collection]:
+    return load_bdk_static_meshes(context, [reference], repository_id)[reference]
 
 
 # https://blenderartists.org/t/duplicating-pointerproperty-propertygroup-and-collectionproperty/1419096/2
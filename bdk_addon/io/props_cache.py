@@ -0,0 +1,169 @@
+import marshal
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from ..convert_props_txt_to_json import parse_props_txt_file_content
+
+
+# Bump this whenever the parser output changes so that stale entries are not used.
+PROPS_CACHE_FORMAT_VERSION = 1
+
+# The default size cap for the parsed data stored in the cache.
+PROPS_CACHE_DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+# The number of insertions between checks of the cache size.
+_EVICTION_CHECK_INTERVAL = 256
+
+
+class PropsCache:
+    """
+    A persistent cache of parsed .props.txt files.
+
+    The parsed property dictionaries are stored in a SQLite database in a compact binary (marshal) format, keyed by the
+    file's path, size and modification time, so files are only parsed again once they have changed. When the total size
+    of the stored data exceeds the size cap, the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: Path, max_size: int = PROPS_CACHE_DEFAULT_MAX_SIZE):
+        self._path = path
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._insert_count = 0
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Package builds run in parallel processes, so allow for waiting on other writers.
+        self._connection = sqlite3.connect(str(path), timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute('''
+            CREATE TABLE IF NOT EXISTS props (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                version INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                data BLOB NOT NULL
+            )
+        ''')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS props_last_used ON props (last_used)')
+
+        self._evict_if_needed()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def get(self, file_path: str) -> Optional[dict]:
+        """
+        Returns the cached properties for the file, or None if the file is not cached or has changed since.
+        """
+        key = os.path.abspath(file_path)
+        try:
+            stat = os.stat(key)
+        except OSError:
+            return None
+        return self._get(key, stat)
+
+    def _get(self, key: str, stat: os.stat_result) -> Optional[dict]:
+        try:
+            with self._lock:
+                row = self._connection.execute(
+                    'SELECT data FROM props WHERE path = ? AND size = ? AND mtime_ns = ? AND version = ?',
+                    (key, stat.st_size, stat.st_mtime_ns, PROPS_CACHE_FORMAT_VERSION)).fetchone()
+                if row is None:
+                    return None
+                self._connection.execute('UPDATE props SET last_used = ? WHERE path = ?', (time.time(), key))
+            return marshal.loads(row[0])
+        except (sqlite3.Error, ValueError, EOFError, TypeError) as e:
+            print(f'Failed to read {key} from props cache: {e}')
+            return None
+
+    def _put(self, key: str, stat: os.stat_result, properties: dict):
+        try:
+            data = marshal.dumps(properties)
+            with self._lock:
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO props (path, size, mtime_ns, version, last_used, data) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, stat.st_size, stat.st_mtime_ns, PROPS_CACHE_FORMAT_VERSION, time.time(), data))
+                self._insert_count += 1
+                should_check_size = self._insert_count % _EVICTION_CHECK_INTERVAL == 0
+            if should_check_size:
+                self._evict_if_needed()
+        except (sqlite3.Error, ValueError) as e:
+            print(f'Failed to write {key} to props cache: {e}')
+
+    def _evict_if_needed(self):
+        """
+        Evicts the least recently used entries until the total size is below 90% of the size cap.
+        """
+        try:
+            with self._lock:
+                total_size = self._connection.execute('SELECT COALESCE(SUM(LENGTH(data)), 0) FROM props').fetchone()[0]
+                if total_size <= self._max_size:
+                    return
+                target_size = int(self._max_size * 0.9)
+                rows = self._connection.execute('SELECT path, LENGTH(data) FROM props ORDER BY last_used').fetchall()
+                paths_to_evict = []
+                for path, size in rows:
+                    if total_size <= target_size:
+                        break
+                    paths_to_evict.append((path,))
+                    total_size -= size
+                self._connection.executemany('DELETE FROM props WHERE path = ?', paths_to_evict)
+        except sqlite3.Error as e:
+            print(f'Failed to evict entries from props cache: {e}')
+
+    def parse(self, file_path: str) -> dict:
+        """
+        Returns the parsed properties of the file, parsing (and caching) the file only if it is not already cached.
+        """
+        key = os.path.abspath(file_path)
+        stat = os.stat(key)
+        properties = self._get(key, stat)
+        if properties is None:
+            with open(key, 'r') as f:
+                properties = parse_props_txt_file_content(f.read())
+            self._put(key, stat, properties)
+        return properties
+
+
+_props_caches: Dict[Path, PropsCache] = dict()
+_props_caches_lock = threading.Lock()
+
+
+def get_props_cache_path(cache_directory: Path) -> Path:
+    return cache_directory / 'props_cache.sqlite'
+
+
+def get_props_cache(cache_directory: Path) -> Optional[PropsCache]:
+    """
+    Gets the shared props cache for a repository cache directory, or None if the cache could not be opened.
+    """
+    path = get_props_cache_path(cache_directory)
+    with _props_caches_lock:
+        props_cache = _props_caches.get(path, None)
+        if props_cache is None:
+            try:
+                props_cache = PropsCache(path)
+            except (sqlite3.Error, OSError) as e:
+                print(f'Failed to open props cache {path}: {e}')
+                return None
+            _props_caches[path] = props_cache
+        return props_cache
+
+
+def close_props_cache(cache_directory: Path):
+    """
+    Closes the shared props cache for a repository cache directory (e.g., so that it can be deleted).
+    """
+    path = get_props_cache_path(cache_directory)
+    with _props_caches_lock:
+        props_cache = _props_caches.pop(path, None)
+    if props_cache is not None:
+        props_cache.close()
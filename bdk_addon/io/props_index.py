@@ -0,0 +1,80 @@
+import json
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# These must be kept in sync with `bin/props_index.py`.
+PROPS_INDEX_FILENAME = 'props_index.json'
+PROPS_INDEX_FORMAT_VERSION = 1
+
+
+class PropsIndex:
+    """
+    The parsed properties of all the objects in an exported package, written by `bin/props_index.py` after the package
+    is exported. Objects are keyed by their class and object name (e.g., `Texture/Foo`), case-insensitively.
+    """
+
+    def __init__(self):
+        # Map of upper-cased keys to the original key and the entry.
+        self._objects: Dict[str, Tuple[str, dict]] = dict()
+
+    def __len__(self):
+        return len(self._objects)
+
+    @staticmethod
+    def _get_key(type_name: str, object_name: str) -> str:
+        return f'{type_name}/{object_name}'.upper()
+
+    def find(self, type_name: str, object_name: str) -> Optional[Tuple[str, str, dict]]:
+        """
+        Returns the type name and object name (as they are cased on disk) and the properties of the object, or None if
+        the object is not in the index.
+        """
+        item = self._objects.get(self._get_key(type_name, object_name), None)
+        if item is None:
+            return None
+        key, entry = item
+        type_name, object_name = key.split('/', 1)
+        return type_name, object_name, entry['properties']
+
+    def get_image_size(self, type_name: str, object_name: str) -> Optional[Tuple[int, int]]:
+        item = self._objects.get(self._get_key(type_name, object_name), None)
+        if item is None or 'size' not in item[1]:
+            return None
+        width, height = item[1]['size']
+        return width, height
+
+    def keys(self):
+        """
+        Returns the keys (e.g., `Texture/Foo`) of all the objects in the index, as they are cased on disk.
+        """
+        return (key for key, _ in self._objects.values())
+
+    @staticmethod
+    def from_file(path: Path) -> 'PropsIndex':
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if data.get('version', None) != PROPS_INDEX_FORMAT_VERSION:
+            raise ValueError(f'Unsupported props index version: {data.get("version", None)}')
+        props_index = PropsIndex()
+        props_index._objects = {key.upper(): (key, entry) for key, entry in data['objects'].items()}
+        return props_index
+
+
+def get_props_index_path(package_exports_directory: Path) -> Path:
+    return package_exports_directory / PROPS_INDEX_FILENAME
+
+
+def read_props_index(package_exports_directory: Path) -> Optional[PropsIndex]:
+    """
+    Reads the props index for an exported package, or returns None if the package has no (valid) props index.
+    Indices are not cached here; the material cache keeps the indices of the packages it has read until it is
+    invalidated.
+    """
+    index_path = get_props_index_path(package_exports_directory)
+    if not index_path.is_file():
+        return None
+    try:
+        return PropsIndex.from_file(index_path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f'Failed to read props index {index_path}: {e}')
+        return None
@@ -0,0 +1,280 @@
+"""
+Reading & writing of TGA files directly to & from NumPy arrays.
+
+Pixels are arrays of shape (height, width, channels) of 8-bit values, with the rows in top-to-bottom order and the
+channels in the following order, depending on the pixel depth:
+
+    8-bit:  L      (grayscale)
+    16-bit: LA     (grayscale & alpha), or RGBA for true-color files (5 bits per color, 1 bit of alpha)
+    24-bit: RGB
+    32-bit: RGBA
+
+This module does not depend on Blender so that it can be used by the build scripts as well.
+"""
+from ctypes import c_uint8, c_uint16, LittleEndianStructure, sizeof
+from pathlib import Path
+from typing import List, Tuple, Union
+
+import numpy as np
+
+
+class TgaHeader(LittleEndianStructure):
+    _pack_ = 1
+    _fields_ = [
+        ('id_length', c_uint8),
+        ('color_map_type', c_uint8),
+        ('image_type', c_uint8),
+        ('color_map_origin', c_uint16),
+        ('color_map_length', c_uint16),
+        ('color_map_depth', c_uint8),
+        ('x_origin', c_uint16),
+        ('y_origin', c_uint16),
+        ('width', c_uint16),
+        ('height', c_uint16),
+        ('bits_per_pixel', c_uint8),
+        ('descriptor', c_uint8),
+    ]
+
+
+TGA_IMAGE_TYPE_TRUE_COLOR = 2
+TGA_IMAGE_TYPE_GRAYSCALE = 3
+TGA_IMAGE_TYPE_RLE_TRUE_COLOR = 10
+TGA_IMAGE_TYPE_RLE_GRAYSCALE = 11
+
+# The descriptor bits for the origin of the image.
+_TGA_DESCRIPTOR_RIGHT = 0x10
+_TGA_DESCRIPTOR_TOP = 0x20
+
+# The maximum number of pixels in a single RLE packet.
+_TGA_MAX_PACKET_LENGTH = 128
+
+
+def _decode_rle(buffer: bytes, offset: int, pixel_count: int, pixel_size: int) -> np.ndarray:
+    """
+    Decodes the RLE packets in the buffer into an array of shape (pixel_count, pixel_size).
+    """
+    # The packet headers have to be read one at a time since the position of each packet depends on the previous one,
+    # but the pixels are copied out in a single pass.
+    starts: List[int] = []
+    counts: List[int] = []
+    steps: List[int] = []
+    decoded_count = 0
+    while decoded_count < pixel_count:
+        if offset >= len(buffer):
+            raise IOError('Unexpected end of RLE data')
+        header = buffer[offset]
+        offset += 1
+        count = (header & 0x7F) + 1
+        starts.append(offset)
+        counts.append(count)
+        if header & 0x80:
+            # Run-length packet: a single pixel, repeated.
+            steps.append(0)
+            offset += pixel_size
+        else:
+            # Raw packet.
+            steps.append(pixel_size)
+            offset += count * pixel_size
+        decoded_count += count
+    if offset > len(buffer):
+        raise IOError('Unexpected end of RLE data')
+
+    counts = np.array(counts, dtype=np.int64)
+    packet_starts = np.cumsum(counts) - counts
+    # The index of each pixel within its packet.
+    indices = np.arange(decoded_count, dtype=np.int64) - np.repeat(packet_starts, counts)
+    byte_offsets = np.repeat(np.array(starts, dtype=np.int64), counts) + \
+        indices * np.repeat(np.array(steps, dtype=np.int64), counts)
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    pixels = data[byte_offsets[:pixel_count, np.newaxis] + np.arange(pixel_size)]
+    return pixels
+
+
+def _encode_rle(pixels: np.ndarray) -> bytes:
+    """
+    Encodes an array of shape (height, width, pixel_size) as RLE packets. Packets do not cross rows, as recommended by
+    the specification.
+    """
+    height, width, pixel_size = pixels.shape
+    chunks = []
+    for row in pixels:
+        # Find the runs of identical pixels in the row.
+        is_different = np.any(row[1:] != row[:-1], axis=1)
+        run_starts = np.concatenate(([0], np.flatnonzero(is_different) + 1))
+        run_lengths = np.diff(np.concatenate((run_starts, [width])))
+        raw_start = None
+        for start, length in zip(run_starts.tolist(), run_lengths.tolist()):
+            if length == 1:
+                # Single pixels are gathered into raw packets.
+                if raw_start is None:
+                    raw_start = start
+                continue
+            if raw_start is not None:
+                chunks.extend(_encode_raw_packets(row[raw_start:start]))
+                raw_start = None
+            pixel = row[start].tobytes()
+            while length > 0:
+                count = min(length, _TGA_MAX_PACKET_LENGTH)
+                chunks.append(bytes((0x80 | (count - 1),)))
+                chunks.append(pixel)
+                length -= count
+        if raw_start is not None:
+            chunks.extend(_encode_raw_packets(row[raw_start:]))
+    return b''.join(chunks)
+
+
+def _encode_raw_packets(pixels: np.ndarray) -> List[bytes]:
+    chunks = []
+    for start in range(0, len(pixels), _TGA_MAX_PACKET_LENGTH):
+        packet = pixels[start:start + _TGA_MAX_PACKET_LENGTH]
+        chunks.append(bytes((len(packet) - 1,)))
+        chunks.append(packet.tobytes())
+    return chunks
+
+
+def _unpack_rgba5551(pixels: np.ndarray) -> np.ndarray:
+    values = pixels[..., 0].astype(np.uint16) | (pixels[..., 1].astype(np.uint16) << 8)
+    rgba = np.empty(values.shape + (4,), dtype=np.uint8)
+    for channel, shift in enumerate((10, 5, 0)):
+        # Expand the 5-bit values to 8 bits by repeating the high bits in the low bits.
+        value = (values >> shift) & 0x1F
+        rgba[..., channel] = (value << 3) | (value >> 2)
+    rgba[..., 3] = np.where(values & 0x8000, 255, 0)
+    return rgba
+
+
+def read_tga_header(path: Union[str, Path]) -> TgaHeader:
+    with open(path, 'rb') as fp:
+        buffer = fp.read(sizeof(TgaHeader))
+    if len(buffer) < sizeof(TgaHeader):
+        raise IOError('Invalid file format')
+    return TgaHeader.from_buffer_copy(buffer)
+
+
+def read_tga(path: Union[str, Path]) -> np.ndarray:
+    """
+    Reads an uncompressed or RLE-compressed true-color or grayscale TGA file.
+    :param path: The path to the TGA file.
+    :return: The pixels as an array of shape (height, width, channels), with the rows in top-to-bottom order.
+    """
+    buffer = Path(path).read_bytes()
+    if len(buffer) < sizeof(TgaHeader):
+        raise IOError('Invalid file format')
+
+    header = TgaHeader.from_buffer_copy(buffer)
+    if header.color_map_type != 0:
+        raise IOError('Color-mapped TGA files are not supported')
+
+    is_grayscale = header.image_type in (TGA_IMAGE_TYPE_GRAYSCALE, TGA_IMAGE_TYPE_RLE_GRAYSCALE)
+    is_rle = header.image_type in (TGA_IMAGE_TYPE_RLE_TRUE_COLOR, TGA_IMAGE_TYPE_RLE_GRAYSCALE)
+    if header.image_type not in (TGA_IMAGE_TYPE_TRUE_COLOR, TGA_IMAGE_TYPE_GRAYSCALE, TGA_IMAGE_TYPE_RLE_TRUE_COLOR,
+                                 TGA_IMAGE_TYPE_RLE_GRAYSCALE):
+        raise IOError(f'Unsupported image type ({header.image_type})')
+
+    supported_depths = (8, 16) if is_grayscale else (16, 24, 32)
+    if header.bits_per_pixel not in supported_depths:
+        raise IOError(f'Unsupported bits-per-pixel ({header.bits_per_pixel})')
+
+    pixel_size = header.bits_per_pixel // 8
+    pixel_count = header.width * header.height
+    offset = sizeof(TgaHeader) + header.id_length
+
+    if is_rle:
+        pixels = _decode_rle(buffer, offset, pixel_count, pixel_size)
+    else:
+        data_size = pixel_count * pixel_size
+        if offset + data_size > len(buffer):
+            raise IOError(f'Incorrect data size (found {len(buffer) - offset}, expected {data_size})')
+        pixels = np.frombuffer(buffer, dtype=np.uint8, count=data_size, offset=offset)
+
+    pixels = pixels.reshape((header.height, header.width, pixel_size))
+
+    if not is_grayscale:
+        if pixel_size == 2:
+            pixels = _unpack_rgba5551(pixels)
+        else:
+            # Swap BGR(A) to RGB(A).
+            pixels = pixels[..., [2, 1, 0, 3][:pixel_size]]
+
+    if not header.descriptor & _TGA_DESCRIPTOR_TOP:
+        pixels = pixels[::-1]
+    if header.descriptor & _TGA_DESCRIPTOR_RIGHT:
+        pixels = pixels[:, ::-1]
+
+    return np.ascontiguousarray(pixels)
+
+
+def write_tga(path: Union[str, Path], pixels: np.ndarray, use_rle: bool = False, is_bottom_up: bool = False):
+    """
+    Writes a TGA file. The pixel depth is determined by the number of channels: 1 (8-bit grayscale), 2 (16-bit
+    grayscale & alpha), 3 (24-bit RGB) or 4 (32-bit RGBA).
+    :param path: The path to the TGA file.
+    :param pixels: The pixels as an array of shape (height, width, channels) or (height, width), with the rows in
+    top-to-bottom order. Floating-point values are expected to be normalized, and are quantized to 8 bits.
+    :param use_rle: Whether to compress the pixels with run-length encoding.
+    :param is_bottom_up: Whether to store the rows in bottom-to-top order (i.e., with the origin at the bottom-left), as
+    written by Blender and expected by older readers that ignore the origin bits of the descriptor (e.g., UnrealEd 2).
+    This only affects the layout of the file; the pixels are still given in top-to-bottom order.
+    """
+    if pixels.ndim == 2:
+        pixels = pixels[..., np.newaxis]
+    if pixels.ndim != 3 or pixels.shape[2] not in (1, 2, 3, 4):
+        raise ValueError(f'Unsupported pixel array shape {pixels.shape}')
+    height, width, channels = pixels.shape
+    if width > 0xFFFF or height > 0xFFFF:
+        raise ValueError(f'Image is too large ({width}x{height})')
+
+    if np.issubdtype(pixels.dtype, np.floating):
+        pixels = np.rint(np.clip(pixels, 0.0, 1.0) * 255.0)
+    pixels = pixels.astype(np.uint8, copy=False)
+
+    is_grayscale = channels <= 2
+    if not is_grayscale:
+        # Swap RGB(A) to BGR(A).
+        pixels = pixels[..., [2, 1, 0, 3][:channels]]
+
+    header = TgaHeader()
+    if is_grayscale:
+        header.image_type = TGA_IMAGE_TYPE_RLE_GRAYSCALE if use_rle else TGA_IMAGE_TYPE_GRAYSCALE
+    else:
+        header.image_type = TGA_IMAGE_TYPE_RLE_TRUE_COLOR if use_rle else TGA_IMAGE_TYPE_TRUE_COLOR
+    header.width = width
+    header.height = height
+    header.bits_per_pixel = channels * 8
+    # The lower bits hold the number of alpha bits per pixel.
+    has_alpha = channels in (2, 4)
+    header.descriptor = (0 if is_bottom_up else _TGA_DESCRIPTOR_TOP) | (8 if has_alpha else 0)
+
+    if is_bottom_up:
+        pixels = pixels[::-1]
+
+    pixels = np.ascontiguousarray(pixels)
+
+    with open(path, 'wb') as fp:
+        fp.write(bytes(header))
+        fp.write(_encode_rle(pixels) if use_rle else pixels.tobytes())
+
+
+def to_rgba(pixels: np.ndarray) -> np.ndarray:
+    """
+    Converts pixels of any of the layouts returned by `read_tga` to RGBA, the way Blender does when it loads an image:
+    grayscale values are copied to each of the color channels, and a missing alpha channel is fully opaque.
+    """
+    height, width, channels = pixels.shape
+    if channels == 4:
+        return pixels
+    rgba = np.empty((height, width, 4), dtype=np.uint8)
+    if channels <= 2:
+        rgba[..., :3] = pixels[..., :1]
+    else:
+        rgba[..., :3] = pixels
+    rgba[..., 3] = pixels[..., 1] if channels == 2 else 255
+    return rgba
+
+
+def get_tga_size(path: Union[str, Path]) -> Tuple[int, int]:
+    """
+    Returns the width & height of a TGA file, without reading the pixels.
+    """
+    header = read_tga_header(path)
+    return header.width, header.height
@@ -0,0 +1,213 @@
+from enum import IntFlag
+from typing import Callable, Dict, Optional, Tuple
+
+from .data import UMaterial, UColorModifier, UCombiner, UCubemap, UFinalBlend, UMaterialSwitch, UShader, \
+    UTexCoordSource, UTexEnvMap, UTexModifier, UTexture, UVariableTexPanner, EColorOperation, EAlphaOperation
+from ..data import UReference
+
+
+class MaterialOutput(IntFlag):
+    """
+    The outputs of a material that are consumed by whatever the material is plugged into.
+    """
+    NONE = 0
+    COLOR = 1
+    ALPHA = 2
+    ALL = COLOR | ALPHA
+
+
+LoadMaterialFunction = Callable[[Optional[UReference]], Optional[UMaterial]]
+
+
+# The outputs of the sub-materials that are consumed by each combiner color & alpha operation.
+_combiner_color_operation_outputs: Dict[EColorOperation, Tuple[Tuple[str, MaterialOutput], ...]] = {
+    EColorOperation.CO_Use_Color_From_Material1: (('Material1', MaterialOutput.COLOR),),
+    EColorOperation.CO_Use_Color_From_Material2: (('Material2', MaterialOutput.COLOR),),
+    EColorOperation.CO_Multiply: (('Material1', MaterialOutput.COLOR), ('Material2', MaterialOutput.COLOR)),
+    EColorOperation.CO_Add: (('Material1', MaterialOutput.COLOR), ('Material2', MaterialOutput.COLOR)),
+    EColorOperation.CO_Subtract: (('Material1', MaterialOutput.COLOR), ('Material2', MaterialOutput.COLOR)),
+    EColorOperation.CO_AlphaBlend_With_Mask: (('Material1', MaterialOutput.COLOR), ('Material2', MaterialOutput.COLOR),
+                                              ('Mask', MaterialOutput.ALPHA)),
+    EColorOperation.CO_Add_With_Mask_Modulation: (('Material1', MaterialOutput.ALL), ('Material2', MaterialOutput.ALL)),
+    EColorOperation.CO_Use_Color_From_Mask: (('Mask', MaterialOutput.COLOR),),
+}
+
+_combiner_alpha_operation_outputs: Dict[EAlphaOperation, Tuple[Tuple[str, MaterialOutput], ...]] = {
+    EAlphaOperation.AO_Use_Mask: (('Mask', MaterialOutput.ALPHA),),
+    EAlphaOperation.AO_Multiply: (('Material1', MaterialOutput.ALPHA), ('Material2', MaterialOutput.ALPHA)),
+    EAlphaOperation.AO_Add: (('Material1', MaterialOutput.ALPHA), ('Material2', MaterialOutput.ALPHA)),
+    EAlphaOperation.AO_Use_Alpha_From_Material1: (('Material1', MaterialOutput.ALPHA),),
+    EAlphaOperation.AO_Use_Alpha_From_Material2: (('Material2', MaterialOutput.ALPHA),),
+}
+
+_combiner_all_outputs = (('Material1', MaterialOutput.ALL), ('Material2', MaterialOutput.ALL),
+                         ('Mask', MaterialOutput.ALL))
+
+
+def get_material_switch_current_index(material_switch: UMaterialSwitch) -> Optional[int]:
+    """
+    Returns the index of the current material of a material switch, or None if it has no materials. The current value
+    wraps around the number of materials, as it did when all the materials were built into the switch.
+    """
+    if len(material_switch.Materials) == 0:
+        return None
+    return int(material_switch.Current) % len(material_switch.Materials)
+
+
+def get_consumed_outputs(material: UMaterial, outputs: MaterialOutput) -> Dict[str, MaterialOutput]:
+    """
+    Returns the outputs of each sub-material (keyed by the name of the property that references it, with the index for
+    arrays, e.g., `Materials[0]`) that are consumed when the given outputs of the material are consumed.
+
+    Sub-materials that are not in the returned dictionary are unreachable and don't need to be built.
+    """
+    consumed: Dict[str, MaterialOutput] = dict()
+
+    def consume(name: str, sub_outputs: MaterialOutput):
+        consumed[name] = consumed.get(name, MaterialOutput.NONE) | sub_outputs
+
+    if isinstance(material, UCombiner):
+        if MaterialOutput.COLOR in outputs:
+            for name, sub_outputs in _combiner_color_operation_outputs.get(material.CombineOperation,
+                                                                          _combiner_all_outputs):
+                consume(name, sub_outputs)
+        if MaterialOutput.ALPHA in outputs:
+            for name, sub_outputs in _combiner_alpha_operation_outputs.get(material.AlphaOperation,
+                                                                          _combiner_all_outputs):
+                consume(name, sub_outputs)
+    elif isinstance(material, UShader):
+        # The detail material of a shader is not currently applied, and neither is self-illumination.
+        if MaterialOutput.ALPHA in outputs and material.Opacity is not None:
+            consume('Opacity', MaterialOutput.ALPHA)
+        if MaterialOutput.COLOR in outputs:
+            consume('Diffuse', MaterialOutput.COLOR)
+            if material.Specular is not None:
+                consume('Specular', MaterialOutput.COLOR)
+                consume('SpecularityMask', MaterialOutput.COLOR)
+    elif isinstance(material, UMaterialSwitch):
+        # The current material is a constant, so the other materials can never be switched to.
+        current_index = get_material_switch_current_index(material)
+        if current_index is not None:
+            consume(f'Materials[{current_index}]', outputs)
+    elif isinstance(material, UTexture):
+        if MaterialOutput.COLOR in outputs and material.Detail is not None:
+            consume('Detail', MaterialOutput.COLOR)
+    elif isinstance(material, (UColorModifier, UFinalBlend, UTexModifier)):
+        consume('Material', outputs)
+
+    # Filter out the sub-materials whose outputs are not consumed at all (e.g., the mask of a combiner that only uses it
+    # for the alpha, when only the color is consumed).
+    return {name: sub_outputs for name, sub_outputs in consumed.items() if sub_outputs != MaterialOutput.NONE}
+
+
+def get_material_blend_method(material: Optional[UMaterial], load_material: LoadMaterialFunction) -> str:
+    """
+    Returns the blend method that building the material would result in, without building it.
+    """
+    if isinstance(material, UTexture):
+        if material.Reference is None or isinstance(material, UCubemap):
+            return 'OPAQUE'
+        if material.bMasked:
+            return 'CLIP'
+        elif material.bAlphaTexture:
+            return 'BLEND'
+        return 'OPAQUE'
+    elif isinstance(material, UShader):
+        if material.Opacity is not None:
+            return get_material_blend_method(load_material(material.Opacity), load_material)
+    elif isinstance(material, UMaterialSwitch):
+        current_index = get_material_switch_current_index(material)
+        if current_index is not None:
+            return get_material_blend_method(load_material(material.Materials[current_index]), load_material)
+    elif isinstance(material, (UColorModifier, UFinalBlend, UTexModifier)):
+        return get_material_blend_method(load_material(material.Material), load_material)
+    return 'OPAQUE'
+
+
+def get_material_size(material: Optional[UMaterial], load_material: LoadMaterialFunction) -> Optional[Tuple[int, int]]:
+    """
+    Returns the size that building the material would result in, without building it, or None if building the material
+    would not produce any outputs.
+    """
+    if material is None:
+        return None
+    if isinstance(material, UTexture) and not isinstance(material, UCubemap):
+        return (material.UClamp, material.VClamp) if material.Reference is not None else (1, 1)
+    elif isinstance(material, UCombiner):
+        # This mirrors the guess made when building combiners.
+        for reference in (material.Material1, material.Material2, material.Mask):
+            size = get_material_size(load_material(reference), load_material)
+            if size is not None:
+                return size
+    elif isinstance(material, UMaterialSwitch):
+        current_index = get_material_switch_current_index(material)
+        if current_index is not None:
+            return get_material_size(load_material(material.Materials[current_index]), load_material)
+        return None
+    elif isinstance(material, UFinalBlend):
+        return get_material_size(load_material(material.Material), load_material) or (1, 1)
+    elif isinstance(material, (UColorModifier, UTexModifier)):
+        return get_material_size(load_material(material.Material), load_material)
+    return 1, 1
+
+
+def get_material_backface_culling(material: Optional[UMaterial], load_material: LoadMaterialFunction) -> bool:
+    """
+    Returns whether building the material would result in back-face culling, without building it.
+    """
+    if isinstance(material, UTexture) and not isinstance(material, UCubemap):
+        return material.Reference is not None and not material.bTwoSided
+    elif isinstance(material, UFinalBlend):
+        return not material.TwoSided
+    elif isinstance(material, UShader):
+        return get_material_backface_culling(load_material(material.Diffuse), load_material)
+    elif isinstance(material, UMaterialSwitch):
+        current_index = get_material_switch_current_index(material)
+        if current_index is not None:
+            return get_material_backface_culling(load_material(material.Materials[current_index]), load_material)
+    elif isinstance(material, (UColorModifier, UTexModifier)):
+        return get_material_backface_culling(load_material(material.Material), load_material)
+    return False
+
+
+def is_uv_socket_consumed(material: Optional[UMaterial], load_material: LoadMaterialFunction,
+                          cache: Optional[Dict[str, bool]] = None) -> bool:
+    """
+    Returns whether building the material would make use of the UV socket that it's given (e.g., the output of a UV
+    modifier that it's plugged into). If not, the nodes that produce the UV socket are unreachable.
+    """
+    if material is None:
+        return False
+    key = str(material.Reference)
+    if cache is not None and key in cache:
+        return cache[key]
+
+    def is_consumed(reference: Optional[UReference]) -> bool:
+        return is_uv_socket_consumed(load_material(reference), load_material, cache)
+
+    if isinstance(material, UTexture):
+        # Textures (and cubemaps) sample their image with the UV socket.
+        result = material.Reference is not None
+    elif isinstance(material, (UTexCoordSource, UTexEnvMap)):
+        # These replace the UV socket with their own.
+        result = False
+    elif isinstance(material, UVariableTexPanner):
+        result = is_consumed(material.Material)
+    elif isinstance(material, UTexModifier):
+        # The other texture modifiers transform the UV source, and replace the UV socket with the result.
+        result = False
+    elif isinstance(material, (UColorModifier, UFinalBlend)):
+        result = is_consumed(material.Material)
+    elif isinstance(material, UCombiner):
+        result = any(is_consumed(reference) for reference in (material.Material1, material.Material2, material.Mask))
+    elif isinstance(material, UShader):
+        result = any(is_consumed(reference) for reference in (material.Diffuse, material.Opacity, material.Specular,
+                                                               material.SpecularityMask))
+    elif isinstance(material, UMaterialSwitch):
+        result = any(is_consumed(reference) for reference in material.Materials)
+    else:
+        result = False
+
+    if cache is not None:
+        cache[key] = result
+    return result
@@ -1,20 +1,146 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from bpy.types import Context
 
 from .data import UMaterial
-from .reader import read_material
-from ..bdk.repository.kernel import Manifest
+from .image_pool import get_image_pool, get_image_pool_key
+from .reader import read_material, read_material_from_properties
+from ..bdk.repository.kernel import Manifest, get_repository_cache_directory
+from ..bdk.repository.properties import BDK_PG_repository
+from ..io.props_cache import get_props_cache
+from ..io.props_index import PropsIndex, read_props_index
 
 import os
+import re
 
 from ..data import UReference
+from ..helpers import get_addon_preferences
+
+
+def get_material_references(material: UMaterial) -> List[UReference]:
+    """
+    Returns the references to other objects (e.g., Diffuse, Material1, Detail) held by the material.
+    """
+    references = []
+    for name in material._property_names:
+        if name == 'Reference':
+            continue
+        value = getattr(material, name, None)
+        if isinstance(value, UReference):
+            references.append(value)
+        elif isinstance(value, list):
+            references.extend(item for item in value if isinstance(item, UReference))
+    return references
+
+
+# The extensions of the exported image files, in order of preference.
+image_file_extensions = ('.tga', '.png')
+
+# The sizes of the downscaled texture proxies that are built for exported textures (see `bin/texture_proxies.py`).
+texture_proxy_sizes = (256, 512, 1024)
+
+_texture_proxy_suffix_pattern = re.compile(r'\.proxy\d+\.tga$', re.IGNORECASE)
+
+
+def get_texture_proxy_extension(size: int) -> str:
+    return f'.proxy{size}.tga'
+
+
+def get_texture_proxy_size(repository: BDK_PG_repository) -> int:
+    """
+    Returns the size of the texture proxies that materials built for the repository should use, or 0 for the
+    full-resolution textures.
+    """
+    return int(repository.texture_proxy_size) if repository.use_texture_proxies else 0
+
+
+def apply_repository_texture_proxy_size(repository: BDK_PG_repository) -> int:
+    """
+    Points the images that were loaded from the repository's exports at the texture proxies of the repository's proxy
+    size, or back at the full-resolution textures if proxies are disabled. Textures without a proxy of that size (i.e.,
+    those that are small enough already) use the full-resolution texture.
+
+    Linked images (e.g., those of the materials in the asset libraries) cannot be changed and are left as they are.
+
+    :return: The number of images that were remapped.
+    """
+    exports_directory = get_image_pool_key(str(get_repository_cache_directory(repository) / 'exports')) + os.sep
+    proxy_size = get_texture_proxy_size(repository)
+
+    def get_file_path(file_path: str) -> Optional[str]:
+        if not get_image_pool_key(file_path).startswith(exports_directory):
+            return None
+        file_path = _texture_proxy_suffix_pattern.sub('.tga', file_path)
+        if proxy_size > 0 and file_path.lower().endswith('.tga'):
+            proxy_file_path = file_path[:-len('.tga')] + get_texture_proxy_extension(proxy_size)
+            if os.path.isfile(proxy_file_path):
+                return proxy_file_path
+        return file_path
+
+    return get_image_pool().remap(get_file_path)
+
+
+class PackageFileIndex:
+    """
+    An index of the files exported for a package, keyed by the upper-cased type and object names.
+    """
+
+    def __init__(self, package_exports_directory: Path):
+        self.directory = package_exports_directory
+        # Map of (TYPE, OBJECT) to the path of the object's files without the extension, and the available extensions.
+        self.files: Dict[Tuple[str, str], Tuple[str, Set[str]]] = dict()
+        self._build()
+
+    def _build(self):
+        try:
+            type_directories = [entry for entry in os.scandir(self.directory) if entry.is_dir()]
+        except OSError:
+            # The package has not been exported.
+            return
+        for type_directory in type_directories:
+            type_name = type_directory.name.upper()
+            for entry in os.scandir(type_directory.path):
+                # Object names cannot contain periods, so everything after the first period is the extension.
+                dot_index = entry.name.find('.')
+                if dot_index == -1:
+                    continue
+                object_name = entry.name[:dot_index]
+                key = (type_name, object_name.upper())
+                item = self.files.get(key, None)
+                if item is None:
+                    item = (os.path.join(type_directory.path, object_name), set())
+                    self.files[key] = item
+                item[1].add(entry.name[dot_index:].lower())
+
+    def find(self, type_name: str, object_name: str, extension: str) -> Optional[str]:
+        item = self.files.get((type_name.upper(), object_name.upper()), None)
+        if item is None or extension not in item[1]:
+            return None
+        return item[0] + extension
 
 
 class MaterialCache:
-    def __init__(self, root_directory: Path):
+    # The generation of the most recently created cache.
+    _last_generation = 0
+
+    def __init__(self, root_directory: Path, max_entries: int = 0):
+        # A number that is unique to each cache, so that anything built from a cache can tell when the cache has been
+        # replaced (unlike `id`, which can be reused once a cache is freed).
+        MaterialCache._last_generation += 1
+        self.generation = MaterialCache._last_generation
         self._root_directory = root_directory
-        self._materials: Dict[str, UMaterial] = {}
-        self._package_paths: Dict[str, Path] = {}
+        # The maximum number of materials to keep in memory (0 for unlimited). The least recently used materials are
+        # evicted first.
+        self._max_entries = max_entries
+        self._materials: OrderedDict[str, UMaterial] = OrderedDict()
+        self._package_exports_directories: Dict[str, Path] = {}
+        # The file indices are built lazily, the first time a package is looked up.
+        self._package_file_indices: Dict[str, PackageFileIndex] = {}
+        self._package_props_indices: Dict[str, Optional[PropsIndex]] = {}
+        self._props_cache = get_props_cache(root_directory)
 
         self._build_package_paths()
 
@@ -22,32 +148,185 @@ class MaterialCache:
         # Read the list of packages managed by BDK in the manifest.
         manifest = Manifest.from_file(self._root_directory / 'manifest.json')
 
-        # Register package name with package directory
+        # Register package name with package exports directory.
+        exports_directory = Path(os.path.abspath(self._root_directory / 'exports'))
         for package_path in manifest.packages.keys():
             package_name = os.path.splitext(os.path.basename(package_path))[0].upper()
-            self._package_paths[package_name] = Path(package_path)
+            self._package_exports_directories[package_name] = exports_directory / os.path.splitext(package_path)[0]
 
-    def resolve_path_for_reference(self, reference: UReference) -> Optional[Path]:
+    def resolve_package_exports_directory(self, reference: UReference) -> Optional[Path]:
         try:
-            package_path = self._package_paths[reference.package_name.upper()]
-            return (self._root_directory / 'exports' / os.path.splitext(package_path)[0] / reference.type_name / f'{reference.object_name}.props.txt').resolve()
+            return self._package_exports_directories[reference.package_name.upper()]
         except KeyError:
             # The package could not be found in the material cache.
             print(f'Could not find package {reference.package_name} in material cache.')
-            pass
-        except RuntimeError:
-            pass
         return None
 
+    def _get_package_file_index(self, reference: UReference) -> Optional[PackageFileIndex]:
+        package_name = reference.package_name.upper()
+        package_file_index = self._package_file_indices.get(package_name, None)
+        if package_file_index is None:
+            package_exports_directory = self.resolve_package_exports_directory(reference)
+            if package_exports_directory is None:
+                return None
+            package_file_index = PackageFileIndex(package_exports_directory)
+            self._package_file_indices[package_name] = package_file_index
+        return package_file_index
+
+    def resolve_file_path_for_reference(self, reference: UReference, extension: str) -> Optional[str]:
+        """
+        Returns the path of the exported file with the given extension for the reference, or None if there is no such
+        file. Names are matched case-insensitively.
+        """
+        if reference.type_name is None:
+            return None
+        package_file_index = self._get_package_file_index(reference)
+        if package_file_index is None:
+            return None
+        return package_file_index.find(reference.type_name, reference.object_name, extension)
+
+    def resolve_path_for_reference(self, reference: UReference) -> Optional[Path]:
+        path = self.resolve_file_path_for_reference(reference, '.props.txt')
+        return Path(path) if path is not None else None
+
+    def resolve_image_path_for_reference(self, reference: UReference, proxy_size: int = 0) -> Optional[str]:
+        """
+        Returns the path of the exported image for the reference. If `proxy_size` is set, the texture proxy of that size
+        is returned instead, if there is one.
+        """
+        if proxy_size > 0:
+            path = self.resolve_file_path_for_reference(reference, get_texture_proxy_extension(proxy_size))
+            if path is not None:
+                return path
+        for extension in image_file_extensions:
+            path = self.resolve_file_path_for_reference(reference, extension)
+            if path is not None:
+                return path
+        return None
+
+    def _get_package_props_index(self, reference: UReference, package_exports_directory: Path) -> Optional[PropsIndex]:
+        package_name = reference.package_name.upper()
+        if package_name not in self._package_props_indices:
+            self._package_props_indices[package_name] = read_props_index(package_exports_directory)
+        return self._package_props_indices[package_name]
+
+    def _resolve_material_source(self, reference: UReference) -> Union[UMaterial, Path, None]:
+        """
+        Returns the material if it is in the package's props index, otherwise the path of the file to read it from.
+        """
+        package_exports_directory = self.resolve_package_exports_directory(reference)
+        if package_exports_directory is None:
+            return None
+        # Prefer reading from the package's props index, which holds the parsed properties of the entire package.
+        props_index = self._get_package_props_index(reference, package_exports_directory)
+        item = props_index.find(reference.type_name, reference.object_name) if props_index is not None else None
+        if item is not None:
+            type_name, object_name, properties = item
+            material_reference = UReference.intern(package_exports_directory.name, object_name, type_name)
+            return read_material_from_properties(material_reference, properties)
+        return self.resolve_path_for_reference(reference)
+
+    def _add_material(self, key: str, material: UMaterial):
+        self._materials[key] = material
+        if 0 < self._max_entries < len(self._materials):
+            self._materials.popitem(last=False)
+
     def load_material(self, reference: UReference) -> Optional[UMaterial]:
         if reference is None:
             return None
         key = str(reference)
-        if key in self._materials:
-            return self._materials[str(reference)]
-        path = self.resolve_path_for_reference(reference)
-        if path is None:
+        material = self._materials.get(key, None)
+        if material is not None:
+            self._materials.move_to_end(key)
+            return material
+        source = self._resolve_material_source(reference)
+        if source is None:
             return None
-        material = read_material(str(path))
-        self._materials[key] = material
+        material = source if isinstance(source, UMaterial) else read_material(str(source), self._props_cache)
+        self._add_material(key, material)
         return material
+
+    def prefetch(self, references: Iterable[Optional[UReference]], max_workers: int = 8):
+        """
+        Loads the materials and all the materials they reference (transitively) into the cache, reading the files of
+        each level of the dependency tree concurrently. This way, building the materials afterward does not have to
+        wait on any file reads.
+        """
+        visited: Set[str] = set()
+        pending = list(references)
+        with ThreadPoolExecutor(max_workers) as executor:
+            while len(pending) > 0:
+                materials = []
+                jobs = {}
+                for reference in pending:
+                    if reference is None or reference.type_name is None:
+                        continue
+                    key = str(reference)
+                    if key in visited:
+                        continue
+                    visited.add(key)
+                    material = self._materials.get(key, None)
+                    if material is None:
+                        # Skip references to packages outside the repository (e.g., myLevel) without complaint.
+                        if reference.package_name.upper() not in self._package_exports_directories:
+                            continue
+                        source = self._resolve_material_source(reference)
+                        if source is None:
+                            continue
+                        if isinstance(source, UMaterial):
+                            material = source
+                        else:
+                            jobs[key] = executor.submit(read_material, str(source), self._props_cache)
+                            continue
+                        self._add_material(key, material)
+                    materials.append(material)
+                for key, job in jobs.items():
+                    try:
+                        material = job.result()
+                    except Exception as e:
+                        print(f'Failed to prefetch material {key}: {e}')
+                        continue
+                    self._add_material(key, material)
+                    materials.append(material)
+                pending = [reference for material in materials for reference in get_material_references(material)]
+
+    @property
+    def root_directory(self) -> Path:
+        return self._root_directory
+
+    def set_max_entries(self, max_entries: int):
+        self._max_entries = max_entries
+        if max_entries > 0:
+            while len(self._materials) > max_entries:
+                self._materials.popitem(last=False)
+
+
+# Process-wide material caches, keyed by repository ID.
+_material_caches: Dict[str, MaterialCache] = dict()
+
+
+def get_repository_material_cache(context: Context, repository: BDK_PG_repository) -> MaterialCache:
+    """
+    Gets the shared material cache for the repository so that materials that have already been read are reused across
+    material imports & terrain material rebuilds.
+    """
+    max_entries = get_addon_preferences(context).material_cache_max_entries
+    root_directory = get_repository_cache_directory(repository)
+    material_cache = _material_caches.get(repository.id, None)
+    if material_cache is None or material_cache.root_directory != root_directory:
+        material_cache = MaterialCache(root_directory, max_entries)
+        _material_caches[repository.id] = material_cache
+    else:
+        material_cache.set_max_entries(max_entries)
+    return material_cache
+
+
+def invalidate_material_cache(repository_id: Optional[str] = None):
+    """
+    Discards the shared material cache for the repository (or for all repositories if no ID is given).
+    This must be called whenever the repository's packages are exported or built, or its cache is deleted.
+    """
+    if repository_id is None:
+        _material_caches.clear()
+    else:
+        _material_caches.pop(repository_id, None)
@@ -31,7 +31,32 @@ class ETexClampMode(Enum):
     TC_Clamp = 1,
 
 
-class UMaterial:
+class UMaterialMeta(type):
+    """
+    Metaclass for material classes that stores the annotated properties in `__slots__` instead of a per-instance
+    dictionary, since the material cache can hold a very large number of materials at once.
+
+    Slots cannot have class-level default values, so the defaults are moved to `_defaults` and looked up when a
+    property has not been set on the instance.
+    """
+
+    def __new__(mcs, name, bases, namespace):
+        annotations = namespace.get('__annotations__', {})
+        defaults = dict()
+        property_names = []
+        for base in bases:
+            defaults.update(getattr(base, '_defaults', {}))
+            property_names.extend(getattr(base, '_property_names', ()))
+        for property_name in annotations.keys():
+            if property_name in namespace:
+                defaults[property_name] = namespace.pop(property_name)
+        namespace['__slots__'] = tuple(x for x in annotations.keys() if x not in property_names)
+        namespace['_defaults'] = defaults
+        namespace['_property_names'] = tuple(property_names) + namespace['__slots__']
+        return super().__new__(mcs, name, bases, namespace)
+
+
+class UMaterial(metaclass=UMaterialMeta):
     Reference: UReference
     FallbackMaterial: Optional[UReference] = None
     DefaultMaterial: Optional[UReference] = None
@@ -40,6 +65,13 @@ class UMaterial:
     def __init__(self, reference: UReference):
         self.Reference = reference
 
+    def __getattr__(self, name):
+        # This is only called for properties that have not been set on the instance.
+        try:
+            return self._defaults[name]
+        except KeyError:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'") from None
+
     def __repr__(self):
         lines = []
         type_hints = typing.get_type_hints(self)
@@ -0,0 +1,129 @@
+import os
+from typing import Callable, Dict, Optional
+
+import bpy
+from bpy.app.handlers import persistent
+from bpy.types import Image
+
+
+def get_image_pool_key(file_path: str) -> str:
+    return os.path.normcase(os.path.abspath(file_path))
+
+
+class ImagePool:
+    """
+    A pool of the image data-blocks loaded from disk, keyed by their absolute file paths.
+
+    This replaces `bpy.data.images.load(..., check_existing=True)`, which compares the file path against every image in
+    the blend data on each call. The pool is seeded from the local images in the blend data on the next lookup after it
+    has been invalidated (by the undo & file load handlers, or explicitly), and images are added to it as it loads them.
+    A lookup that misses rescans the blend data once if the number of images has changed since the last scan (e.g.,
+    images were loaded by another importer), so that the image is not loaded twice.
+    """
+
+    def __init__(self):
+        self._is_dirty = True
+        self._image_count = 0
+        self._images: Dict[str, Image] = {}
+
+    def invalidate(self):
+        self._is_dirty = True
+
+    def _rebuild(self):
+        self._images.clear()
+        for image in bpy.data.images:
+            # Linked images cannot be modified, so they are not handed out by the pool.
+            if image.source != 'FILE' or image.library is not None or not image.filepath:
+                continue
+            self._images[get_image_pool_key(bpy.path.abspath(image.filepath))] = image
+        self._image_count = len(bpy.data.images)
+        self._is_dirty = False
+
+    def _find(self, key: str) -> Optional[Image]:
+        if self._is_dirty:
+            self._rebuild()
+        image = self._images.get(key, None)
+        if image is not None:
+            try:
+                # Accessing a removed data-block raises a ReferenceError.
+                _ = image.name
+                return image
+            except ReferenceError:
+                del self._images[key]
+        if self._image_count != len(bpy.data.images):
+            self._rebuild()
+            return self._images.get(key, None)
+        return None
+
+    def load(self, file_path: str) -> Image:
+        """
+        Returns the image for the file, loading it if it is not already in the blend data.
+
+        Note that there is no need to defer reading the pixels: Blender only reads them the first time they are needed
+        (e.g., when the image is drawn or rendered), so loading an image only creates the data-block.
+        """
+        key = get_image_pool_key(file_path)
+        image = self._find(key)
+        if image is None:
+            image = bpy.data.images.load(file_path, check_existing=False)
+            self._images[key] = image
+            self._image_count = len(bpy.data.images)
+        # Changing the alpha mode reloads the image, so avoid doing it needlessly for images that are reused.
+        if image.alpha_mode != 'CHANNEL_PACKED':
+            image.alpha_mode = 'CHANNEL_PACKED'
+        return image
+
+    def remap(self, function: Callable[[str], Optional[str]]) -> int:
+        """
+        Points the pooled images at other files. `function` is called with the absolute file path of each image and
+        returns the file path to point it at, or None to leave the image as it is. The images are reloaded from their new
+        files. Returns the number of images that were remapped.
+        """
+        if self._is_dirty:
+            self._rebuild()
+        count = 0
+        for image in list(self._images.values()):
+            try:
+                file_path = bpy.path.abspath(image.filepath)
+            except ReferenceError:
+                continue
+            new_file_path = function(file_path)
+            if new_file_path is None or get_image_pool_key(new_file_path) == get_image_pool_key(file_path):
+                continue
+            # Changing the file path of the image reloads it.
+            image.filepath = new_file_path
+            count += 1
+        self.invalidate()
+        return count
+
+
+_image_pool = ImagePool()
+
+
+def get_image_pool() -> ImagePool:
+    return _image_pool
+
+
+@persistent
+def _invalidate_handler(*_args):
+    _image_pool.invalidate()
+
+
+_handlers = (
+    (bpy.app.handlers.undo_post, _invalidate_handler),
+    (bpy.app.handlers.redo_post, _invalidate_handler),
+    (bpy.app.handlers.load_post, _invalidate_handler),
+)
+
+
+def register_handlers():
+    for handlers, handler in _handlers:
+        if handler not in handlers:
+            handlers.append(handler)
+    _image_pool.invalidate()
+
+
+def unregister_handlers():
+    for handlers, handler in _handlers:
+        if handler in handlers:
+            handlers.remove(handler)
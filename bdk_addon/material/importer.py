@@ -1,23 +1,28 @@
 import math
 import copy
-import os
-from typing import Dict, cast, Tuple, Callable, Any, List, Optional
+from typing import Dict, cast, Tuple, Callable, Any, List, Optional, Iterable
 
 import bpy
-from bpy.props import StringProperty
+from bpy.props import StringProperty, BoolProperty
 from bpy.types import ShaderNodeTexImage, NodeTree, NodeSocket, Context, Node, Operator
 from bpy_extras.io_utils import ImportHelper
 from pathlib import Path
 
-from .cache import MaterialCache
+from .analysis import MaterialOutput, get_consumed_outputs, get_material_blend_method, get_material_size, \
+    get_material_switch_current_index, is_uv_socket_consumed
+from .cache import MaterialCache, get_repository_material_cache, get_material_references, get_texture_proxy_size
+from .image_pool import get_image_pool
+from .node_groups import ensure_bdk_time_node_tree, ensure_bdk_uv_transform_node_tree, ensure_bdk_oscillation_node_tree, \
+    ensure_bdk_uv_panner_node_tree, ensure_bdk_uv_rotator_node_tree, ensure_bdk_material_shader_node_tree
 from .data import UColorModifier, UCombiner, UConstantColor, UCubemap, UFinalBlend, UTexCoordSource, UTexEnvMap, \
     UTexOscillator, UTexPanner, UTexRotator, UTexScaler, UTexture, UShader, UVariableTexPanner, UVertexColor, \
     UFadeColor, UMaterialSwitch, EAlphaOperation, EColorOperation, EColorFadeType, UMaterial, ETexCoordSrc, \
     ETexEnvMapType, ETexOscillationType, ETexRotationType, ETexClampMode
-from ..bdk.repository.kernel import get_repository_cache_directory
 from ..bdk.repository.properties import BDK_PG_repository
 from ..data import UReference
 from ..helpers import get_addon_preferences
+from ..node_helpers import add_math_operation_nodes, add_combine_xyz_node
+from ..package.index import get_package_reference_index
 
 
 class MaterialSocketOutputs:
@@ -31,14 +36,29 @@ class MaterialSocketOutputs:
 class MaterialSocketInputs:
     uv_source_socket: NodeSocket = None
     uv_socket: NodeSocket = None
+    # The outputs of the material that are consumed. Nodes that only contribute to other outputs are not built.
+    outputs: MaterialOutput = MaterialOutput.ALL
+
+
+def _get_socket_key(socket: Optional[NodeSocket]) -> Optional[int]:
+    return socket.as_pointer() if socket is not None else None
 
 
 class MaterialBuilder:
-    def __init__(self, material_caches: List[MaterialCache], node_tree: NodeTree):
+    def __init__(self, material_caches: List[MaterialCache], node_tree: NodeTree, texture_proxy_size: int = 0):
         self._material_caches = material_caches
         self._node_tree = node_tree
+        # The size of the downscaled texture proxies to bind instead of the full-resolution textures (0 for none).
+        self._texture_proxy_size = texture_proxy_size
         self._material_type_importers: Dict[
             type, Callable[[Any, MaterialSocketInputs], Optional[MaterialSocketOutputs]]] = {}
+        # The outputs of the materials that have already been imported, keyed by the material reference, the
+        # pointers of the UV input sockets and the consumed outputs.
+        self._material_outputs: Dict[Tuple[str, Optional[int], Optional[int], int],
+                                     Optional[MaterialSocketOutputs]] = {}
+        self._time_socket: Optional[NodeSocket] = None
+        # Whether each material makes use of the UV socket it is given, keyed by the material reference.
+        self._uv_socket_consumers: Dict[str, bool] = {}
 
         self._register_material_importers()
 
@@ -78,16 +98,39 @@ class MaterialBuilder:
             raise RuntimeError(f'Could not find image {reference.object_name} in myLevel')
 
         for material_cache in self._material_caches:
-            image_path = material_cache.resolve_path_for_reference(reference)
-            image_path = str(image_path)
-            for extension in extensions:
-                file_path = image_path.replace('.props.txt', extension)
-                if os.path.isfile(file_path):
-                    image = bpy.data.images.load(str(file_path), check_existing=True)
-                    image.alpha_mode = 'CHANNEL_PACKED'
-                    return image
+            file_path = material_cache.resolve_image_path_for_reference(reference, proxy_size=self._texture_proxy_size)
+            if file_path is not None:
+                return get_image_pool().load(file_path)
         raise RuntimeError(f'Could not find file for reference {reference} in {len(self._material_caches)} material caches')
 
+    def _add_node_group_node(self, node_tree: NodeTree) -> Node:
+        node = self._node_tree.nodes.new('ShaderNodeGroup')
+        node.node_tree = node_tree
+        return node
+
+    def _get_time_socket(self) -> NodeSocket:
+        """
+        Returns the output socket of the shared time node group (the scene time in seconds) for this node tree.
+        """
+        if self._time_socket is None:
+            time_node = self._add_node_group_node(ensure_bdk_time_node_tree())
+            self._time_socket = time_node.outputs['Time']
+        return self._time_socket
+
+    def _add_time_product_nodes(self, factor: float) -> NodeSocket:
+        """
+        Adds a node that calculates `time * factor`.
+        """
+        return add_math_operation_nodes(self._node_tree, 'MULTIPLY', [self._get_time_socket(), factor])
+
+    def prefetch(self, references: Iterable[Optional[UReference]]):
+        """
+        Loads the referenced materials and their dependencies into the material caches ahead of building.
+        """
+        references = list(references)
+        for material_cache in self._material_caches:
+            material_cache.prefetch(references)
+
     def load_material(self, reference: Optional[UReference]):
         if reference is None:
             return None
@@ -97,12 +140,28 @@ class MaterialBuilder:
                 return material
         return None
 
+    def _import_sub_material(self, reference: Optional[UReference], inputs: MaterialSocketInputs,
+                             outputs: Optional[MaterialOutput]) -> Optional[MaterialSocketOutputs]:
+        """
+        Imports a sub-material of which only the given outputs are consumed. If none of its outputs are consumed, the
+        sub-material is unreachable and nothing is built.
+        """
+        if not outputs:
+            return None
+        inputs = copy.copy(inputs)
+        inputs.outputs = outputs
+        return self._import_material(self.load_material(reference), inputs)
+
+    def _is_uv_socket_consumed(self, material: Optional[UMaterial]) -> bool:
+        return is_uv_socket_consumed(material, self.load_material, self._uv_socket_consumers)
+
     def _import_color_modifier(self, color_modifier: UColorModifier,
                                socket_inputs: MaterialSocketInputs) -> MaterialSocketOutputs:
         material = self.load_material(color_modifier.Material)
         material_outputs = self._import_material(material, socket_inputs)
 
-        if material_outputs and material_outputs.color_socket is not None:
+        if MaterialOutput.COLOR in socket_inputs.outputs and material_outputs and \
+                material_outputs.color_socket is not None:
             mix_node = self._node_tree.nodes.new('ShaderNodeMix')
             mix_node.data_type = 'RGBA'
             mix_node.blend_type = 'MULTIPLY'
@@ -128,13 +187,12 @@ class MaterialBuilder:
 
         outputs = MaterialSocketOutputs()
 
-        material1 = self.load_material(combiner.Material1)
-        material2 = self.load_material(combiner.Material2)
-        mask_material = self.load_material(combiner.Mask)
+        # Only build the materials whose outputs are used by the color & alpha operations.
+        consumed_outputs = get_consumed_outputs(combiner, inputs.outputs)
 
-        material1_outputs = self._import_material(material1, copy.copy(inputs))
-        material2_outputs = self._import_material(material2, copy.copy(inputs))
-        mask_outputs = self._import_material(mask_material, copy.copy(inputs))
+        material1_outputs = self._import_sub_material(combiner.Material1, inputs, consumed_outputs.get('Material1'))
+        material2_outputs = self._import_sub_material(combiner.Material2, inputs, consumed_outputs.get('Material2'))
+        mask_outputs = self._import_sub_material(combiner.Mask, inputs, consumed_outputs.get('Mask'))
 
         def create_color_combiner_mix_node(blend_type: str) -> Node:
             mix_node = self._node_tree.nodes.new('ShaderNodeMixRGB')
@@ -155,76 +213,83 @@ class MaterialBuilder:
             return mix_node
 
         # Color Operation
-        if combiner.CombineOperation == EColorOperation.CO_Use_Color_From_Material1:
-            outputs.color_socket = material1_outputs.color_socket
-        elif combiner.CombineOperation == EColorOperation.CO_Use_Color_From_Material2:
-            outputs.color_socket = material2_outputs.color_socket
-        elif combiner.CombineOperation == EColorOperation.CO_Multiply:
-            mix_node = create_color_combiner_mix_node('MULTIPLY')
-            if combiner.Modulate2x or combiner.Modulate4x:
-                modulate_node = self._node_tree.nodes.new('ShaderNodeVectorMath')
-                modulate_node.operation = 'SCALE'
-                modulate_node.inputs['Scale'].default_value = 4.0 if combiner.Modulate4x else 2.0
-                self._node_tree.links.new(modulate_node.inputs['Vector'], mix_node.outputs[2])
-                outputs.color_socket = modulate_node.outputs['Vector']
-            else:
+        if MaterialOutput.COLOR in inputs.outputs:
+            if combiner.CombineOperation == EColorOperation.CO_Use_Color_From_Material1:
+                outputs.color_socket = material1_outputs.color_socket
+            elif combiner.CombineOperation == EColorOperation.CO_Use_Color_From_Material2:
+                outputs.color_socket = material2_outputs.color_socket
+            elif combiner.CombineOperation == EColorOperation.CO_Multiply:
+                mix_node = create_color_combiner_mix_node('MULTIPLY')
+                if combiner.Modulate2x or combiner.Modulate4x:
+                    modulate_node = self._node_tree.nodes.new('ShaderNodeVectorMath')
+                    modulate_node.operation = 'SCALE'
+                    modulate_node.inputs['Scale'].default_value = 4.0 if combiner.Modulate4x else 2.0
+                    self._node_tree.links.new(modulate_node.inputs['Vector'], mix_node.outputs[2])
+                    outputs.color_socket = modulate_node.outputs['Vector']
+                else:
+                    outputs.color_socket = mix_node.outputs[0]
+            elif combiner.CombineOperation == EColorOperation.CO_Add:
+                mix_node = create_color_combiner_mix_node('ADD')
                 outputs.color_socket = mix_node.outputs[0]
-        elif combiner.CombineOperation == EColorOperation.CO_Add:
-            mix_node = create_color_combiner_mix_node('ADD')
-            outputs.color_socket = mix_node.outputs[0]
-        elif combiner.CombineOperation == EColorOperation.CO_Subtract:
-            mix_node = create_color_combiner_mix_node('SUBTRACT')
-            outputs.color_socket = mix_node.outputs[2]
-        elif combiner.CombineOperation == EColorOperation.CO_AlphaBlend_With_Mask:
-            mix_node = create_color_combiner_mix_node('MIX')
-            if mask_outputs and mask_outputs.alpha_socket:
-                self._node_tree.links.new(mix_node.inputs['Fac'], mask_outputs.alpha_socket)
-            outputs.color_socket = mix_node.outputs[0]
-        elif combiner.CombineOperation == EColorOperation.CO_Add_With_Mask_Modulation:
-            mix_node = create_color_combiner_mix_node('ADD')
-            outputs.color_socket = mix_node.outputs[0]
-            # This doesn't use the Mask, but instead uses the alpha channel of Material 2, or if it hasn't got one,
-            # modulates it on Material1.
-            if material2_outputs is not None and material2_outputs.alpha_socket is not None:
-                self._node_tree.links.new(mix_node.inputs['Fac'], material2_outputs.alpha_socket)
-            elif material1_outputs is not None and material1_outputs.alpha_socket is not None:
-                self._node_tree.links.new(mix_node.inputs['Fac'], material1_outputs.alpha_socket)
-        elif combiner.CombineOperation == EColorOperation.CO_Use_Color_From_Mask:  # dropped in UE3, apparently
-            if mask_outputs and mask_outputs.color_socket:
-                outputs.color_socket = mask_outputs.color_socket
+            elif combiner.CombineOperation == EColorOperation.CO_Subtract:
+                mix_node = create_color_combiner_mix_node('SUBTRACT')
+                outputs.color_socket = mix_node.outputs[2]
+            elif combiner.CombineOperation == EColorOperation.CO_AlphaBlend_With_Mask:
+                mix_node = create_color_combiner_mix_node('MIX')
+                if mask_outputs and mask_outputs.alpha_socket:
+                    self._node_tree.links.new(mix_node.inputs['Fac'], mask_outputs.alpha_socket)
+                outputs.color_socket = mix_node.outputs[0]
+            elif combiner.CombineOperation == EColorOperation.CO_Add_With_Mask_Modulation:
+                mix_node = create_color_combiner_mix_node('ADD')
+                outputs.color_socket = mix_node.outputs[0]
+                # This doesn't use the Mask, but instead uses the alpha channel of Material 2, or if it hasn't got one,
+                # modulates it on Material1.
+                if material2_outputs is not None and material2_outputs.alpha_socket is not None:
+                    self._node_tree.links.new(mix_node.inputs['Fac'], material2_outputs.alpha_socket)
+                elif material1_outputs is not None and material1_outputs.alpha_socket is not None:
+                    self._node_tree.links.new(mix_node.inputs['Fac'], material1_outputs.alpha_socket)
+            elif combiner.CombineOperation == EColorOperation.CO_Use_Color_From_Mask:  # dropped in UE3, apparently
+                if mask_outputs and mask_outputs.color_socket:
+                    outputs.color_socket = mask_outputs.color_socket
 
         # Alpha Operation
-        if combiner.AlphaOperation == EAlphaOperation.AO_Use_Mask:
-            outputs.alpha_socket = mask_outputs.alpha_socket if mask_outputs else None
-        elif combiner.AlphaOperation == EAlphaOperation.AO_Multiply:
-            mix_node = self._node_tree.nodes.new('ShaderNodeMixRGB')
-            mix_node.blend_type = 'MULTIPLY'
-            if material1_outputs is not None and material1_outputs.alpha_socket:
-                self._node_tree.links.new(mix_node.inputs[1], material1_outputs.alpha_socket)
-            if material2_outputs is not None and material2_outputs.alpha_socket:
-                self._node_tree.links.new(mix_node.inputs[2], material2_outputs.alpha_socket)
-            outputs.alpha_socket = mix_node.outputs[0]
-        elif combiner.AlphaOperation == EAlphaOperation.AO_Add:
-            mix_node = self._node_tree.nodes.new('ShaderNodeMixRGB')
-            mix_node.blend_type = 'ADD'
-            if material1_outputs.alpha_socket:
+        if MaterialOutput.ALPHA in inputs.outputs:
+            if combiner.AlphaOperation == EAlphaOperation.AO_Use_Mask:
+                outputs.alpha_socket = mask_outputs.alpha_socket if mask_outputs else None
+            elif combiner.AlphaOperation == EAlphaOperation.AO_Multiply:
+                mix_node = self._node_tree.nodes.new('ShaderNodeMixRGB')
+                mix_node.blend_type = 'MULTIPLY'
                 if material1_outputs is not None and material1_outputs.alpha_socket:
-                    self._node_tree.links.new(mix_node.inputs[6], material1_outputs.alpha_socket)
+                    self._node_tree.links.new(mix_node.inputs[1], material1_outputs.alpha_socket)
                 if material2_outputs is not None and material2_outputs.alpha_socket:
-                    self._node_tree.links.new(mix_node.inputs[7], material2_outputs.alpha_socket)
-            outputs.alpha_socket = mix_node.outputs[2]
-        elif combiner.AlphaOperation == EAlphaOperation.AO_Use_Alpha_From_Material1:
-            outputs.alpha_socket = material1_outputs.alpha_socket if material1_outputs else None
-        elif combiner.AlphaOperation == EAlphaOperation.AO_Use_Alpha_From_Material2:
-            outputs.alpha_socket = material2_outputs.alpha_socket if material2_outputs else None
+                    self._node_tree.links.new(mix_node.inputs[2], material2_outputs.alpha_socket)
+                outputs.alpha_socket = mix_node.outputs[0]
+            elif combiner.AlphaOperation == EAlphaOperation.AO_Add:
+                mix_node = self._node_tree.nodes.new('ShaderNodeMixRGB')
+                mix_node.blend_type = 'ADD'
+                if material1_outputs.alpha_socket:
+                    if material1_outputs is not None and material1_outputs.alpha_socket:
+                        self._node_tree.links.new(mix_node.inputs[6], material1_outputs.alpha_socket)
+                    if material2_outputs is not None and material2_outputs.alpha_socket:
+                        self._node_tree.links.new(mix_node.inputs[7], material2_outputs.alpha_socket)
+                outputs.alpha_socket = mix_node.outputs[2]
+            elif combiner.AlphaOperation == EAlphaOperation.AO_Use_Alpha_From_Material1:
+                outputs.alpha_socket = material1_outputs.alpha_socket if material1_outputs else None
+            elif combiner.AlphaOperation == EAlphaOperation.AO_Use_Alpha_From_Material2:
+                outputs.alpha_socket = material2_outputs.alpha_socket if material2_outputs else None
 
         # NOTE: This is a bit of guess. Maybe investigate how this is actually determined.
-        if material1_outputs is not None:
-            outputs.size = material1_outputs.size
-        elif material2_outputs is not None:
-            outputs.size = material2_outputs.size
-        elif mask_outputs is not None:
-            outputs.size = mask_outputs.size
+        for name, reference, material_outputs in (('Material1', combiner.Material1, material1_outputs),
+                                                  ('Material2', combiner.Material2, material2_outputs),
+                                                  ('Mask', combiner.Mask, mask_outputs)):
+            if name in consumed_outputs:
+                size = material_outputs.size if material_outputs is not None else None
+            else:
+                # The material was not built, so determine what its size would have been.
+                size = get_material_size(self.load_material(reference), self.load_material)
+            if size is not None:
+                outputs.size = size
+                break
 
         return outputs
 
@@ -270,9 +335,7 @@ class MaterialBuilder:
         node_tree.links.new(mix_rgb_node.inputs[6], color_1_rgb_node.outputs['Color'])
         node_tree.links.new(mix_rgb_node.inputs[7], color_2_rgb_node.outputs['Color'])
 
-        time_value_node = node_tree.nodes.new('ShaderNodeValue')
-        time_value_node.label = 'Time'
-        time_value_node.outputs[0].driver_add('default_value').driver.expression = 'frame/bpy.context.scene.render.fps'
+        time_socket = self._get_time_socket()
 
         fade_offset_value_node = node_tree.nodes.new('ShaderNodeValue')
         fade_offset_value_node.label = 'FadeOffset'
@@ -288,7 +351,7 @@ class MaterialBuilder:
             time_multiply_node = node_tree.nodes.new('ShaderNodeMath')
             time_multiply_node.operation = 'MULTIPLY'
             time_multiply_node.inputs[1].default_value = 2.0
-            node_tree.links.new(time_value_node.outputs[0], time_multiply_node.inputs[0])
+            node_tree.links.new(time_socket, time_multiply_node.inputs[0])
 
             frequency_divide_node = node_tree.nodes.new('ShaderNodeMath')
             frequency_divide_node.operation = 'DIVIDE'
@@ -313,17 +376,12 @@ class MaterialBuilder:
 
             factor_socket = ping_pong_node.outputs[0]
         elif fade_color.ColorFadeType == EColorFadeType.FC_Sinusoidal:
-            def get_sinusoidal_driver_expression(phase: float, period: float) -> str:
-                return f'(cos({phase}+(1/{period})*2*pi*(frame/bpy.context.scene.render.fps))+1)/2'
-
-            sinusoidal_factor_value_node = node_tree.nodes.new('ShaderNodeValue')
-            sinusoidal_factor_value_node.outputs[0].driver_add('default_value').driver.expression = get_sinusoidal_driver_expression(fade_color.FadeOffset, fade_color.FadePeriod)
-
-            # TODO: For consistency, we should not be using a driver for the whole expression.
-            #  Make this a series of nodes instead. (sure would be nice to have code that could take a math expression
-            #  and turn it into a node tree)
-
-            factor_socket = sinusoidal_factor_value_node.outputs[0]
+            # (cos(FadeOffset + (1 / FadePeriod) * 2 * pi * time) + 1) / 2
+            frequency = (2 * math.pi) / fade_color.FadePeriod if fade_color.FadePeriod != 0 else 0.0
+            phase_socket = add_math_operation_nodes(node_tree, 'ADD', [self._add_time_product_nodes(frequency),
+                                                                      fade_color.FadeOffset])
+            cosine_socket = add_math_operation_nodes(node_tree, 'COSINE', [phase_socket])
+            factor_socket = add_math_operation_nodes(node_tree, 'MULTIPLY_ADD', [cosine_socket, 0.5, 0.5])
 
         mix_alpha_node = node_tree.nodes.new('ShaderNodeMix')
         mix_alpha_node.data_type = 'FLOAT'
@@ -358,6 +416,7 @@ class MaterialBuilder:
             self._node_tree.links.new(scale_node.inputs[0], uv_source_socket)
         detail_socket_inputs = MaterialSocketInputs()
         detail_socket_inputs.uv_socket = scale_node.outputs['Vector']
+        detail_socket_inputs.outputs = MaterialOutput.COLOR
 
         # Import the detail material.
         detail_socket_outputs = self._import_material(detail_material, detail_socket_inputs)
@@ -395,26 +454,29 @@ class MaterialBuilder:
     def _import_shader(self, shader: UShader, socket_inputs: MaterialSocketInputs) -> MaterialSocketOutputs:
         outputs = MaterialSocketOutputs()
 
+        consumed_outputs = get_consumed_outputs(shader, socket_inputs.outputs)
+
         # Opacity
-        if shader.Opacity is not None:
-            opacity_material = self.load_material(shader.Opacity)
-            opacity_material_outputs = self._import_material(opacity_material, copy.copy(socket_inputs))
+        if 'Opacity' in consumed_outputs:
+            opacity_material_outputs = self._import_sub_material(shader.Opacity, socket_inputs,
+                                                                 consumed_outputs['Opacity'])
             outputs.alpha_socket = opacity_material_outputs.alpha_socket
             outputs.blend_method = opacity_material_outputs.blend_method
+        elif shader.Opacity is not None:
+            # The alpha is not used, but the opacity material still determines the blend method.
+            outputs.blend_method = get_material_blend_method(self.load_material(shader.Opacity), self.load_material)
 
         # Diffuse
-        diffuse_material = self.load_material(shader.Diffuse)
-        if diffuse_material is not None:
-            diffuse_material_outputs = self._import_material(diffuse_material, copy.copy(socket_inputs))
-            detail_material = self.load_material(shader.Detail) if shader.Detail is not None else None
-            if detail_material is not None:
-                self._import_detail_material(detail_material, shader.DetailScale, diffuse_material_outputs.color_socket,
-                                             uv_source_socket=socket_inputs.uv_source_socket)
+        # The detail material is intentionally not built. It was previously built but never connected to anything, so
+        # leaving it out does not change the output. Applying it to the diffuse color would change how materials look.
+        diffuse_material_outputs = self._import_sub_material(shader.Diffuse, socket_inputs,
+                                                             consumed_outputs.get('Diffuse'))
+        if diffuse_material_outputs is not None:
             outputs.color_socket = diffuse_material_outputs.color_socket
             outputs.use_backface_culling = diffuse_material_outputs.use_backface_culling
 
         # Specular
-        specular_material = self.load_material(shader.Specular)
+        specular_material = self.load_material(shader.Specular) if 'Specular' in consumed_outputs else None
         if specular_material:
             # Final Add Node
             add_node = self._node_tree.nodes.new('ShaderNodeMix')
@@ -428,13 +490,14 @@ class MaterialBuilder:
             multiply_node.blend_type = 'MULTIPLY'
             multiply_node.inputs['Factor'].default_value = 1.0
 
-            specular_material_outputs = self._import_material(specular_material, copy.copy(socket_inputs))
+            specular_material_outputs = self._import_sub_material(shader.Specular, socket_inputs,
+                                                                  consumed_outputs['Specular'])
             self._node_tree.links.new(multiply_node.inputs[6], specular_material_outputs.color_socket)
 
             # Specular Mask
-            specular_mask_material = self.load_material(shader.SpecularityMask)
-            if specular_mask_material is not None:
-                specular_mask_material_outputs = self._import_material(specular_mask_material, copy.copy(socket_inputs))
+            specular_mask_material_outputs = self._import_sub_material(shader.SpecularityMask, socket_inputs,
+                                                                       consumed_outputs.get('SpecularityMask'))
+            if specular_mask_material_outputs is not None:
                 self._node_tree.links.new(multiply_node.inputs[7], specular_mask_material_outputs.color_socket)
 
             self._node_tree.links.new(add_node.inputs[7], multiply_node.outputs[2])
@@ -447,23 +510,33 @@ class MaterialBuilder:
 
     def _import_tex_coord_source(self, tex_coord_source: UTexCoordSource,
                                  socket_inputs: MaterialSocketInputs) -> MaterialSocketOutputs:
-        uv_map_node = self._node_tree.nodes.new('ShaderNodeUVMap')
-        if tex_coord_source.SourceChannel == 0:
-            uv_map_node.uv_map = 'VTXW0000'
-        elif tex_coord_source.SourceChannel > 0:
-            uv_map_node.uv_map = f'EXTRAUV{tex_coord_source.SourceChannel - 1}'
-        else:
+        if tex_coord_source.SourceChannel < 0:
             raise RuntimeError('SourceChannel cannot be < 0')
 
-        socket_inputs.uv_socket = uv_map_node.outputs['UV']
-
         material = self.load_material(tex_coord_source.Material)
+
+        if self._is_uv_socket_consumed(material):
+            uv_map_node = self._node_tree.nodes.new('ShaderNodeUVMap')
+            if tex_coord_source.SourceChannel == 0:
+                uv_map_node.uv_map = 'VTXW0000'
+            else:
+                uv_map_node.uv_map = f'EXTRAUV{tex_coord_source.SourceChannel - 1}'
+            socket_inputs.uv_socket = uv_map_node.outputs['UV']
+
         material_outputs = self._import_material(material, copy.copy(socket_inputs))
 
         return material_outputs
 
-    def _import_tex_env_map(self, tex_env_map: UTexEnvMap, _: MaterialSocketInputs) -> MaterialSocketOutputs:
+    def _import_tex_env_map(self, tex_env_map: UTexEnvMap,
+                            socket_inputs: MaterialSocketInputs) -> MaterialSocketOutputs:
         inputs = MaterialSocketInputs()
+        inputs.outputs = socket_inputs.outputs
+
+        material = self.load_material(tex_env_map.Material)
+
+        if not self._is_uv_socket_consumed(material):
+            # Nothing samples the environment map coordinates, so don't bother adding the nodes that produce them.
+            return self._import_material(material, inputs)
 
         if tex_env_map.TexCoordSource == ETexCoordSrc.TCS_Stream0:
             uv_map_node = self._node_tree.nodes.new('ShaderNodeUVMap')
@@ -506,109 +579,96 @@ class MaterialBuilder:
         elif tex_env_map.TexCoordSource == ETexCoordSrc.TCS_ProjectorCoords:
             pass
 
-        material = self.load_material(tex_env_map.Material)
-
         return self._import_material(material, inputs)
 
     def _import_tex_oscillator(self, tex_oscillator: UTexOscillator,
                                socket_inputs: MaterialSocketInputs) -> MaterialSocketOutputs:
-        vector_subtract_node = self._node_tree.nodes.new('ShaderNodeVectorMath')
-        vector_subtract_node.operation = 'SUBTRACT'
-        vector_add_node = self._node_tree.nodes.new('ShaderNodeVectorMath')
-        vector_add_node.operation = 'ADD'
-        vector_transform_node = self._node_tree.nodes.new('ShaderNodeVectorMath')
+        material = self.load_material(tex_oscillator.Material)
 
-        offset_node = self._node_tree.nodes.new('ShaderNodeCombineXYZ')
+        if not self._is_uv_socket_consumed(material):
+            # Nothing samples the transformed UVs, so there's no need to add the nodes that transform them.
+            return self._import_material(material, socket_inputs)
 
-        self._node_tree.links.new(vector_subtract_node.inputs[0], socket_inputs.uv_source_socket)
-        self._node_tree.links.new(vector_add_node.inputs[0], vector_transform_node.outputs[0])
-        self._node_tree.links.new(vector_transform_node.inputs[0], vector_subtract_node.outputs[0])
-        self._node_tree.links.new(vector_subtract_node.inputs[1], offset_node.outputs['Vector'])
-        self._node_tree.links.new(vector_add_node.inputs[1], offset_node.outputs['Vector'])
+        uv_transform_node = self._add_node_group_node(ensure_bdk_uv_transform_node_tree())
 
-        socket_inputs.uv_socket = vector_add_node.outputs['Vector']
+        if socket_inputs.uv_source_socket is not None:
+            self._node_tree.links.new(uv_transform_node.inputs['UV'], socket_inputs.uv_source_socket)
+
+        socket_inputs.uv_socket = uv_transform_node.outputs['UV']
 
-        material = self.load_material(tex_oscillator.Material)
         material_outputs = self._import_material(material, socket_inputs)
 
         if material_outputs is not None:
-            offset_node.inputs['X'].default_value = tex_oscillator.UOffset / material_outputs.size[0]
-            offset_node.inputs['Y'].default_value = tex_oscillator.VOffset / material_outputs.size[1]
-
-        def get_driver_expression_for_pan(rate, amplitude):
-            return f'sin((frame / bpy.context.scene.render.fps) * {rate * math.pi * 2}) * {amplitude}'
-
-        def get_driver_expression_for_stretch(rate, amplitude):
-            return f'1.0 + sin((frame / bpy.context.scene.render.fps) * {rate * math.pi * 2}) * {amplitude}'
-
-        # TODO: make this generic for the whole thing (just a socket + expression)
-        def add_driver_to_vector_transform_input(expression: str, index: int):
-            fcurve = vector_transform_node.inputs[1].driver_add('default_value', index)
-            fcurve.driver.expression = expression
+            uv_transform_node.inputs['Center'].default_value = (tex_oscillator.UOffset / material_outputs.size[0],
+                                                                tex_oscillator.VOffset / material_outputs.size[1],
+                                                                0.0)
+
+        def add_oscillation_node(offset: float) -> Optional[NodeSocket]:
+            # Returns a vector of `offset + sin(time * rate * 2 * pi) * amplitude` for each of the animated axes.
+            rates = [0.0, 0.0, 0.0]
+            amplitudes = [0.0, 0.0, 0.0]
+            for axis, (rate, amplitude) in enumerate((
+                    (tex_oscillator.UOscillationRate, tex_oscillator.UOscillationAmplitude),
+                    (tex_oscillator.VOscillationRate, tex_oscillator.VOscillationAmplitude))):
+                if rate != 0 and amplitude != 0:
+                    rates[axis] = rate
+                    amplitudes[axis] = amplitude
+            if not any(amplitudes):
+                return None
+            oscillation_node = self._add_node_group_node(ensure_bdk_oscillation_node_tree())
+            oscillation_node.inputs['Rate'].default_value = rates
+            oscillation_node.inputs['Amplitude'].default_value = amplitudes
+            oscillation_node.inputs['Offset'].default_value = (offset, offset, offset)
+            return oscillation_node.outputs['Value']
 
         if tex_oscillator.UOscillationType == ETexOscillationType.OT_Pan:
-            vector_transform_node.operation = 'ADD'
-            if tex_oscillator.UOscillationRate != 0 and tex_oscillator.UOscillationAmplitude != 0:
-                add_driver_to_vector_transform_input(
-                    get_driver_expression_for_pan(tex_oscillator.UOscillationRate,
-                                                  tex_oscillator.UOscillationAmplitude), 0)
-            if tex_oscillator.VOscillationRate != 0 and tex_oscillator.VOscillationAmplitude != 0:
-                add_driver_to_vector_transform_input(
-                    get_driver_expression_for_pan(tex_oscillator.VOscillationRate,
-                                                  tex_oscillator.VOscillationAmplitude), 1)
+            oscillation_socket = add_oscillation_node(0.0)
+            if oscillation_socket is not None:
+                self._node_tree.links.new(uv_transform_node.inputs['Translation'], oscillation_socket)
         elif tex_oscillator.UOscillationType == ETexOscillationType.OT_Jitter:
-            vector_transform_node.operation = 'ADD'
             # same as add, but weird
             pass
-        elif tex_oscillator.UOscillationType == ETexOscillationType.OT_Stretch:
-            vector_transform_node.operation = 'MULTIPLY'
-            if tex_oscillator.UOscillationRate != 0 and tex_oscillator.UOscillationAmplitude != 0:
-                add_driver_to_vector_transform_input(
-                    get_driver_expression_for_stretch(tex_oscillator.UOscillationRate,
-                                                      tex_oscillator.UOscillationAmplitude), 0)
-            if tex_oscillator.VOscillationRate != 0 and tex_oscillator.VOscillationAmplitude != 0:
-                add_driver_to_vector_transform_input(
-                    get_driver_expression_for_stretch(tex_oscillator.VOscillationRate,
-                                                      tex_oscillator.VOscillationAmplitude), 1)
-        elif tex_oscillator.UOscillationType == ETexOscillationType.OT_StretchRepeat:
-            vector_transform_node.operation = 'MULTIPLY'
-            # same as stretch, but weird...
-            pass
+        elif tex_oscillator.UOscillationType in (ETexOscillationType.OT_Stretch, ETexOscillationType.OT_StretchRepeat):
+            # TODO: stretch repeat is the same as stretch, but weird...
+            oscillation_socket = add_oscillation_node(1.0)
+            if oscillation_socket is not None:
+                self._node_tree.links.new(uv_transform_node.inputs['Scale'], oscillation_socket)
 
         return material_outputs
 
     def _import_tex_panner(self, tex_panner: UTexPanner, socket_inputs: MaterialSocketInputs) -> MaterialSocketOutputs:
-        vector_rotate_node = self._node_tree.nodes.new('ShaderNodeVectorRotate')
-        vector_rotate_node.rotation_type = 'EULER_XYZ'
-        vector_rotate_node.inputs['Rotation'].default_value = tex_panner.PanDirection.get_radians()
+        material = self.load_material(tex_panner.Material)
 
-        vector_add_node = self._node_tree.nodes.new('ShaderNodeVectorMath')
-        vector_add_node.operation = 'ADD'
+        if not self._is_uv_socket_consumed(material):
+            # Nothing samples the transformed UVs, so there's no need to add the nodes that transform them.
+            return self._import_material(material, socket_inputs)
 
-        fcurve = vector_add_node.inputs[1].driver_add('default_value', 0)
-        fcurve.driver.expression = f'(frame / bpy.context.scene.render.fps) * {tex_panner.PanRate}'
+        uv_panner_node = self._add_node_group_node(ensure_bdk_uv_panner_node_tree())
+        uv_panner_node.inputs['Direction'].default_value = tex_panner.PanDirection.get_radians()
+        uv_panner_node.inputs['Rate'].default_value = tex_panner.PanRate
 
         # TODO: there are strange interactions with stacking multiple UV modifiers, handle this later
-        self._node_tree.links.new(vector_add_node.inputs[0], vector_rotate_node.outputs['Vector'])
-
         if socket_inputs.uv_source_socket:
-            self._node_tree.links.new(vector_rotate_node.inputs[0], socket_inputs.uv_source_socket)
+            self._node_tree.links.new(uv_panner_node.inputs['UV'], socket_inputs.uv_source_socket)
 
-        socket_inputs.uv_socket = vector_add_node.outputs['Vector']
+        socket_inputs.uv_socket = uv_panner_node.outputs['UV']
 
-        material = self.load_material(tex_panner.Material)
         material_outputs = self._import_material(material, socket_inputs)
 
         return material_outputs
 
     def _import_tex_rotator(self, tex_rotator: UTexRotator,
                             socket_inputs: MaterialSocketInputs) -> MaterialSocketOutputs:
-        vector_rotate_node = self._node_tree.nodes.new('ShaderNodeVectorRotate')
-        vector_rotate_node.rotation_type = 'EULER_XYZ'
+        material = self.load_material(tex_rotator.Material)
 
-        socket_inputs.uv_socket = vector_rotate_node.outputs['Vector']
+        if not self._is_uv_socket_consumed(material):
+            # Nothing samples the transformed UVs, so there's no need to add the nodes that transform them.
+            return self._import_material(material, socket_inputs)
+
+        uv_rotator_node = self._add_node_group_node(ensure_bdk_uv_rotator_node_tree())
+
+        socket_inputs.uv_socket = uv_rotator_node.outputs['UV']
 
-        material = self.load_material(tex_rotator.Material)
         material_outputs = self._import_material(material, socket_inputs)
 
         if material_outputs is None:
@@ -616,58 +676,43 @@ class MaterialBuilder:
 
         u = tex_rotator.UOffset / material_outputs.size[0]
         v = tex_rotator.VOffset / material_outputs.size[1]
-        vector_rotate_node.inputs['Center'].default_value = (u, v, 0.0)
+        uv_rotator_node.inputs['Center'].default_value = (u, v, 0.0)
 
         rotation_radians = tex_rotator.Rotation.get_radians()
 
-        def add_driver_to_vector_rotate_rotation_input(expression: str, index: int):
-            fcurve = vector_rotate_node.inputs['Rotation'].driver_add('default_value', index)
-            fcurve.driver.expression = expression
-
         if tex_rotator.TexRotationType == ETexRotationType.TR_FixedRotation:
-            vector_rotate_node.inputs['Rotation'].default_value = rotation_radians
+            uv_rotator_node.inputs['Rotation'].default_value = rotation_radians
         elif tex_rotator.TexRotationType == ETexRotationType.TR_OscillatingRotation:
-            amplitude_radians = tex_rotator.OscillationAmplitude.get_radians()
-            rate_radians = tex_rotator.OscillationRate.get_radians()
-            for i, (amplitude, rate) in enumerate(zip(amplitude_radians, rate_radians)):
-                if amplitude != 0 or rate != 0:
-                    add_driver_to_vector_rotate_rotation_input(
-                        f'sin(frame / bpy.context.scene.render.fps * {rate}) * {amplitude}', i)
+            uv_rotator_node.inputs['Oscillation Rate'].default_value = tex_rotator.OscillationRate.get_radians()
+            uv_rotator_node.inputs['Oscillation Amplitude'].default_value = \
+                tex_rotator.OscillationAmplitude.get_radians()
         elif tex_rotator.TexRotationType == ETexRotationType.TR_ConstantlyRotating:
-            for i, radians in enumerate(rotation_radians):
-                if radians != 0:
-                    add_driver_to_vector_rotate_rotation_input(f'(frame / bpy.context.scene.render.fps) * {radians}', i)
+            uv_rotator_node.inputs['Rotation Rate'].default_value = rotation_radians
 
-        self._node_tree.links.new(vector_rotate_node.inputs['Vector'], socket_inputs.uv_source_socket)
+        self._node_tree.links.new(uv_rotator_node.inputs['UV'], socket_inputs.uv_source_socket)
 
         return material_outputs
 
     def _import_tex_scaler(self, tex_scaler: UTexScaler, socket_inputs: MaterialSocketInputs) -> MaterialSocketOutputs:
-        vector_subtract_node = self._node_tree.nodes.new('ShaderNodeVectorMath')
-        vector_subtract_node.operation = 'SUBTRACT'
-        vector_add_node = self._node_tree.nodes.new('ShaderNodeVectorMath')
-        vector_add_node.operation = 'ADD'
-        vector_transform_node = self._node_tree.nodes.new('ShaderNodeVectorMath')
-        vector_transform_node.operation = 'MULTIPLY'
-        vector_transform_node.inputs[1].default_value = (1.0 / tex_scaler.UScale, 1.0 / tex_scaler.VScale, 0.0)
+        material = self.load_material(tex_scaler.Material)
 
-        offset_node = self._node_tree.nodes.new('ShaderNodeCombineXYZ')
+        if not self._is_uv_socket_consumed(material):
+            # Nothing samples the transformed UVs, so there's no need to add the nodes that transform them.
+            return self._import_material(material, socket_inputs)
 
-        if socket_inputs.uv_source_socket is not None:
-            self._node_tree.links.new(vector_subtract_node.inputs[0], socket_inputs.uv_source_socket)
+        uv_transform_node = self._add_node_group_node(ensure_bdk_uv_transform_node_tree())
+        uv_transform_node.inputs['Scale'].default_value = (1.0 / tex_scaler.UScale, 1.0 / tex_scaler.VScale, 0.0)
 
-        self._node_tree.links.new(vector_add_node.inputs[0], vector_transform_node.outputs[0])
-        self._node_tree.links.new(vector_transform_node.inputs[0], vector_subtract_node.outputs[0])
-        self._node_tree.links.new(vector_subtract_node.inputs[1], offset_node.outputs['Vector'])
-        self._node_tree.links.new(vector_add_node.inputs[1], offset_node.outputs['Vector'])
+        if socket_inputs.uv_source_socket is not None:
+            self._node_tree.links.new(uv_transform_node.inputs['UV'], socket_inputs.uv_source_socket)
 
-        socket_inputs.uv_socket = vector_add_node.outputs['Vector']
+        socket_inputs.uv_socket = uv_transform_node.outputs['UV']
 
-        material = self.load_material(tex_scaler.Material)
         material_outputs = self._import_material(material, socket_inputs)
 
-        offset_node.inputs['X'].default_value = tex_scaler.UOffset / material_outputs.size[0]
-        offset_node.inputs['Y'].default_value = tex_scaler.VOffset / material_outputs.size[1]
+        uv_transform_node.inputs['Center'].default_value = (tex_scaler.UOffset / material_outputs.size[0],
+                                                            tex_scaler.VOffset / material_outputs.size[1],
+                                                            0.0)
 
         return material_outputs
 
@@ -691,8 +736,10 @@ class MaterialBuilder:
         elif texture.UClampMode == ETexClampMode.TC_Wrap:
             image_node.extension = 'REPEAT'
 
-        # Detail texture
-        detail_material = None if texture.Detail is None else self.load_material(texture.Detail)
+        # Detail texture (this only affects the color, so it is not built if only the alpha is consumed)
+        detail_material = None
+        if MaterialOutput.COLOR in socket_inputs.outputs and texture.Detail is not None:
+            detail_material = self.load_material(texture.Detail)
         if detail_material is not None:
             outputs.color_socket = self._import_detail_material(detail_material, texture.DetailScale,
                                                                 image_node.outputs['Color'],
@@ -716,73 +763,26 @@ class MaterialBuilder:
 
         return outputs
 
-    def _import_material_switch(self, material_switch: UMaterialSwitch, socket_inputs: MaterialSocketInputs) -> MaterialSocketOutputs:
-        node_tree = self._node_tree
-        current_value_node = node_tree.nodes.new('ShaderNodeValue')
-        current_value_node.outputs['Value'].default_value = material_switch.Current  # TODO: in future this could be driven by a driver?
-
-        # Truncate and Modulo the current value node.
-        truncate_node = node_tree.nodes.new('ShaderNodeMath')
-        truncate_node.operation = 'FLOOR'
-        node_tree.links.new(truncate_node.inputs[0], current_value_node.outputs['Value'])
-
-        modulo_node = node_tree.nodes.new('ShaderNodeMath')
-        modulo_node.operation = 'MODULO'
-        modulo_node.inputs[1].default_value = len(material_switch.Materials)
-        node_tree.links.new(modulo_node.inputs[0], truncate_node.outputs['Value'])
-
-        current_socket = modulo_node.outputs['Value']
-        last_color_socket: Optional[NodeSocket] = None
-        last_alpha_socket: Optional[NodeSocket] = None
-
-        materials = []
-        material_outputs = []
-
-        for switch_index, switch_material in reversed(list(enumerate(material_switch.Materials))):
-            # Add a new compare node and compare the current value to the switch index.
-            compare_node = node_tree.nodes.new('ShaderNodeMath')
-            compare_node.operation = 'COMPARE'
-            compare_node.inputs[1].default_value = switch_index
-            node_tree.links.new(compare_node.inputs[0], current_socket)
-
-            material = self.load_material(switch_material)
-            outputs = self._import_material(material, socket_inputs)
-
-            # Add a mix color node.
-            mix_rgb_node = node_tree.nodes.new('ShaderNodeMixRGB')
-            mix_rgb_node.data_type = 'RGBA'
-            node_tree.links.new(mix_rgb_node.inputs['Fac'], compare_node.outputs['Value'])
-            node_tree.links.new(mix_rgb_node.inputs['Color2'], outputs.color_socket)
-            if last_color_socket is not None:
-                # Hook up the color socket of the material output to the Color1 input of the mix color node.
-                node_tree.links.new(mix_rgb_node.inputs['Color1'], last_color_socket)
-
-            # Add a mix alpha node.
-            mix_alpha_node = node_tree.nodes.new('ShaderNodeMixRGB')
-            mix_alpha_node.data_type = 'FLOAT'
-            node_tree.links.new(mix_alpha_node.inputs[0], compare_node.outputs['Value'])
-            node_tree.links.new(mix_alpha_node.inputs[3], outputs.alpha_socket)  # B
-            if last_alpha_socket is not None:
-                node_tree.links.new(mix_alpha_node.inputs[1], last_alpha_socket)
-
-            last_color_socket = mix_rgb_node.outputs[0]
-            last_alpha_socket = mix_alpha_node.outputs[0] # TODO: one of these is wrong...
-
-            materials.append(material)
-            material_outputs.append(outputs)
-
-        outputs = MaterialSocketOutputs()
-        outputs.color_socket = last_color_socket
-        outputs.alpha_socket = last_alpha_socket
-        outputs.size = material_outputs[material_switch.Current].size   # TODO: make this the max size of all materials
-        outputs.use_backface_culling = material_outputs[material_switch.Current].use_backface_culling  # TODO: make this...i dunno lol
-        outputs.blend_method = material_outputs[material_switch.Current].blend_method
-
-        return outputs
-
+    def _import_material_switch(self, material_switch: UMaterialSwitch,
+                                socket_inputs: MaterialSocketInputs) -> Optional[MaterialSocketOutputs]:
+        # The current material is a constant, so the other materials can never be switched to and are not built.
+        # TODO: in future this could be driven by a driver, in which case all the materials would need to be built.
+        consumed_outputs = get_consumed_outputs(material_switch, socket_inputs.outputs)
+        current_index = get_material_switch_current_index(material_switch)
+        current_name = f'Materials[{current_index}]'
+        if current_name not in consumed_outputs:
+            return None
+        return self._import_sub_material(material_switch.Materials[current_index], socket_inputs,
+                                         consumed_outputs[current_name])
 
     def _import_variable_tex_panner(self, variable_tex_panner: UVariableTexPanner,
                                     socket_inputs: MaterialSocketInputs) -> Optional[MaterialSocketOutputs]:
+        material = self.load_material(variable_tex_panner.Material)
+
+        if not self._is_uv_socket_consumed(material):
+            # Nothing samples the panned UVs, so there's no need to add the nodes that pan them.
+            return self._import_material(material, copy.copy(socket_inputs))
+
         vector_rotate_node = self._node_tree.nodes.new('ShaderNodeVectorRotate')
         vector_rotate_node.rotation_type = 'EULER_XYZ'
         vector_rotate_node.inputs['Rotation'].default_value = variable_tex_panner.PanDirection.get_radians()
@@ -793,12 +793,7 @@ class MaterialBuilder:
         multiply_node.operation = 'MULTIPLY'
         multiply_node.inputs[1].default_value = variable_tex_panner.PanRate
 
-        value_node = self._node_tree.nodes.new('ShaderNodeValue')
-
-        fcurve = value_node.outputs[0].driver_add('default_value')
-        fcurve.driver.expression = 'frame / bpy.context.scene.render.fps'
-
-        self._node_tree.links.new(multiply_node.inputs[0], value_node.outputs['Value'])
+        self._node_tree.links.new(multiply_node.inputs[0], self._get_time_socket())
         self._node_tree.links.new(combine_xyz_node.inputs['X'], multiply_node.outputs['Value'])
         self._node_tree.links.new(vector_rotate_node.inputs['Vector'], combine_xyz_node.outputs['Vector'])
 
@@ -818,12 +813,7 @@ class MaterialBuilder:
 
             socket_inputs.uv_socket = add_node.outputs['Vector']
 
-        if variable_tex_panner.Material is not None:
-            material = self.load_material(variable_tex_panner.Material)
-            material_outputs = self._import_material(material, copy.copy(socket_inputs))
-            return material_outputs
-
-        return None
+        return self._import_material(material, copy.copy(socket_inputs))
 
     def _import_vertex_color(self, _: UVertexColor, __: MaterialSocketInputs) -> MaterialSocketOutputs:
         vertex_color_node = self._node_tree.nodes.new('ShaderNodeAttribute')
@@ -839,32 +829,58 @@ class MaterialBuilder:
     def _import_material(self, material: UMaterial, inputs: MaterialSocketInputs) -> Optional[MaterialSocketOutputs]:
         if material is None:
             return None
+
+        # The same material imported with the same UV inputs & consumed outputs would produce an identical chain of
+        # nodes, so reuse the outputs of the chain that has already been built (e.g., the same texture used by multiple
+        # combiners).
+        key = (str(material.Reference), _get_socket_key(inputs.uv_source_socket), _get_socket_key(inputs.uv_socket),
+               int(inputs.outputs))
+        if key in self._material_outputs:
+            outputs = self._material_outputs[key]
+            # Callers modify the outputs they are given, so hand out a copy.
+            return copy.copy(outputs) if outputs is not None else None
+
         material_import_function = self._material_type_importers.get(type(material), None)
         if material_import_function is None:
             raise NotImplementedError(f'No importer registered for type "{type(material)}"')
-        return material_import_function(material, inputs)
+        outputs = material_import_function(material, inputs)
 
-    def build(self, material: UMaterial, uv_source_socket: Optional[NodeSocket]) -> Optional[MaterialSocketOutputs]:
+        self._material_outputs[key] = copy.copy(outputs) if outputs is not None else None
+
+        return outputs
+
+    def build(self, material: UMaterial, uv_source_socket: Optional[NodeSocket],
+              outputs: Optional[MaterialOutput] = None) -> Optional[MaterialSocketOutputs]:
+        """
+        Builds the nodes for the material. Only the nodes that contribute to the given outputs of the material are
+        built. By default, the color is built, as well as the alpha if the material is masked or blended.
+        """
+        if material is not None:
+            # Read the entire dependency tree up-front so that building the nodes does not wait on file reads.
+            self.prefetch(get_material_references(material))
+        if outputs is None:
+            outputs = MaterialOutput.COLOR
+            if get_material_blend_method(material, self.load_material) in ('CLIP', 'BLEND'):
+                outputs |= MaterialOutput.ALPHA
         inputs = MaterialSocketInputs()
         inputs.uv_source_socket = uv_source_socket
+        inputs.outputs = outputs
         return self._import_material(material, inputs=inputs)
 
 
 def _add_shader_from_outputs(node_tree: NodeTree, outputs: MaterialSocketOutputs) -> Optional[NodeSocket]:
-    diffuse_node = node_tree.nodes.new('ShaderNodeBsdfDiffuse')
+    shader_node = node_tree.nodes.new('ShaderNodeGroup')
+    shader_node.node_tree = ensure_bdk_material_shader_node_tree()
     if outputs.color_socket:
-        node_tree.links.new(diffuse_node.inputs['Color'], outputs.color_socket)
+        node_tree.links.new(shader_node.inputs['Color'], outputs.color_socket)
 
     if outputs.blend_method in ['CLIP', 'BLEND']:
-        transparent_node = node_tree.nodes.new('ShaderNodeBsdfTransparent')
-        mix_node = node_tree.nodes.new('ShaderNodeMixShader')
         if outputs.alpha_socket:
-            node_tree.links.new(mix_node.inputs['Fac'], outputs.alpha_socket)
-        node_tree.links.new(mix_node.inputs[1], transparent_node.outputs['BSDF'])
-        node_tree.links.new(mix_node.inputs[2], diffuse_node.outputs['BSDF'])
-        return mix_node.outputs['Shader']
-    else:
-        return diffuse_node.outputs['BSDF']
+            node_tree.links.new(shader_node.inputs['Alpha'], outputs.alpha_socket)
+        else:
+            shader_node.inputs['Alpha'].default_value = 0.5
+
+    return shader_node.outputs['Shader']
 
 
 class BDK_OT_material_import(Operator, ImportHelper):
@@ -883,6 +899,11 @@ class BDK_OT_material_import(Operator, ImportHelper):
         maxlen=1024,
         default=''
     )
+    should_use_texture_proxies: BoolProperty(
+        name='Use Texture Proxies',
+        description='Use the downscaled texture proxies if they are enabled for the repository',
+        default=True
+    )
 
     # TODO: use only a single asset library; it makes no sense to go searching in asset libraries unrelated to the
     #  current repository.
@@ -902,7 +923,7 @@ class BDK_OT_material_import(Operator, ImportHelper):
             self.report({'ERROR_INVALID_CONTEXT'}, f'Repository with ID "{self.repository_id}" not found.')
             return {'CANCELLED'}
 
-        material_cache = MaterialCache(get_repository_cache_directory(repository))
+        material_cache = get_repository_material_cache(context, repository)
 
         # Get an Unreal reference from the file path.
         reference = UReference.from_path(Path(self.filepath))
@@ -914,6 +935,7 @@ class BDK_OT_material_import(Operator, ImportHelper):
 
         # Add custom property with Unreal reference.
         material_data.bdk.package_reference = str(reference)
+        get_package_reference_index().add_material(material_data)
 
         node_tree = material_data.node_tree
         node_tree.nodes.clear()
@@ -924,7 +946,9 @@ class BDK_OT_material_import(Operator, ImportHelper):
         tex_coord_node = node_tree.nodes.new('ShaderNodeTexCoord')
 
         # Build the material.
-        material_builder = MaterialBuilder([material_cache], node_tree)
+        material_builder = MaterialBuilder([material_cache], node_tree,
+                                           texture_proxy_size=get_texture_proxy_size(repository)
+                                           if self.should_use_texture_proxies else 0)
         outputs = material_builder.build(unreal_material, uv_source_socket=tex_coord_node.outputs['UV'])
 
         # Make a new function to do the conversion from Color & Alpha socket to Shader.
@@ -0,0 +1,102 @@
+from pathlib import Path
+from typing import Optional, Tuple
+
+import bpy
+from bpy.types import Context, Material
+
+from .analysis import get_material_backface_culling, get_material_blend_method, get_material_size
+from .cache import get_repository_material_cache
+from ..bdk.repository.kernel import read_package_asset_manifest
+from ..data import UReference
+from ..helpers import get_blend_file_for_package, get_repository_by_id, get_active_repository_id
+
+
+class MaterialMetadata:
+    """
+    The properties of a material that are otherwise only known once its node tree has been built.
+
+    These are written to the asset manifest of each package library when the package is built (see `bin/blend.py`), so
+    that they can be looked up without linking the material.
+    """
+
+    def __init__(self, size: Tuple[int, int] = (1, 1), blend_method: str = 'OPAQUE',
+                 use_backface_culling: bool = False):
+        self.size = size
+        self.blend_method = blend_method
+        self.use_backface_culling = use_backface_culling
+
+    @staticmethod
+    def from_dict(data: dict) -> 'MaterialMetadata':
+        width, height = data.get('size', (1, 1))
+        return MaterialMetadata((width, height), data.get('blend_method', 'OPAQUE'),
+                                data.get('use_backface_culling', False))
+
+    @staticmethod
+    def from_material(material: Material) -> 'MaterialMetadata':
+        return MaterialMetadata((material.bdk.size_x, material.bdk.size_y), material.blend_method,
+                                material.use_backface_culling)
+
+
+def _get_library_material_metadata(blend_file: str, name: str) -> Optional[MaterialMetadata]:
+    asset_manifest = read_package_asset_manifest(Path(blend_file))
+    if asset_manifest is None:
+        return None
+    data = asset_manifest.material_metadata.get(name, None)
+    return MaterialMetadata.from_dict(data) if data is not None else None
+
+
+def get_material_metadata(material: Optional[Material]) -> Optional[MaterialMetadata]:
+    """
+    Returns the metadata of a BDK material, or None if it is not a BDK material.
+
+    Linked materials whose library file is missing are placeholders without any of the BDK properties, so their
+    metadata is read from the asset manifest of the library instead.
+    """
+    if material is None:
+        return None
+    if material.library is not None and material.is_missing:
+        library_path = bpy.path.abspath(material.library.filepath)
+        metadata = _get_library_material_metadata(library_path, material.name)
+        if metadata is None:
+            # The library may have been rebuilt elsewhere. Library files are named after their package.
+            metadata = get_material_metadata_for_reference(bpy.context, f'{Path(library_path).stem}.{material.name}')
+        return metadata
+    if material.bdk.package_reference == '':
+        return None
+    return MaterialMetadata.from_material(material)
+
+
+def get_material_metadata_for_reference(context: Context, reference: str,
+                                        repository_id: Optional[str] = None) -> Optional[MaterialMetadata]:
+    """
+    Looks up the metadata of a material in the repository without linking or building it.
+
+    The metadata is read from the asset manifest of the package library if the package has been built. Otherwise, it is
+    derived from the material's properties in the repository's exports, which requires the reference to have a type.
+    """
+    reference = UReference.from_string(reference)
+    if reference is None:
+        return None
+
+    if repository_id is None:
+        repository_id = get_active_repository_id(context)
+
+    blend_file = get_blend_file_for_package(context, reference.package_name, repository_id)
+    if blend_file is not None:
+        metadata = _get_library_material_metadata(blend_file, reference.object_name)
+        if metadata is not None:
+            return metadata
+
+    repository = get_repository_by_id(context, repository_id)
+    if repository is None or reference.type_name is None:
+        # The exported material can't be found without its type.
+        return None
+
+    material_cache = get_repository_material_cache(context, repository)
+    unreal_material = material_cache.load_material(reference)
+    if unreal_material is None:
+        return None
+    load_material = material_cache.load_material
+    return MaterialMetadata(get_material_size(unreal_material, load_material) or (1, 1),
+                            get_material_blend_method(unreal_material, load_material),
+                            get_material_backface_culling(unreal_material, load_material))
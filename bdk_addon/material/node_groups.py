@@ -0,0 +1,214 @@
+import math
+
+import bpy
+from bpy.types import NodeTree, NodeSocket
+
+from ..node_helpers import ensure_shader_node_tree, ensure_input_and_output_nodes, add_math_operation_nodes, \
+    add_vector_math_operation_nodes, add_combine_xyz_node
+
+
+def ensure_bdk_time_node_tree() -> NodeTree:
+    """
+    Ensures that the shared "BDK Time" node group exists. This outputs the current scene time in seconds.
+
+    All time-dependent material nodes (panners, oscillators, rotators etc.) are driven by this node group so that there
+    is only a single driver to evaluate per frame, instead of a scripted driver per animated socket.
+    """
+    items = (
+        ('OUTPUT', 'NodeSocketFloat', 'Time'),
+    )
+
+    def build_function(node_tree: NodeTree):
+        _, output_node = ensure_input_and_output_nodes(node_tree)
+
+        # Remove any drivers left over from a previous build of the node tree.
+        if node_tree.animation_data is not None:
+            for fcurve in list(node_tree.animation_data.drivers):
+                node_tree.animation_data.drivers.remove(fcurve)
+
+        time_node = node_tree.nodes.new('ShaderNodeValue')
+        time_node.label = 'Time'
+
+        # The frame rate is read from the active scene with context property variables rather than from `bpy.context`
+        # in the expression, so that the driver is evaluated as a simple expression, without the Python interpreter.
+        # Unlike variables that target a scene ID, these don't hold a reference to the scene the node tree was built in
+        # (e.g., the scene of a package library file, which would then be linked along with any material that uses it).
+        driver = time_node.outputs['Value'].driver_add('default_value').driver
+        driver.type = 'SCRIPTED'
+        for name, data_path in (('fps', 'render.fps'), ('fps_base', 'render.fps_base')):
+            variable = driver.variables.new()
+            variable.name = name
+            variable.type = 'CONTEXT_PROP'
+            target = variable.targets[0]
+            target.context_property = 'ACTIVE_SCENE'
+            target.data_path = data_path
+        driver.expression = 'frame * fps_base / fps'
+
+        node_tree.links.new(output_node.inputs['Time'], time_node.outputs['Value'])
+
+    return ensure_shader_node_tree('BDK Time', items, build_function)
+
+
+def _add_time_node(node_tree: NodeTree) -> NodeSocket:
+    time_node = node_tree.nodes.new('ShaderNodeGroup')
+    time_node.node_tree = ensure_bdk_time_node_tree()
+    return time_node.outputs['Time']
+
+
+def ensure_bdk_uv_transform_node_tree() -> NodeTree:
+    """
+    Ensures that the "BDK UV Transform" node group exists. This scales the UV coordinates about a center point and then
+    translates them (i.e., `(UV - Center) * Scale + Translation + Center`), as done by texture scalers & oscillators.
+    """
+    items = (
+        ('OUTPUT', 'NodeSocketVector', 'UV'),
+        ('INPUT', 'NodeSocketVector', 'UV'),
+        ('INPUT', 'NodeSocketVector', 'Center'),
+        ('INPUT', 'NodeSocketVector', 'Scale', None, (1.0, 1.0, 1.0)),
+        ('INPUT', 'NodeSocketVector', 'Translation'),
+    )
+
+    def build_function(node_tree: NodeTree):
+        input_node, output_node = ensure_input_and_output_nodes(node_tree)
+
+        uv_socket = add_vector_math_operation_nodes(node_tree, 'SUBTRACT', [input_node.outputs['UV'],
+                                                                            input_node.outputs['Center']])
+        uv_socket = add_vector_math_operation_nodes(node_tree, 'MULTIPLY_ADD', [uv_socket,
+                                                                                input_node.outputs['Scale'],
+                                                                                input_node.outputs['Translation']])
+        uv_socket = add_vector_math_operation_nodes(node_tree, 'ADD', [uv_socket, input_node.outputs['Center']])
+
+        node_tree.links.new(output_node.inputs['UV'], uv_socket)
+
+    return ensure_shader_node_tree('BDK UV Transform', items, build_function)
+
+
+def ensure_bdk_oscillation_node_tree() -> NodeTree:
+    """
+    Ensures that the "BDK Oscillation" node group exists. This outputs `Offset + sin(time * Rate * 2 * pi) * Amplitude`
+    for each axis, where the rate is in cycles per second.
+    """
+    items = (
+        ('OUTPUT', 'NodeSocketVector', 'Value'),
+        ('INPUT', 'NodeSocketVector', 'Rate'),
+        ('INPUT', 'NodeSocketVector', 'Amplitude'),
+        ('INPUT', 'NodeSocketVector', 'Offset'),
+    )
+
+    def build_function(node_tree: NodeTree):
+        input_node, output_node = ensure_input_and_output_nodes(node_tree)
+
+        phase_socket = add_math_operation_nodes(node_tree, 'MULTIPLY', [_add_time_node(node_tree), math.tau])
+        phase_socket = add_vector_math_operation_nodes(node_tree, 'SCALE', {0: input_node.outputs['Rate'],
+                                                                           'Scale': phase_socket})
+        sine_socket = add_vector_math_operation_nodes(node_tree, 'SINE', [phase_socket])
+        value_socket = add_vector_math_operation_nodes(node_tree, 'MULTIPLY_ADD', [sine_socket,
+                                                                                   input_node.outputs['Amplitude'],
+                                                                                   input_node.outputs['Offset']])
+
+        node_tree.links.new(output_node.inputs['Value'], value_socket)
+
+    return ensure_shader_node_tree('BDK Oscillation', items, build_function)
+
+
+def ensure_bdk_uv_panner_node_tree() -> NodeTree:
+    """
+    Ensures that the "BDK UV Panner" node group exists. This rotates the UV coordinates by the pan direction and then
+    pans them along the U axis at the given rate (in UV units per second).
+    """
+    items = (
+        ('OUTPUT', 'NodeSocketVector', 'UV'),
+        ('INPUT', 'NodeSocketVector', 'UV'),
+        ('INPUT', 'NodeSocketVector', 'Direction'),
+        ('INPUT', 'NodeSocketFloat', 'Rate'),
+    )
+
+    def build_function(node_tree: NodeTree):
+        input_node, output_node = ensure_input_and_output_nodes(node_tree)
+
+        vector_rotate_node = node_tree.nodes.new('ShaderNodeVectorRotate')
+        vector_rotate_node.rotation_type = 'EULER_XYZ'
+        node_tree.links.new(vector_rotate_node.inputs['Vector'], input_node.outputs['UV'])
+        node_tree.links.new(vector_rotate_node.inputs['Rotation'], input_node.outputs['Direction'])
+
+        pan_socket = add_math_operation_nodes(node_tree, 'MULTIPLY', [_add_time_node(node_tree),
+                                                                      input_node.outputs['Rate']])
+        pan_socket = add_combine_xyz_node(node_tree, pan_socket)
+        uv_socket = add_vector_math_operation_nodes(node_tree, 'ADD', [vector_rotate_node.outputs['Vector'],
+                                                                       pan_socket])
+
+        node_tree.links.new(output_node.inputs['UV'], uv_socket)
+
+    return ensure_shader_node_tree('BDK UV Panner', items, build_function)
+
+
+def ensure_bdk_uv_rotator_node_tree() -> NodeTree:
+    """
+    Ensures that the "BDK UV Rotator" node group exists. This rotates the UV coordinates about a center point by
+    `Rotation + time * Rotation Rate + sin(time * Oscillation Rate) * Oscillation Amplitude`, which covers the fixed,
+    constant and oscillating rotation types of texture rotators. All the angles are in radians.
+    """
+    items = (
+        ('OUTPUT', 'NodeSocketVector', 'UV'),
+        ('INPUT', 'NodeSocketVector', 'UV'),
+        ('INPUT', 'NodeSocketVector', 'Center'),
+        ('INPUT', 'NodeSocketVector', 'Rotation'),
+        ('INPUT', 'NodeSocketVector', 'Rotation Rate'),
+        ('INPUT', 'NodeSocketVector', 'Oscillation Rate'),
+        ('INPUT', 'NodeSocketVector', 'Oscillation Amplitude'),
+    )
+
+    def build_function(node_tree: NodeTree):
+        input_node, output_node = ensure_input_and_output_nodes(node_tree)
+
+        time_socket = _add_time_node(node_tree)
+
+        rotation_socket = add_vector_math_operation_nodes(node_tree, 'SCALE', {0: input_node.outputs['Rotation Rate'],
+                                                                              'Scale': time_socket})
+        rotation_socket = add_vector_math_operation_nodes(node_tree, 'ADD', [input_node.outputs['Rotation'],
+                                                                             rotation_socket])
+        phase_socket = add_vector_math_operation_nodes(node_tree, 'SCALE', {0: input_node.outputs['Oscillation Rate'],
+                                                                           'Scale': time_socket})
+        sine_socket = add_vector_math_operation_nodes(node_tree, 'SINE', [phase_socket])
+        rotation_socket = add_vector_math_operation_nodes(node_tree, 'MULTIPLY_ADD', [
+            sine_socket, input_node.outputs['Oscillation Amplitude'], rotation_socket])
+
+        vector_rotate_node = node_tree.nodes.new('ShaderNodeVectorRotate')
+        vector_rotate_node.rotation_type = 'EULER_XYZ'
+        node_tree.links.new(vector_rotate_node.inputs['Vector'], input_node.outputs['UV'])
+        node_tree.links.new(vector_rotate_node.inputs['Center'], input_node.outputs['Center'])
+        node_tree.links.new(vector_rotate_node.inputs['Rotation'], rotation_socket)
+
+        node_tree.links.new(output_node.inputs['UV'], vector_rotate_node.outputs['Vector'])
+
+    return ensure_shader_node_tree('BDK UV Rotator', items, build_function)
+
+
+def ensure_bdk_material_shader_node_tree() -> NodeTree:
+    """
+    Ensures that the "BDK Material Shader" node group exists. This converts the color and alpha of a material to a
+    shader, mixing a diffuse shader with a transparent one by the alpha. With the default alpha of 1.0, the output is
+    just the diffuse shader, as used for opaque materials.
+    """
+    items = (
+        ('OUTPUT', 'NodeSocketShader', 'Shader'),
+        ('INPUT', 'NodeSocketColor', 'Color', None, (0.8, 0.8, 0.8, 1.0)),
+        ('INPUT', 'NodeSocketFloat', 'Alpha', None, 1.0),
+    )
+
+    def build_function(node_tree: NodeTree):
+        input_node, output_node = ensure_input_and_output_nodes(node_tree)
+
+        diffuse_node = node_tree.nodes.new('ShaderNodeBsdfDiffuse')
+        node_tree.links.new(diffuse_node.inputs['Color'], input_node.outputs['Color'])
+
+        transparent_node = node_tree.nodes.new('ShaderNodeBsdfTransparent')
+
+        mix_node = node_tree.nodes.new('ShaderNodeMixShader')
+        node_tree.links.new(mix_node.inputs['Fac'], input_node.outputs['Alpha'])
+        node_tree.links.new(mix_node.inputs[1], transparent_node.outputs['BSDF'])
+        node_tree.links.new(mix_node.inputs[2], diffuse_node.outputs['BSDF'])
+
+        node_tree.links.new(output_node.inputs['Shader'], mix_node.outputs['Shader'])
+
+    return ensure_shader_node_tree('BDK Material Shader', items, build_function)
@@ -2,6 +2,7 @@ from bpy.types import Operator, Context
 from bpy.props import StringProperty
 
 from ..helpers import load_bdk_material
+from .warmup import get_scene_material_closure, link_missing_static_meshes, preload_images
 
 
 # This is a wrapper for linking a material
@@ -20,6 +21,41 @@ class BDK_OT_link_material(Operator):
         return {'FINISHED'}
 
 
+class BDK_OT_scene_materials_warm_up(Operator):
+    bl_idname = 'bdk.scene_materials_warm_up'
+    bl_label = 'Warm Up Materials'
+    bl_description = 'Re-link the static meshes whose library file is missing, read all the materials that the BDK ' \
+                     'objects in the scene depend on into the material cache and pre-load their images, so that the ' \
+                     'first interaction with the level does not have to'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context: Context):
+        wm = context.window_manager
+        wm.progress_begin(0, 100)
+
+        # Re-link the missing static meshes first so that their materials are part of the closure.
+        linked_count = link_missing_static_meshes(context, context.scene.objects)
+        wm.progress_update(5)
+
+        closure = get_scene_material_closure(context, context.scene)
+        wm.progress_update(20)
+
+        def progress_cb(current: int, total: int):
+            wm.progress_update(20 + (80 * current) // total)
+
+        image_count = preload_images(closure.images, progress_cb=progress_cb)
+
+        wm.progress_end()
+
+        self.report({'INFO'}, f'Re-linked {linked_count} static meshes | '
+                              f'{len(closure.materials)} materials ({len(closure.references)} references, '
+                              f'{closure.unresolved_reference_count} unresolved) | '
+                              f'Pre-loaded {image_count} of {len(closure.images)} images')
+
+        return {'FINISHED'}
+
+
 classes = (
     BDK_OT_link_material,
+    BDK_OT_scene_materials_warm_up,
 )
@@ -2,64 +2,118 @@ import enum
 import typing
 from pathlib import Path
 from typing import get_type_hints, Any
-from ..convert_props_txt_to_json import parse_props_txt_file_content
+from ..convert_props_txt_to_json import parse_props_txt_file
+from ..io.props_cache import PropsCache
 from .data import UMaterial, URotator, MaterialTypeRegistry, UReference, UColor
 
 
 def transform_value(property_type: type, value: Any) -> typing.Optional[Any]:
-    if property_type == int:
-        return int(value)
-    elif property_type == bool:
-        return bool(value)
-    elif property_type == float:
-        return float(value)
-    elif property_type == str:
-        return value
-    elif property_type.__class__ == enum.EnumMeta:
-        return property_type[str(value).split(' ')[0]]
-    elif property_type.__class__ == typing._UnionGenericAlias and len(property_type.__args__) == 2 and \
-            property_type.__args__[1] == type(None):
-        if value is None:
-            return None
-        return transform_value(property_type.__args__[0], value)
-    elif property_type == URotator:
-        rotator = URotator()
-        rotator.Roll = value['Roll']
-        rotator.Pitch = value['Pitch']
-        rotator.Yaw = value['Yaw']
-        return rotator
-    elif property_type == UReference:
-        return UReference.from_string(value)
-    elif property_type == UColor:
-        return UColor(r=value['R'], g=value['G'], b=value['B'], a=value['A'])
-    else:
+    return get_value_decoder(property_type)(value)
+
+
+def _decode_rotator(value: Any) -> URotator:
+    rotator = URotator()
+    rotator.Roll = value['Roll']
+    rotator.Pitch = value['Pitch']
+    rotator.Yaw = value['Yaw']
+    return rotator
+
+
+def _decode_color(value: Any) -> UColor:
+    return UColor(r=value['R'], g=value['G'], b=value['B'], a=value['A'])
+
+
+def _decode_str(value: Any) -> Any:
+    return value
+
+
+_value_decoders: typing.Dict[Any, typing.Callable[[Any], Any]] = {
+    int: int,
+    bool: bool,
+    float: float,
+    str: _decode_str,
+    URotator: _decode_rotator,
+    UReference: UReference.from_string,
+    UColor: _decode_color,
+}
+
+
+def get_value_decoder(property_type: type) -> typing.Callable[[Any], Any]:
+    """
+    Returns a function that converts a parsed property value to the given property type.
+    """
+    decoder = _value_decoders.get(property_type, None)
+    if decoder is not None:
+        return decoder
+
+    if isinstance(property_type, enum.EnumMeta):
+        def decode_enum(value: Any):
+            return property_type[str(value).split(' ')[0]]
+        return decode_enum
+
+    args = typing.get_args(property_type)
+    if typing.get_origin(property_type) is typing.Union and len(args) == 2 and args[1] is type(None):
+        value_decoder = get_value_decoder(args[0])
+
+        def decode_optional(value: Any):
+            if value is None:
+                return None
+            return value_decoder(value)
+        return decode_optional
+
+    # Only raise an error if a property of this type is actually encountered.
+    def decode_unhandled(_value: Any):
         raise RuntimeError(f'Unhandled type: {property_type}')
+    return decode_unhandled
+
+
+# Map of material types to a map of property names to value decoders.
+_material_decoders: typing.Dict[type, typing.Dict[str, typing.Callable[[Any], Any]]] = dict()
 
 
-def read_material(path: str) -> UMaterial:
+def get_material_decoders(material_type: type) -> typing.Dict[str, typing.Callable[[Any], Any]]:
+    """
+    Returns the value decoders for each of the properties of the material type.
+    These are compiled from the type hints once per material type.
+    """
+    decoders = _material_decoders.get(material_type, None)
+    if decoders is None:
+        decoders = {name: get_value_decoder(property_type) for name, property_type in get_type_hints(material_type).items()}
+        _material_decoders[material_type] = decoders
+    return decoders
+
+
+def read_material(path: str, props_cache: typing.Optional[PropsCache] = None) -> UMaterial:
     # We are assuming that the file structure is laid out as it is by default in umodel exports.
-    type_string = Path(path).parts[-2]
-    material_type = MaterialTypeRegistry.get_type_from_string(type_string)
+    reference = UReference.from_path(Path(path))
+
+    # Read the .props.txt file into a property dictionary
+    properties = parse_props_txt_file(path, props_cache)
+    return read_material_from_properties(reference, properties)
+
+
+def read_material_from_properties(reference: UReference, properties: typing.Dict[str, Any]) -> UMaterial:
+    """
+    Creates a material from an already parsed property dictionary (e.g., from a package's props index).
+    """
+    material_type = MaterialTypeRegistry.get_type_from_string(reference.type_name)
 
     if material_type is None:
-        raise ValueError(f'Unhandled material type: {type_string}')
+        raise ValueError(f'Unhandled material type: {reference.type_name}')
 
     if not issubclass(material_type, UMaterial):
         raise TypeError(f'{material_type} is not a subclass of UMaterial')
 
-    # Read the .props.txt file into a property dictionary
-    with open(path, 'r') as file:
-        properties = parse_props_txt_file_content(file.read())
-        reference = UReference.from_path(Path(path))
-        material = material_type(reference)
-        material_type_hints = get_type_hints(type(material))
-
-        for name, value in properties.items():
-            try:
-                property_type = material_type_hints[name]
-                value = transform_value(property_type, value)
-                setattr(material, name, value)
-            except KeyError:
-                continue
-
-        return material
+    material = material_type(reference)
+    decoders = get_material_decoders(material_type)
+
+    for name, value in properties.items():
+        decoder = decoders.get(name, None)
+        if decoder is None:
+            continue
+        try:
+            setattr(material, name, decoder(value))
+        except KeyError:
+            continue
+
+    return material
@@ -0,0 +1,174 @@
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+import bpy
+from bpy.types import Collection, Context, Image, Material, NodeTree, Object, Scene
+
+from .cache import MaterialCache, get_material_references, get_repository_material_cache
+from .data import UCubemap, UTexture
+from ..data import UReference
+from ..helpers import get_active_repository, get_terrain_info, load_bdk_static_meshes
+
+
+class MaterialClosure:
+    """
+    The materials & images that the BDK objects in a scene depend on.
+    """
+
+    def __init__(self):
+        # The materials used by the objects in the scene.
+        self.materials: Set[Material] = set()
+        # The images used by the node trees of the materials (including the node groups they use).
+        self.images: Set[Image] = set()
+        # The references of the materials used by the objects in the scene, along with all the materials & textures
+        # that they reference in turn (e.g., the diffuse texture of a shader).
+        self.references: Set[str] = set()
+        # The number of references in the closure that could not be read from the repository.
+        self.unresolved_reference_count = 0
+
+
+def _iter_collection_objects(collection: Collection, visited: Set[Collection]) -> Iterator[Object]:
+    if collection in visited:
+        return
+    visited.add(collection)
+    for obj in collection.all_objects:
+        yield obj
+        if obj.instance_type == 'COLLECTION' and obj.instance_collection is not None:
+            yield from _iter_collection_objects(obj.instance_collection, visited)
+
+
+def _iter_object_materials(obj: Object) -> Iterator[Optional[Material]]:
+    for material_slot in obj.material_slots:
+        yield material_slot.material
+    if obj.bdk.type == 'TERRAIN_INFO':
+        terrain_info = get_terrain_info(obj)
+        for paint_layer in terrain_info.paint_layers:
+            yield paint_layer.material
+    elif obj.bdk.type == 'PROJECTOR':
+        yield obj.bdk.projector.proj_texture
+    elif obj.bdk.type == 'FLUID_SURFACE':
+        yield obj.bdk.fluid_surface.material
+
+
+def _iter_node_tree_images(node_tree: Optional[NodeTree], visited: Set[NodeTree]) -> Iterator[Image]:
+    if node_tree is None or node_tree in visited:
+        return
+    visited.add(node_tree)
+    for node in node_tree.nodes:
+        if node.bl_idname in ('ShaderNodeTexImage', 'ShaderNodeTexEnvironment') and node.image is not None:
+            yield node.image
+        elif node.bl_idname == 'ShaderNodeGroup':
+            yield from _iter_node_tree_images(node.node_tree, visited)
+
+
+def _get_missing_static_mesh_reference(obj: Object) -> Optional[str]:
+    """
+    Returns the reference of the static mesh that the object instances, if its library file is missing.
+    """
+    collection = obj.instance_collection
+    if obj.instance_type != 'COLLECTION' or collection is None or collection.library is None \
+            or not collection.library.is_missing:
+        return None
+    # The placeholder of a missing collection has no objects to read the reference from, but the library files are
+    # named after their package and the static mesh collections after their object (see `bin/blend.py`).
+    package_name = Path(bpy.path.abspath(collection.library.filepath)).stem
+    return f'StaticMesh\'{package_name}.{collection.name}\''
+
+
+def link_missing_static_meshes(context: Context, objects: Iterable[Object]) -> int:
+    """
+    Re-links the static meshes instanced by the objects whose library file is missing (e.g., because the package
+    library has moved since the level was saved) from the repository in a single batch, so that each library is opened
+    once. Returns the number of objects that were re-linked.
+    """
+    instances: Dict[str, List[Object]] = dict()
+    for obj in objects:
+        reference = _get_missing_static_mesh_reference(obj)
+        if reference is not None:
+            instances.setdefault(reference, []).append(obj)
+    if not instances:
+        return 0
+    count = 0
+    for reference, collection in load_bdk_static_meshes(context, instances.keys()).items():
+        if collection is None or collection.is_missing:
+            continue
+        for obj in instances[reference]:
+            obj.instance_collection = collection
+            count += 1
+    return count
+
+
+def _add_reference_closure(closure: MaterialClosure, material_cache: MaterialCache, references: Iterable[str]):
+    # Read all the materials in the closure from the repository in parallel first, so that walking it does not wait on
+    # file reads.
+    pending = [UReference.from_string(reference) for reference in references]
+    material_cache.prefetch(pending)
+    while pending:
+        reference = pending.pop()
+        if reference is None or str(reference) in closure.references:
+            continue
+        closure.references.add(str(reference))
+        material = material_cache.load_material(reference)
+        if material is None:
+            closure.unresolved_reference_count += 1
+            continue
+        if isinstance(material, UTexture) and not isinstance(material, UCubemap) and material.Reference is not None:
+            # The texture's image is part of the closure too.
+            closure.references.add(str(material.Reference))
+        pending.extend(get_material_references(material))
+
+
+def get_scene_material_closure(context: Context, scene: Scene) -> MaterialClosure:
+    """
+    Computes the closure of the materials & images used by the objects in the scene: the materials of meshes (including
+    those of instanced static meshes), terrain paint layers, projectors and fluid surfaces, the images of their node
+    trees, and the repository materials & textures that they reference.
+    """
+    closure = MaterialClosure()
+
+    for obj in _iter_collection_objects(scene.collection, set()):
+        for material in _iter_object_materials(obj):
+            if material is not None:
+                closure.materials.add(material)
+
+    # This includes the node groups of the terrain paint layers, since the terrain material is in a material slot.
+    visited_node_trees: Set[NodeTree] = set()
+    for material in closure.materials:
+        closure.images.update(_iter_node_tree_images(material.node_tree, visited_node_trees))
+
+    repository = get_active_repository(context)
+    if repository is not None:
+        package_references = set(material.bdk.package_reference for material in closure.materials
+                                 if material.bdk.package_reference)
+        _add_reference_closure(closure, get_repository_material_cache(context, repository), package_references)
+
+    return closure
+
+
+def preload_image(image: Image) -> bool:
+    """
+    Reads the pixels of the image, and uploads them to the GPU if there is one, so that the first draw that uses the
+    image does not need to. Returns whether the image could be loaded.
+    """
+    if image.source not in ('FILE', 'SEQUENCE', 'TILED') or image.is_missing:
+        return False
+    if not bpy.app.background:
+        # This reads the pixels as well.
+        return image.gl_load() == 0
+    # Getting the size of an image reads its pixels if they have not been read yet.
+    return image.size[0] > 0 and image.has_data
+
+
+def preload_images(images: Iterable[Image], progress_cb: Optional[Callable[[int, int], None]] = None) -> int:
+    """
+    Pre-loads the images, calling `progress_cb` with the number of images done & the total after each one. Returns the
+    number of images that were loaded.
+    """
+    images = list(images)
+    count = 0
+    for index, image in enumerate(images):
+        if preload_image(image):
+            count += 1
+        if progress_cb is not None:
+            progress_cb(index + 1, len(images))
+    return count
@@ -212,9 +212,9 @@ def ensure_node_tree(name: str,
     """
     Gets or creates a node tree with the given name, type, inputs and outputs.
     """
-    if name in bpy.data.node_groups:
-        node_tree = bpy.data.node_groups[name]
-    else:
+    # Only look up local node groups, since linked ones (e.g., from a package library) are read-only.
+    node_tree = bpy.data.node_groups.get((name, None), None)
+    if node_tree is None:
         node_tree = bpy.data.node_groups.new(name=name, type=node_group_type)
 
     # Compare the inputs and outputs of the node tree with the given inputs and outputs.
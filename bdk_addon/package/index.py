@@ -0,0 +1,165 @@
+import bpy
+from bpy.app.handlers import persistent
+from bpy.types import ID, Material, Mesh, Collection
+from typing import Dict, Optional, Tuple
+
+from ..data import UReference
+
+
+# Unreal names are case-insensitive, so the keys are the upper-cased package and object names.
+PackageReferenceKey = Tuple[str, str]
+
+
+def get_package_reference_key(reference: UReference) -> PackageReferenceKey:
+    return reference.package_name.upper(), reference.object_name.upper()
+
+
+class PackageReferenceIndex:
+    """
+    An index of package references to the materials, meshes and collections in the blend data (both local and linked).
+
+    The index is built by scanning the blend data on the first lookup after it has been invalidated (by the undo & file
+    load handlers). After that, it is kept up to date by adding the data-blocks as the BDK links or creates them, and
+    entries for data-blocks that have since been removed are dropped when they are looked up.
+
+    Data-blocks can also be added without going through the BDK (e.g., by dragging a material from the asset browser).
+    To catch these, a lookup that misses rescans the blend data once if the number of data-blocks of that type has
+    changed since the last scan, so that lookups of data-blocks that really are missing stay cheap.
+    """
+
+    def __init__(self):
+        self._is_dirty = True
+        # The number of data-blocks of each type as of the last scan.
+        self._counts: Tuple[int, int, int] = (0, 0, 0)
+        self._materials: Dict[PackageReferenceKey, Material] = {}
+        self._meshes: Dict[PackageReferenceKey, Mesh] = {}
+        self._collections: Dict[PackageReferenceKey, Collection] = {}
+
+    def invalidate(self):
+        self._is_dirty = True
+
+    @staticmethod
+    def _is_alive(datablock: ID) -> bool:
+        try:
+            # Accessing a removed data-block raises a ReferenceError.
+            _ = datablock.name
+            return True
+        except ReferenceError:
+            return False
+
+    def _add(self, index: Dict[PackageReferenceKey, ID], reference: Optional[UReference], datablock: ID):
+        if reference is None:
+            return
+        key = get_package_reference_key(reference)
+        existing = index.get(key, None)
+        # Linked data-blocks take precedence over local ones, since they are the canonical copy of the asset.
+        if existing is None or not self._is_alive(existing) or \
+                (existing.library is None and datablock.library is not None):
+            index[key] = datablock
+
+    def _add_collection(self, collection: Collection) -> bool:
+        # Static mesh collections are named after the object they contain.
+        for obj in collection.objects:
+            if not obj.bdk.package_reference:
+                continue
+            reference = UReference.from_string(obj.bdk.package_reference)
+            if reference is not None and reference.object_name == collection.name:
+                self._add(self._collections, reference, collection)
+                return True
+        return False
+
+    def _rebuild(self):
+        self._materials.clear()
+        self._meshes.clear()
+        self._collections.clear()
+
+        for material in bpy.data.materials:
+            if material.bdk.package_reference:
+                self._add(self._materials, UReference.from_string(material.bdk.package_reference), material)
+
+        # The names of static mesh data-blocks are their package references (see `bin/blend.py`).
+        for mesh in bpy.data.meshes:
+            if "'" in mesh.name:
+                self._add(self._meshes, UReference.from_string(mesh.name), mesh)
+
+        for collection in bpy.data.collections:
+            self._add_collection(collection)
+
+        self._counts = self._get_counts()
+        self._is_dirty = False
+
+    @staticmethod
+    def _get_counts() -> Tuple[int, int, int]:
+        return len(bpy.data.materials), len(bpy.data.meshes), len(bpy.data.collections)
+
+    def _find(self, index: Dict[PackageReferenceKey, ID], reference: UReference, count_index: int) -> Optional[ID]:
+        if self._is_dirty:
+            self._rebuild()
+        key = get_package_reference_key(reference)
+        datablock = index.get(key, None)
+        if datablock is not None and not self._is_alive(datablock):
+            del index[key]
+            datablock = None
+        if datablock is None and self._get_counts()[count_index] != self._counts[count_index]:
+            # The data-block may have been added without going through the BDK.
+            self._rebuild()
+            datablock = index.get(key, None)
+        return datablock
+
+    def find_material(self, reference: UReference) -> Optional[Material]:
+        return self._find(self._materials, reference, 0)
+
+    def find_mesh(self, reference: UReference) -> Optional[Mesh]:
+        return self._find(self._meshes, reference, 1)
+
+    def find_collection(self, reference: UReference) -> Optional[Collection]:
+        return self._find(self._collections, reference, 2)
+
+    def add_material(self, material: Material):
+        """
+        Adds a material that was linked or created by the BDK to the index.
+        """
+        if not self._is_dirty and material.bdk.package_reference:
+            self._add(self._materials, UReference.from_string(material.bdk.package_reference), material)
+
+    def add_collection(self, collection: Collection):
+        """
+        Adds a static mesh collection that was linked by the BDK to the index, along with the meshes of its objects.
+        """
+        if self._is_dirty or not self._add_collection(collection):
+            return
+        for obj in collection.objects:
+            if obj.type == 'MESH' and "'" in obj.data.name:
+                self._add(self._meshes, UReference.from_string(obj.data.name), obj.data)
+
+
+_package_reference_index = PackageReferenceIndex()
+
+
+def get_package_reference_index() -> PackageReferenceIndex:
+    return _package_reference_index
+
+
+@persistent
+def _invalidate_handler(*_args):
+    _package_reference_index.invalidate()
+
+
+_handlers = (
+    (bpy.app.handlers.undo_post, _invalidate_handler),
+    (bpy.app.handlers.redo_post, _invalidate_handler),
+    (bpy.app.handlers.load_post, _invalidate_handler),
+)
+
+
+def register_handlers():
+    for handlers, handler in _handlers:
+        if handler not in handlers:
+            handlers.append(handler)
+    _package_reference_index.invalidate()
+
+
+def unregister_handlers():
+    for handlers, handler in _handlers:
+        if handler in handlers:
+            handlers.remove(handler)
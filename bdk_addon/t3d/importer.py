@@ -1,4 +1,5 @@
 import math
+import os
 import uuid
 
 import bpy
@@ -9,7 +10,7 @@ import numpy as np
 from t3dpy import T3dObject, T3dReference, read_t3d
 from bpy.types import Context, Object, Mesh, Image, Camera, WindowManager, Collection
 from mathutils import Matrix
-from typing import List, Optional, Dict, Any, cast, Type
+from typing import List, Optional, Dict, Any, cast, Type, Set, Tuple
 
 from ..fluid_surface.operators import create_fluid_surface_object
 from ..bsp.data import ORIGIN_ATTRIBUTE_NAME, TEXTURE_U_ATTRIBUTE_NAME, TEXTURE_V_ATTRIBUTE_NAME, \
@@ -23,7 +24,9 @@ from ..terrain.builder import create_terrain_info_object
 from ..terrain.layers import add_terrain_paint_layer, add_terrain_deco_layer
 from ..terrain.kernel import ensure_paint_layers, ensure_deco_layers
 from ..data import URotator, UReference
-from ..helpers import load_bdk_static_mesh, load_bdk_material
+from ..helpers import load_bdk_static_mesh, load_bdk_material, load_bdk_static_meshes, load_bdk_materials
+from ..package.index import get_package_reference_index
+from ..io.tga import read_tga, to_rgba
 from ..units import unreal_to_radians
 
 
@@ -141,8 +144,8 @@ def poly_list_to_mesh(context: Context, name: str, poly_list: T3dObject, pre_piv
 
         if material_reference is not None:
             if material_reference not in materials:
-                # TODO: there are performance issues with load_bdk_material that probably make copy-pasting
-                #  large T3D brush payloads very slow because of the I/O bottleneck.
+                # NOTE: The materials are batch-linked before the actors are imported (see `import_t3d`), so this does
+                #  not need to touch the disk.
                 materials[material_reference] = load_bdk_material(context, material_reference)
         else:
             materials[None] = None
@@ -496,7 +499,9 @@ class TerrainInfoImporter(ActorImporter):
 
             load_bdk_static_mesh(context, str(static_mesh_reference))
 
-            deco_mesh_data = bpy.data.meshes.get(str(static_mesh_reference), None)
+            deco_mesh_data = None
+            if static_mesh_reference is not None:
+                deco_mesh_data = get_package_reference_index().find_mesh(static_mesh_reference)
 
             if deco_mesh_data is None:
                 print(f'Could not find static mesh data for deco layer {deco_mesh_data} ({static_mesh_reference})')
@@ -639,6 +644,28 @@ def get_actor_type_importer(actor_class: str) -> Type[ActorImporter]:
     return __actor_type_importers__.get(actor_class, DefaultActorImporter)
 
 
+def get_image_rgba_pixels(image: Image) -> np.ndarray:
+    """
+    Returns the 8-bit pixels of the image as an array of shape (height * width, 4), in the same order as `Image.pixels`
+    (i.e., the bottom row first).
+
+    Unmodified TGA images are read straight from their files, which is much faster than going through `Image.pixels`.
+    """
+    if image.source == 'FILE' and image.packed_file is None and not image.is_dirty:
+        file_path = bpy.path.abspath(image.filepath)
+        if file_path.lower().endswith('.tga') and os.path.isfile(file_path):
+            try:
+                pixels = to_rgba(read_tga(file_path))
+                return pixels[::-1].reshape((-1, 4))
+            except IOError as e:
+                print(f'Failed to read {file_path}, falling back to the image pixels: {e}')
+    if image.channels != 4:
+        raise RuntimeError('image does not have an alpha channel!')
+    pixels = np.empty(len(image.pixels), dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    return np.rint(pixels * 255.0).astype(np.uint8).reshape((-1, 4))
+
+
 def height_map_data_from_image(image: Image) -> np.array:
     """
     Converts a 16-bit image to a normalized height map.
@@ -646,19 +673,44 @@ def height_map_data_from_image(image: Image) -> np.array:
     :param image:
     :return:
     """
-    r = [int(x * 255) for x in list(image.pixels)[0::4]]
-    g = [int(x * 255) for x in list(image.pixels)[1::4]]
-    h = []
-    for i in range(len(r)):
-        b = (r[i] << 8) | g[i]
-        h.append(b / 65536)
-    return np.array(h, dtype=float)
+    pixels = get_image_rgba_pixels(image).astype(np.uint32)
+    return ((pixels[:, 0] << 8) | pixels[:, 1]) / 65536
 
 
 def get_alpha_data_from_image(image: Image) -> np.array:
-    if image.channels != 4:
-        raise RuntimeError('image does not have an alpha channel!')
-    return np.array(list(image.pixels)[3::4], dtype=float)
+    return get_image_rgba_pixels(image)[:, 3] / 255.0
+
+
+def get_t3d_package_references(t3d_objects: List[T3dObject]) -> Tuple[Set[str], Set[str]]:
+    """
+    Recursively gathers the material and static mesh references used by the given T3D objects.
+    :return: A tuple of the material references and the static mesh references.
+    """
+    material_references: Set[str] = set()
+    static_mesh_references: Set[str] = set()
+
+    def gather(t3d_object: T3dObject):
+        properties = t3d_object.properties
+        if 'StaticMesh' in properties:
+            static_mesh_references.add(str(properties['StaticMesh']))
+        for _, texture_reference in properties.get('Skins', []):
+            material_references.add(str(texture_reference))
+        for key in ('Texture', 'ProjTexture'):
+            if key in properties:
+                material_references.add(str(properties[key]))
+        for _, layer in properties.get('Layers', []):
+            if 'Texture' in layer:
+                material_references.add(str(layer['Texture']))
+        for _, deco_layer in properties.get('DecoLayers', []):
+            if 'StaticMesh' in deco_layer:
+                static_mesh_references.add(str(deco_layer['StaticMesh']))
+        for child in t3d_object.children:
+            gather(child)
+
+    for t3d_object in t3d_objects:
+        gather(t3d_object)
+
+    return material_references, static_mesh_references
 
 
 def import_t3d(window_manager: WindowManager, contents: str, context: Context):
@@ -759,6 +811,14 @@ def import_t3d(window_manager: WindowManager, contents: str, context: Context):
     t3d_objects: List[T3dObject] = read_t3d(contents)
 
     print(f'T3DMap reading completed')
+
+    # Link all the referenced assets up-front so that each package library is only opened once, instead of once for
+    # every reference as the actors are imported.
+    material_references, static_mesh_references = get_t3d_package_references(t3d_objects)
+    print(f'Linking {len(material_references)} materials and {len(static_mesh_references)} static meshes...')
+    load_bdk_materials(context, material_references)
+    load_bdk_static_meshes(context, static_mesh_references)
+
     print(f'Importing {len(t3d_objects)} objects...')
 
     window_manager.progress_begin(0, len(t3d_objects))
@@ -1,18 +1,20 @@
+import hashlib
+import re
 from pathlib import Path
 
 import bmesh
 import bpy
-from bpy.types import Mesh, Object, NodeTree, Context
-from typing import cast, Union, Optional, Tuple, Iterator
+from bpy.types import Mesh, Object, NodeTree, Context, Node, NodeSocket
+from typing import cast, Union, Optional, Tuple, Iterator, Dict, List
 import uuid
 import numpy as np
 
-from ..bdk.repository.kernel import get_repository_cache_directory
 from ..bdk.repository.properties import BDK_PG_repository
 from ..helpers import get_terrain_info, get_addon_preferences, get_active_repository
 from ..node_helpers import ensure_shader_node_tree, ensure_input_and_output_nodes
 from ..data import UReference
-from ..material.cache import MaterialCache
+from ..material.analysis import MaterialOutput
+from ..material.cache import MaterialCache, get_repository_material_cache, get_texture_proxy_size
 from ..material.importer import MaterialBuilder
 
 
@@ -67,10 +69,110 @@ def _ensure_terrain_paint_layer_uv_group_node() -> NodeTree:
 
         node_tree.links.new(output_node.inputs['UV'], rotate_node.outputs['Vector'])
 
-    return ensure_shader_node_tree('BDK TerrainLayerUV', items, build_function, should_force_build=True)
+    return ensure_shader_node_tree('BDK TerrainLayerUV', items, build_function)
+
+
+def _get_paint_layer_material_node_tree_name(reference: UReference) -> str:
+    # Node tree names are limited to 63 characters, so the full reference can't be used as the name.
+    digest = hashlib.sha1(str(reference).encode()).hexdigest()[:8]
+    return f'BDK Terrain Layer {reference.object_name[:32]} {digest}'
+
+
+# The generations of the material caches that each paint layer material node tree was last built from in this session,
+# keyed by the node tree name. Material caches are replaced when their repository is exported or rebuilt, so a node tree
+# built from a different cache is rebuilt to pick up any changes to the material.
+_paint_layer_material_node_tree_cache_generations: Dict[str, Tuple[int, ...]] = dict()
+
+
+def _ensure_paint_layer_material_node_tree(reference: UReference, material_caches: List[MaterialCache],
+                                           texture_proxy_size: int = 0) -> NodeTree:
+    """
+    Ensures that the node group for a paint layer material exists. This outputs the color of the material mapped onto
+    the terrain with the given UV parameters. Paint layers that use the same material share the same node group.
+    """
+    items = (
+        ('OUTPUT', 'NodeSocketColor', 'Color'),
+        ('INPUT', 'NodeSocketFloat', 'UScale'),
+        ('INPUT', 'NodeSocketFloat', 'VScale'),
+        ('INPUT', 'NodeSocketFloat', 'TextureRotation'),
+        ('INPUT', 'NodeSocketFloat', 'TerrainScale'),
+    )
+
+    def build_function(node_tree: NodeTree):
+        input_node, output_node = ensure_input_and_output_nodes(node_tree)
+
+        paint_layer_uv_node = node_tree.nodes.new('ShaderNodeGroup')
+        paint_layer_uv_node.node_tree = _ensure_terrain_paint_layer_uv_group_node()
+
+        for input_name in ('UScale', 'VScale', 'TextureRotation', 'TerrainScale'):
+            node_tree.links.new(paint_layer_uv_node.inputs[input_name], input_node.outputs[input_name])
+
+        material_builder = MaterialBuilder(material_caches, node_tree, texture_proxy_size=texture_proxy_size)
+        unreal_material = material_builder.load_material(reference)
+
+        if unreal_material is None:
+            print(f'WARNING: Could not load material ({reference}) for paint layer')
+
+        material_outputs = material_builder.build(unreal_material, paint_layer_uv_node.outputs['UV'],
+                                                  outputs=MaterialOutput.COLOR)
+
+        if material_outputs and material_outputs.color_socket:
+            node_tree.links.new(output_node.inputs['Color'], material_outputs.color_socket)
+
+    name = _get_paint_layer_material_node_tree_name(reference)
+    cache_generations = tuple(material_cache.generation for material_cache in material_caches)
+    should_force_build = _paint_layer_material_node_tree_cache_generations.get(name, None) != cache_generations
+    node_tree = ensure_shader_node_tree(name, items, build_function, should_force_build)
+    _paint_layer_material_node_tree_cache_generations[name] = cache_generations
+    return node_tree
+
+
+def _ensure_paint_layer_node(node_tree: NodeTree, paint_layer_id: str, suffix: str, node_type: str) -> Node:
+    name = f'{paint_layer_id}.{suffix}'
+    node = node_tree.nodes.get(name, None)
+    if node is None or node.bl_idname != node_type:
+        if node is not None:
+            node_tree.nodes.remove(node)
+        node = node_tree.nodes.new(node_type)
+        node.name = name
+    return node
+
+
+def _ensure_link(node_tree: NodeTree, from_socket: Optional[NodeSocket], to_socket: NodeSocket):
+    """
+    Links the sockets, or unlinks the input socket if `from_socket` is None. Nothing is changed if the sockets are
+    already linked, so that the node tree is not needlessly updated.
+    """
+    links = to_socket.links
+    if from_socket is not None and len(links) == 1 and links[0].from_socket == from_socket:
+        return
+    for link in links:
+        node_tree.links.remove(link)
+    if from_socket is not None:
+        node_tree.links.new(to_socket, from_socket)
+
+
+def _remove_stale_drivers(node_tree: NodeTree):
+    """
+    Removes the drivers of the nodes that no longer exist in the node tree.
+    """
+    if node_tree.animation_data is None:
+        return
+    for fcurve in list(node_tree.animation_data.drivers):
+        match = re.match(r'nodes\["(.+?)"\]', fcurve.data_path)
+        if match is not None and match.group(1) not in node_tree.nodes:
+            node_tree.animation_data.drivers.remove(fcurve)
 
 
 def build_terrain_material(terrain_info_object: Object):
+    """
+    Builds the terrain material from the paint layers of the terrain info object.
+
+    The material is updated incrementally: the nodes of each paint layer are named after the paint layer's ID and
+    reused across builds, and the materials themselves are built once into node groups that are shared by all the
+    paint layers that use them. Only the nodes & links of paint layers that were added, removed, moved or changed are
+    updated.
+    """
     terrain_info = get_terrain_info(terrain_info_object)
     if terrain_info is None:
         raise RuntimeError('Invalid object')
@@ -82,7 +184,15 @@ def build_terrain_material(terrain_info_object: Object):
     material = mesh_data.materials[0]
 
     node_tree = material.node_tree
-    node_tree.nodes.clear()
+
+    # Remove the nodes of paint layers that no longer exist (as well as any nodes from a non-incremental build).
+    paint_layer_ids = set(paint_layer.id for paint_layer in paint_layers)
+    for node in list(node_tree.nodes):
+        if node.name == 'Material Output' and node.bl_idname == 'ShaderNodeOutputMaterial':
+            continue
+        if node.name.split('.', 1)[0] not in paint_layer_ids:
+            node_tree.nodes.remove(node)
+    _remove_stale_drivers(node_tree)
 
     last_shader_socket = None
 
@@ -90,71 +200,90 @@ def build_terrain_material(terrain_info_object: Object):
     repository = get_active_repository(bpy.context)
 
     material_caches = []
+    texture_proxy_size = 0
     if repository is not None:
-        material_caches.append(MaterialCache(get_repository_cache_directory(repository)))
-    material_builder = MaterialBuilder(material_caches, node_tree)
+        material_caches.append(get_repository_material_cache(bpy.context, repository))
+        texture_proxy_size = get_texture_proxy_size(repository)
 
     def add_paint_layer_input_driver(node, input_prop: Union[str | int], paint_layer_prop: str):
+        # The driver may already exist from a previous build, in which case only the target is updated, since the
+        # index of the paint layer may have changed.
         fcurve = node.inputs[input_prop].driver_add('default_value')
         fcurve.driver.type = 'AVERAGE'
-        variable = fcurve.driver.variables.new()
+        if len(fcurve.driver.variables) == 0:
+            fcurve.driver.variables.new()
+        variable = fcurve.driver.variables[0]
         variable.type = 'SINGLE_PROP'
         target = variable.targets[0]
         target.id_type = 'OBJECT'
         target.id = terrain_info_object
-        target.data_path = f'bdk.terrain_info.paint_layers[{paint_layer_index}].{paint_layer_prop}'
+        data_path = f'bdk.terrain_info.paint_layers[{paint_layer_index}].{paint_layer_prop}'
+        if target.data_path != data_path:
+            target.data_path = data_path
+
+    # Load the materials of all the paint layers (and everything they reference) up-front.
+    for material_cache in material_caches:
+        material_cache.prefetch(UReference.from_string(paint_layer.material.bdk.package_reference)
+                                for paint_layer in paint_layers
+                                if paint_layer.material and paint_layer.material.bdk.package_reference)
 
     for paint_layer_index, paint_layer in enumerate(paint_layers):
         material = paint_layer.material
-        material_outputs = None
+        color_socket = None
 
         if material and material.bdk.package_reference:
-            paint_layer_uv_node = node_tree.nodes.new('ShaderNodeGroup')
-            paint_layer_uv_node.node_tree = _ensure_terrain_paint_layer_uv_group_node()
-
-            add_paint_layer_input_driver(paint_layer_uv_node, 'UScale', 'u_scale')
-            add_paint_layer_input_driver(paint_layer_uv_node, 'VScale', 'v_scale')
-            add_paint_layer_input_driver(paint_layer_uv_node, 'TextureRotation', 'texture_rotation')
-
-            paint_layer_uv_node.inputs['TerrainScale'].default_value = terrain_info.terrain_scale
-
             reference = UReference.from_string(material.bdk.package_reference)
 
-            unreal_material = material_builder.load_material(reference)
-
-            if unreal_material is None:
-                print(f'WARNING: Could not load material ({reference}) for paint layer {paint_layer_index}')
-
-            material_outputs = material_builder.build(unreal_material, paint_layer_uv_node.outputs['UV'])
-
-        color_attribute_node = node_tree.nodes.new('ShaderNodeVertexColor')
-        color_attribute_node.layer_name = paint_layer.id
-
-        hide_node = node_tree.nodes.new('ShaderNodeMath')
-        hide_node.operation = 'MULTIPLY'
+            paint_layer_material_node = _ensure_paint_layer_node(node_tree, paint_layer.id, 'material',
+                                                                 'ShaderNodeGroup')
+            paint_layer_material_node_tree = _ensure_paint_layer_material_node_tree(reference, material_caches,
+                                                                                    texture_proxy_size)
+            if paint_layer_material_node.node_tree != paint_layer_material_node_tree:
+                paint_layer_material_node.node_tree = paint_layer_material_node_tree
+
+            add_paint_layer_input_driver(paint_layer_material_node, 'UScale', 'u_scale')
+            add_paint_layer_input_driver(paint_layer_material_node, 'VScale', 'v_scale')
+            add_paint_layer_input_driver(paint_layer_material_node, 'TextureRotation', 'texture_rotation')
+
+            terrain_scale_socket = paint_layer_material_node.inputs['TerrainScale']
+            if terrain_scale_socket.default_value != terrain_info.terrain_scale:
+                terrain_scale_socket.default_value = terrain_info.terrain_scale
+
+            color_socket = paint_layer_material_node.outputs['Color']
+        else:
+            paint_layer_material_node = node_tree.nodes.get(f'{paint_layer.id}.material', None)
+            if paint_layer_material_node is not None:
+                node_tree.nodes.remove(paint_layer_material_node)
+                _remove_stale_drivers(node_tree)
+
+        color_attribute_node = _ensure_paint_layer_node(node_tree, paint_layer.id, 'color_attribute',
+                                                        'ShaderNodeVertexColor')
+        if color_attribute_node.layer_name != paint_layer.id:
+            color_attribute_node.layer_name = paint_layer.id
+
+        hide_node = _ensure_paint_layer_node(node_tree, paint_layer.id, 'hide', 'ShaderNodeMath')
+        if hide_node.operation != 'MULTIPLY':
+            hide_node.operation = 'MULTIPLY'
         add_paint_layer_input_driver(hide_node, 1, 'is_visible')
 
-        node_tree.links.new(hide_node.inputs[0], color_attribute_node.outputs['Color'])
-
-        diffuse_node = node_tree.nodes.new('ShaderNodeBsdfDiffuse')
-        mix_shader_node = node_tree.nodes.new('ShaderNodeMixShader')
-
-        if material_outputs and material_outputs.color_socket:
-            node_tree.links.new(diffuse_node.inputs['Color'], material_outputs.color_socket)
-
-        node_tree.links.new(mix_shader_node.inputs['Fac'], hide_node.outputs['Value'])
+        _ensure_link(node_tree, color_attribute_node.outputs['Color'], hide_node.inputs[0])
 
-        if last_shader_socket is not None:
-            node_tree.links.new(mix_shader_node.inputs[1], last_shader_socket)
+        diffuse_node = _ensure_paint_layer_node(node_tree, paint_layer.id, 'diffuse', 'ShaderNodeBsdfDiffuse')
+        mix_shader_node = _ensure_paint_layer_node(node_tree, paint_layer.id, 'mix', 'ShaderNodeMixShader')
 
-        node_tree.links.new(mix_shader_node.inputs[2], diffuse_node.outputs['BSDF'])
+        _ensure_link(node_tree, color_socket, diffuse_node.inputs['Color'])
+        _ensure_link(node_tree, hide_node.outputs['Value'], mix_shader_node.inputs['Fac'])
+        _ensure_link(node_tree, last_shader_socket, mix_shader_node.inputs[1])
+        _ensure_link(node_tree, diffuse_node.outputs['BSDF'], mix_shader_node.inputs[2])
 
         last_shader_socket = mix_shader_node.outputs['Shader']
 
-    output_node = node_tree.nodes.new('ShaderNodeOutputMaterial')
+    output_node = node_tree.nodes.get('Material Output', None)
+    if output_node is None:
+        output_node = node_tree.nodes.new('ShaderNodeOutputMaterial')
+        output_node.name = 'Material Output'
 
-    if last_shader_socket is not None:
-        node_tree.links.new(output_node.inputs['Surface'], last_shader_socket)
+    _ensure_link(node_tree, last_shader_socket, output_node.inputs['Surface'])
 
 
 def get_terrain_quad_size(size: float, resolution: int) -> float:
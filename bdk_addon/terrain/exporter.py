@@ -3,9 +3,8 @@ import math
 import os
 
 import bmesh
-import bpy
 import numpy as np
-from bpy.types import Object, Mesh, Image, Depsgraph
+from bpy.types import Object, Mesh, Depsgraph
 from typing import cast, Optional, Callable
 
 from mathutils import Vector, Matrix, Euler
@@ -15,6 +14,7 @@ from ..t3d.data import T3DObject
 from ..t3d.writer import T3DWriter
 from ..helpers import get_terrain_info, sanitize_name_for_unreal
 from ..io.g16 import write_bmp_g16
+from ..io.tga import write_tga
 
 
 def get_instance_offset(asset_instance: Object) -> Matrix:  # TODO: move to generic helpers
@@ -171,12 +171,11 @@ def export_terrain_deco_layers(terrain_info_object: Object, depsgraph: Depsgraph
         raise RuntimeError('Invalid object')
 
     for deco_layer_index, deco_layer in enumerate(terrain_info.deco_layers):
-        image = create_image_from_attribute(terrain_info_object, depsgraph, deco_layer.id)
-        # Write the image out to a file.
+        pixels = get_attribute_alpha_map_pixels(terrain_info_object, depsgraph, deco_layer.id)
+        # Write the image out to a file. The rows are stored bottom-to-top, like Blender's TARGA writer does, since the
+        # editor's TGA loader ignores the origin of the image.
         file_name = f'{sanitize_name_for_unreal(deco_layer.name)}.tga'
-        image.save(filepath=os.path.join(directory, file_name))
-        # Now remove the image data block.
-        bpy.data.images.remove(image)
+        write_tga(os.path.join(directory, file_name), pixels, use_rle=True, is_bottom_up=True)
 
         if progress_cb:
             progress_cb(deco_layer_index, len(terrain_info.deco_layers))
@@ -189,18 +188,20 @@ def export_terrain_paint_layers(terrain_info_object: Object, depsgraph: Depsgrap
         raise RuntimeError('Invalid object')
 
     for paint_layer_index, paint_layer in enumerate(terrain_info.paint_layers):
-        image = create_image_from_attribute(terrain_info_object, depsgraph, paint_layer.id)
-        # Write the image out to a file.
+        pixels = get_attribute_alpha_map_pixels(terrain_info_object, depsgraph, paint_layer.id)
+        # Write the image out to a file, with the rows stored bottom-to-top like Blender's TARGA writer does.
         file_name = f'{sanitize_name_for_unreal(paint_layer.name)}.tga'
-        image.save(filepath=os.path.join(directory, file_name))
-        # Now remove the image data block.
-        bpy.data.images.remove(image)
+        write_tga(os.path.join(directory, file_name), pixels, use_rle=True, is_bottom_up=True)
 
         if progress_cb:
             progress_cb(paint_layer_index, len(terrain_info.paint_layers))
 
 
-def create_image_from_attribute(terrain_info_object: Object, depsgraph: Depsgraph, attribute_name: str) -> Image:
+def get_attribute_alpha_map_pixels(terrain_info_object: Object, depsgraph: Depsgraph, attribute_name: str) -> np.ndarray:
+    """
+    Returns the pixels of the alpha map for a terrain attribute (e.g., a paint layer or a deco layer density map) in the
+    layout expected by `write_tga`: a middle-grey RGB layer, with the attribute values in the alpha channel.
+    """
     terrain_info = get_terrain_info(terrain_info_object)
 
     if terrain_info is None:
@@ -223,26 +224,11 @@ def create_image_from_attribute(terrain_info_object: Object, depsgraph: Depsgrap
 
     pixel_count = len(attribute.data)
 
-    image = bpy.data.images.new(name=attribute_name, width=terrain_info.x_size, height=terrain_info.y_size, alpha=True)
-    image.file_format = 'TARGA'
-
-    # Fill the data in with a middle-grey RGB layer and a 100% alpha.
-    data = np.ndarray(shape=(pixel_count, 4), dtype=float)
-    data[:] = (0.5, 0.5, 0.5, 1.0)
-
     if attribute.data_type in {'FLOAT_COLOR', 'BYTE_COLOR'}:
         # TODO: this whole thing is undesirable, we want all of our attributes to be floats.
-        rgb_colors = np.ndarray(shape=(pixel_count, 3), dtype=float)
-        rgb_colors[:] = [datum.color[:3] for datum in attribute.data]
-
-        # Reshape this to a 2D array based on the terrain size.
-        rgb_colors = rgb_colors.reshape((terrain_info.y_size, terrain_info.x_size, 3))
-
-        # Flip along the first axis and then the second axis.
-        rgb_colors = np.flip(rgb_colors, axis=0)
-
-        # Now set the shape back to a 1D array.
-        rgb_colors = rgb_colors.reshape((pixel_count, 3))
+        colors = np.empty(pixel_count * 4, dtype=np.float32)
+        attribute.data.foreach_get('color', colors)
+        rgb_colors = colors.reshape((pixel_count, 4))[:, :3]
 
         # Convert the RGB values to B/W values and assign those to the alpha channel of the data.
         '''
@@ -253,22 +239,17 @@ def create_image_from_attribute(terrain_info_object: Object, depsgraph: Depsgrap
         When we can finally just paint float values, this will be unnecessary.
         '''
         luma_coefficients = (0.2126, 0.7152, 0.0722)
-        data[:, 3] = np.dot(rgb_colors, luma_coefficients)
+        values = np.dot(rgb_colors, luma_coefficients)
     else:
-        # Reshape this to a 2D array based on the terrain size.
-        attribute_data = np.array([x.value for x in attribute.data], dtype=float)
-        attribute_data.resize((terrain_info.y_size, terrain_info.x_size))
-        attribute_data = np.flip(attribute_data, axis=0)
-
-        # Reshape this to a 2D array based on the terrain size.
-        # data = data.reshape((terrain_info.y_size, terrain_info.x_size, 4))
-
-        data[:, 3] = attribute_data.flatten()
+        values = np.empty(pixel_count, dtype=np.float32)
+        attribute.data.foreach_get('value', values)
 
-    # Assign the image pixels.
-    image.pixels[:] = data.flatten()
+    # The vertices are in the same order as the rows of the image, from top to bottom.
+    pixels = np.empty(shape=(terrain_info.y_size, terrain_info.x_size, 4), dtype=np.uint8)
+    pixels[..., :3] = 128
+    pixels[..., 3] = np.rint(np.clip(values, 0.0, 1.0) * 255.0).reshape((terrain_info.y_size, terrain_info.x_size))
 
-    return image
+    return pixels
 
 
 def get_terrain_heightmap(terrain_info_object: Object, depsgraph: Depsgraph) -> np.ndarray:
@@ -2,7 +2,7 @@ import os
 import uuid
 from collections import deque
 
-from typing import cast
+from typing import Optional, cast
 
 import bpy
 import mathutils
@@ -12,6 +12,7 @@ from bpy.types import Operator, Context, Mesh, Object, Event
 from bpy_extras.io_utils import ExportHelper
 
 from ..io.g16 import read_bmp_g16
+from ..io.tga import read_tga, to_rgba
 from ..data import move_direction_items
 from .context import get_selected_terrain_paint_layer_node
 from .layers import add_terrain_deco_layer
@@ -1185,6 +1186,21 @@ class BDK_OT_terrain_info_set_terrain_scale(Operator):
         return {'FINISHED'}
 
 
+def _read_tga_heightmap(filepath: str, x_size: int, y_size: int) -> Optional[numpy.ndarray]:
+    """
+    Reads the heightmap straight from the TGA file, which is much faster than loading it as an image. Returns None if
+    the file can't be read or doesn't match the terrain size, in which case it should be loaded as an image instead.
+    """
+    try:
+        pixels = read_tga(filepath)
+    except IOError:
+        return None
+    if pixels.shape[:2] != (y_size, x_size):
+        return None
+    # Get the red channel of each pixel in the same order as the image pixels (i.e., the bottom row first).
+    return (to_rgba(pixels)[::-1, :, 0] / 255.0).reshape((x_size, y_size))
+
+
 class BDK_OT_terrain_info_heightmap_import(Operator):
     bl_idname = 'bdk.terrain_info_heightmap_import'
     bl_label = 'Import Heightmap'
@@ -1211,25 +1227,29 @@ class BDK_OT_terrain_info_heightmap_import(Operator):
 
         match extension.lower():
             case '.tga' | '.png' | '.jpg' | '.jpeg':
-                # Load the image file temporarily so that we can read the data.
-                try:
-                    image = bpy.data.images.load(self.filepath)
-                except Exception as e:
-                    self.report({'ERROR'}, str(e))
-                    return {'CANCELLED'}
-
-                # Resize the image to the terrain size.
-                if image.size != (terrain_info.x_size, terrain_info.y_size):
-                    self.report({'WARNING'}, f'Image size ({image.size[0]}x{image.size[1]}) does not match terrain size ({terrain_info.x_size}x{terrain_info.y_size}). The image will be resized and may lose quality.')
-                    image.scale(terrain_info.x_size, terrain_info.y_size)
-
-                # Extract the heightmap data from the image.
-                data = numpy.array(image.pixels)
-
-                # Get the red channel of each pixel, then convert it to a 2D array.
-                heightmap = data[::4].reshape((terrain_info.x_size, terrain_info.y_size))
-
-                bpy.data.images.remove(image)
+                heightmap = None
+                if extension.lower() == '.tga':
+                    heightmap = _read_tga_heightmap(self.filepath, terrain_info.x_size, terrain_info.y_size)
+                if heightmap is None:
+                    # Load the image file temporarily so that we can read the data.
+                    try:
+                        image = bpy.data.images.load(self.filepath)
+                    except Exception as e:
+                        self.report({'ERROR'}, str(e))
+                        return {'CANCELLED'}
+
+                    # Resize the image to the terrain size.
+                    if image.size != (terrain_info.x_size, terrain_info.y_size):
+                        self.report({'WARNING'}, f'Image size ({image.size[0]}x{image.size[1]}) does not match terrain size ({terrain_info.x_size}x{terrain_info.y_size}). The image will be resized and may lose quality.')
+                        image.scale(terrain_info.x_size, terrain_info.y_size)
+
+                    # Extract the heightmap data from the image.
+                    data = numpy.array(image.pixels)
+
+                    # Get the red channel of each pixel, then convert it to a 2D array.
+                    heightmap = data[::4].reshape((terrain_info.x_size, terrain_info.y_size))
+
+                    bpy.data.images.remove(image)
             case '.bmp':
                 # Read the G16 BMP file.
                 try:
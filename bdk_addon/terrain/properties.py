@@ -1,5 +1,5 @@
 import math
-from typing import cast, List, Optional
+from typing import cast, List, Optional, Tuple
 
 import bpy.ops
 from bpy.types import PropertyGroup, Object, Context, Mesh, Material
@@ -9,6 +9,7 @@ from bpy.props import PointerProperty, BoolProperty, FloatProperty, CollectionPr
 from .kernel import ensure_deco_layers
 from ..helpers import is_bdk_material, is_bdk_static_mesh_actor, get_terrain_info
 from .builder import build_terrain_material
+from ..material.metadata import get_material_metadata
 
 
 def on_material_update(self, _: Context):
@@ -139,10 +140,14 @@ BDK_PG_terrain_layer_node.__annotations__["children"] = CollectionProperty(name=
                                                                            options={'HIDDEN'})
 
 
+def _get_paint_layer_material_size(paint_layer: 'BDK_PG_terrain_paint_layer') -> Tuple[int, int]:
+    material_metadata = get_material_metadata(paint_layer.material)
+    return material_metadata.size if material_metadata is not None else (0, 0)
+
+
 def terrain_paint_layer_texel_density_get(self: 'BDK_PG_terrain_paint_layer') -> float:
     terrain_info: 'BDK_PG_terrain_info' = get_terrain_info(self.terrain_info_object)
-    x = self.material.bdk.size_x if self.material else 0
-    y = self.material.bdk.size_y if self.material else 0
+    x, y = _get_paint_layer_material_size(self)
     pixels_per_quad = ((x / self.u_scale) * (y / self.v_scale))
     quad_area = pow(terrain_info.terrain_scale, 2)
     return abs(pixels_per_quad / quad_area)
@@ -156,8 +161,7 @@ def terrain_paint_layer_texel_density_set(self, texel_density: float):
     :return:
     """
     terrain_info: 'BDK_PG_terrain_info' = get_terrain_info(self.terrain_info_object)
-    x = self.material.bdk.size_x if self.material else 0
-    y = self.material.bdk.size_y if self.material else 0
+    x, y = _get_paint_layer_material_size(self)
     quad_area = pow(terrain_info.terrain_scale, 2)
     scale = math.sqrt((x * y) / (texel_density * quad_area))
     self.u_scale = scale
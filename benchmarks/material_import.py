@@ -0,0 +1,415 @@
+"""
+Benchmark & regression harness for material import.
+
+Generates a synthetic exports tree with materials of every type in the `MaterialTypeRegistry` (including deep chains of
+shaders, combiners, final blends and texture modifiers), then separately times:
+
+    parse       Parsing the .props.txt files.
+    resolve     Resolving every reference in the tree to its exported files.
+    load        Loading every material (and its dependencies) into a cold material cache.
+    build       Building the node trees of every material with the `MaterialBuilder`.
+
+The results (materials/sec, node count per material, peak memory etc.) are written as JSON. If a baseline (a results
+file from an earlier run) is given, the throughput of each phase is compared against it and the exit code is non-zero
+if any phase is slower than the baseline by more than the tolerance.
+
+Usage:
+    blender --background --factory-startup --python-exit-code 1 --python benchmarks/material_import.py -- \\
+        [--packages N] [--width N] [--depth N] [--passes N] [--props-index] [--output results.json] \\
+        [--baseline baseline.json] [--tolerance 0.1] [--directory <directory>]
+"""
+import json
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import typing
+from argparse import ArgumentParser
+from enum import Enum
+from pathlib import Path
+from typing import Dict, List
+
+# Import the addon from this repository rather than from the installed extensions.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import addon_utils
+import bpy
+import numpy as np
+
+from bdk_addon.bdk.repository.kernel import Manifest
+from bdk_addon.convert_props_txt_to_json import parse_props_txt_file
+from bdk_addon.data import UReference
+from bdk_addon.io.props_cache import close_props_cache, get_props_cache_path
+from bdk_addon.io.tga import write_tga
+from bdk_addon.material.cache import MaterialCache, get_material_references
+from bdk_addon.material.data import MaterialTypeRegistry, UColor, URotator
+from bdk_addon.material.importer import MaterialBuilder, _add_shader_from_outputs
+
+RESULTS_FORMAT_VERSION = 1
+
+# Types that do not need to reference other materials, which form the leaves of the material trees.
+LEAF_TYPE_NAMES = ('Texture', 'Cubemap', 'ConstantColor', 'FadeColor', 'VertexColor')
+IMAGE_TYPE_NAMES = ('Texture', 'Cubemap')
+IMAGE_SIZE = 16
+
+# Values for properties that would otherwise produce degenerate materials (e.g., division by zero).
+PROPERTY_VALUE_OVERRIDES = {
+    'UClamp': 256,
+    'VClamp': 256,
+    'UBits': 8,
+    'VBits': 8,
+    'Current': 0,
+    'SourceChannel': 0,
+    'AlphaRef': 0,
+    'SurfaceType': 0,
+}
+
+# References that are not followed when importing materials.
+IGNORED_REFERENCE_PROPERTY_NAMES = ('FallbackMaterial', 'DefaultMaterial')
+
+
+def write_random_tga(path: Path, width: int, height: int):
+    # Uncompressed 32-bit true-color image. The generator is seeded from `random` so that the corpus is deterministic.
+    rng = np.random.default_rng(random.getrandbits(32))
+    write_tga(path, rng.integers(0, 256, size=(height, width, 4), dtype=np.uint8))
+
+
+def is_reference_type(property_type) -> bool:
+    if property_type is UReference:
+        return True
+    return any(is_reference_type(arg) for arg in typing.get_args(property_type))
+
+
+def format_value(property_name: str, property_type, references: List[UReference]) -> str:
+    """
+    Returns a random value for the property, formatted as it would be in a .props.txt file.
+    """
+    if property_name in PROPERTY_VALUE_OVERRIDES:
+        return str(PROPERTY_VALUE_OVERRIDES[property_name])
+    if typing.get_origin(property_type) is list:
+        lines = [f'{property_name}[{index}] = {reference}' for index, reference in enumerate(references)]
+        return '\n'.join(['', '{'] + [f'    {line}' for line in lines] + ['}'])
+    if is_reference_type(property_type):
+        return str(references[0]) if references else 'None'
+    args = typing.get_args(property_type)
+    if len(args) == 2 and args[1] is type(None):
+        property_type = args[0]
+    if isinstance(property_type, type) and issubclass(property_type, Enum):
+        members = list(property_type)
+        index = random.randrange(len(members))
+        return f'{members[index].name} ({index})'
+    if property_type is bool:
+        return random.choice(('true', 'false'))
+    if property_type is int:
+        return str(random.randint(0, 4))
+    if property_type is float:
+        return f'{random.uniform(0.25, 2.0):.6f}'
+    if property_type is UColor:
+        return '{ ' + ', '.join(f'{channel}={random.randint(0, 255)}' for channel in 'BGRA') + ' }'
+    if property_type is URotator:
+        return '{ ' + ', '.join(f'{axis}={random.randint(-32768, 32767)}' for axis in ('Pitch', 'Yaw', 'Roll')) + ' }'
+    return 'None'
+
+
+def write_material(package_directory: Path, reference: UReference, primary_references: List[UReference],
+                   leaf_references: List[UReference]):
+    """
+    Writes the .props.txt file for a material. The first reference property points to one of the primary references
+    (the previous level of the tree), and the rest point to leaves, so that the trees are deep without growing
+    exponentially.
+    """
+    material_type = MaterialTypeRegistry.get_type_from_string(reference.type_name)
+    lines = []
+    is_primary = True
+    for name, property_type in typing.get_type_hints(material_type).items():
+        if name == 'Reference' or name in IGNORED_REFERENCE_PROPERTY_NAMES:
+            continue
+        references = []
+        if is_reference_type(property_type):
+            candidates = primary_references if is_primary else leaf_references
+            if candidates:
+                count = 2 if typing.get_origin(property_type) is list else 1
+                references = random.sample(candidates, min(count, len(candidates)))
+                is_primary = False
+        value = format_value(name, property_type, references)
+        if typing.get_origin(property_type) is list:
+            # Arrays are written with their length, e.g., `Materials[2] =` followed by a block of the items.
+            lines.append(f'{name}[{len(references)}] ={value}')
+        else:
+            lines.append(f'{name} = {value}')
+
+    type_directory = package_directory / reference.type_name
+    type_directory.mkdir(parents=True, exist_ok=True)
+    with open(type_directory / f'{reference.object_name}.props.txt', 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    if reference.type_name in IMAGE_TYPE_NAMES:
+        write_random_tga(type_directory / f'{reference.object_name}.tga', IMAGE_SIZE, IMAGE_SIZE)
+
+
+def generate_exports(root_directory: Path, package_count: int, width: int, depth: int) -> List[UReference]:
+    """
+    Generates a repository cache directory (a manifest and an exports tree) with synthetic materials.
+    Returns the references to all the generated materials.
+    """
+    random.seed(0)
+    manifest = Manifest(str(root_directory / 'manifest.json'))
+    non_leaf_type_names = [type_name for type_name in MaterialTypeRegistry._material_type_map.keys()
+                           if type_name not in LEAF_TYPE_NAMES]
+    all_references = []
+    for package_index in range(package_count):
+        package_name = f'BenchmarkPackage{package_index}'
+        package_path = f'Textures/{package_name}.utx'
+        manifest.mark_package_as_exported(package_path)
+        package_directory = root_directory / 'exports' / 'Textures' / package_name
+
+        leaf_references = []
+        for type_name in LEAF_TYPE_NAMES:
+            for index in range(width):
+                reference = UReference.intern(package_name, f'{type_name}{index}', type_name)
+                write_material(package_directory, reference, [], [])
+                leaf_references.append(reference)
+        all_references.extend(leaf_references)
+
+        previous_level_references = leaf_references
+        for level in range(1, depth + 1):
+            level_references = []
+            for type_name in non_leaf_type_names:
+                for index in range(width):
+                    reference = UReference.intern(package_name, f'{type_name}L{level}N{index}', type_name)
+                    write_material(package_directory, reference, previous_level_references, leaf_references)
+                    level_references.append(reference)
+            all_references.extend(level_references)
+            previous_level_references = level_references
+    manifest.write()
+    return all_references
+
+
+def build_props_indices(root_directory: Path):
+    script_path = Path(__file__).resolve().parent.parent / 'bdk_addon' / 'bin' / 'props_index.py'
+    for package_directory in (root_directory / 'exports' / 'Textures').iterdir():
+        subprocess.run([sys.executable, str(script_path), str(package_directory)], check=True, capture_output=True)
+
+
+def reset_props_cache(root_directory: Path):
+    close_props_cache(root_directory)
+    props_cache_path = get_props_cache_path(root_directory)
+    for path in (props_cache_path, Path(f'{props_cache_path}-wal'), Path(f'{props_cache_path}-shm')):
+        if path.exists():
+            path.unlink()
+
+
+class PhaseResult:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.durations: List[float] = []
+        self.peak_memory = 0
+        self.extra: Dict[str, typing.Any] = dict()
+
+    def to_dict(self) -> dict:
+        duration = min(self.durations)
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'seconds': duration,
+            'materials_per_second': self.count / duration if duration > 0 else 0.0,
+            'peak_python_memory_bytes': self.peak_memory,
+            **self.extra,
+        }
+
+
+def run_phase(passes: int, setup, function) -> PhaseResult:
+    """
+    Times the function over the given number of passes (keeping the fastest), then runs it once more while tracing the
+    peak memory allocated by Python. `setup` is run (untimed) before every pass and returns the argument to the
+    function. The function returns the number of items processed and the number of errors.
+    """
+    result = PhaseResult()
+    for _ in range(passes):
+        argument = setup()
+        start_time = time.perf_counter()
+        result.count, result.errors = function(argument)
+        result.durations.append(time.perf_counter() - start_time)
+    argument = setup()
+    tracemalloc.start()
+    function(argument)
+    result.peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result
+
+
+def main(args):
+    # The material builder depends on the properties registered by the addon (e.g., the build hashes of node groups).
+    addon_utils.enable('bdk_addon', default_set=True, persistent=False)
+
+    if args.directory is not None:
+        root_directory = Path(args.directory).resolve()
+        if root_directory.exists():
+            shutil.rmtree(root_directory)
+        root_directory.mkdir(parents=True)
+    else:
+        root_directory = Path(tempfile.mkdtemp(prefix='bdk_material_benchmark_'))
+
+    try:
+        print(f'Generating materials in {root_directory}...')
+        references = generate_exports(root_directory, args.packages, args.width, args.depth)
+        if args.props_index:
+            build_props_indices(root_directory)
+        print(f'Generated {len(references)} materials')
+
+        paths = [root_directory / 'exports' / 'Textures' / reference.package_name / reference.type_name /
+                 f'{reference.object_name}.props.txt' for reference in references]
+
+        results = dict()
+
+        def parse(_):
+            for path in paths:
+                parse_props_txt_file(str(path))
+            return len(paths), 0
+
+        results['parse'] = run_phase(args.passes, lambda: None, parse)
+
+        def create_material_cache() -> MaterialCache:
+            reset_props_cache(root_directory)
+            return MaterialCache(root_directory)
+
+        # Every reference held by every material, as they would be followed during import.
+        material_cache = create_material_cache()
+        material_cache.prefetch(references)
+        held_references = list(references)
+        for reference in references:
+            held_references.extend(get_material_references(material_cache.load_material(reference)))
+
+        def resolve(cache: MaterialCache):
+            errors = 0
+            for reference in held_references:
+                if reference.type_name in IMAGE_TYPE_NAMES:
+                    path = cache.resolve_image_path_for_reference(reference)
+                else:
+                    path = cache.resolve_path_for_reference(reference)
+                if path is None:
+                    errors += 1
+            return len(held_references), errors
+
+        results['resolve'] = run_phase(args.passes, create_material_cache, resolve)
+
+        def load(cache: MaterialCache):
+            cache.prefetch(references)
+            errors = sum(1 for reference in references if cache.load_material(reference) is None)
+            return len(references), errors
+
+        results['load'] = run_phase(args.passes, create_material_cache, load)
+
+        # Keep the loaded materials so that the build phase only measures the building of the node trees.
+        material_cache = create_material_cache()
+        material_cache.prefetch(references)
+        node_counts: List[int] = []
+        error_counts: Dict[str, int] = dict()
+
+        def remove_materials():
+            for material in [material for material in bpy.data.materials if material.name.startswith('Benchmark.')]:
+                bpy.data.materials.remove(material)
+
+        def build(_):
+            node_counts.clear()
+            error_counts.clear()
+            for reference in references:
+                material_data = bpy.data.materials.new(f'Benchmark.{reference.object_name}')
+                material_data.use_nodes = True
+                node_tree = material_data.node_tree
+                node_tree.nodes.clear()
+                tex_coord_node = node_tree.nodes.new('ShaderNodeTexCoord')
+                try:
+                    material_builder = MaterialBuilder([material_cache], node_tree)
+                    outputs = material_builder.build(material_cache.load_material(reference),
+                                                     uv_source_socket=tex_coord_node.outputs['UV'])
+                    if outputs is not None:
+                        shader_socket = _add_shader_from_outputs(node_tree, outputs)
+                        output_node = node_tree.nodes.new('ShaderNodeOutputMaterial')
+                        node_tree.links.new(output_node.inputs['Surface'], shader_socket)
+                except Exception:
+                    error_counts[reference.type_name] = error_counts.get(reference.type_name, 0) + 1
+                node_counts.append(len(node_tree.nodes))
+            return len(references), sum(error_counts.values())
+
+        def setup_build():
+            remove_materials()
+            return None
+
+        results['build'] = run_phase(args.passes, setup_build, build)
+        results['build'].extra = {
+            'nodes_per_material': sum(node_counts) / len(node_counts) if node_counts else 0.0,
+            'max_nodes_per_material': max(node_counts, default=0),
+            'errors_by_type': dict(sorted(error_counts.items())),
+        }
+        remove_materials()
+    finally:
+        close_props_cache(root_directory)
+        if args.directory is None:
+            shutil.rmtree(root_directory, ignore_errors=True)
+
+    type_counts: Dict[str, int] = dict()
+    for reference in references:
+        type_counts[reference.type_name] = type_counts.get(reference.type_name, 0) + 1
+
+    report = {
+        'version': RESULTS_FORMAT_VERSION,
+        'blender_version': bpy.app.version_string,
+        'parameters': {
+            'packages': args.packages,
+            'width': args.width,
+            'depth': args.depth,
+            'passes': args.passes,
+            'props_index': args.props_index,
+        },
+        'materials': len(references),
+        'materials_by_type': type_counts,
+        'phases': {name: result.to_dict() for name, result in results.items()},
+        # The maximum resident set size of the process, in bytes (Linux reports this in kilobytes).
+        'peak_resident_memory_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            f.write(text)
+
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        has_regressed = False
+        for name, phase in report['phases'].items():
+            baseline_phase = baseline.get('phases', {}).get(name, None)
+            if baseline_phase is None or baseline_phase['materials_per_second'] == 0:
+                continue
+            ratio = phase['materials_per_second'] / baseline_phase['materials_per_second']
+            is_regression = ratio < 1.0 - args.tolerance
+            has_regressed = has_regressed or is_regression
+            print(f'{name:<8} {phase["materials_per_second"]:>12.0f} materials/sec '
+                  f'({ratio:.2f}x baseline){" REGRESSION" if is_regression else ""}')
+        if has_regressed:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('--packages', type=int, required=False, default=4)
+    parser.add_argument('--width', type=int, required=False, default=2,
+                        help='The number of materials of each type at each level of the material trees')
+    parser.add_argument('--depth', type=int, required=False, default=6,
+                        help='The number of levels of the material trees above the leaves')
+    parser.add_argument('--passes', type=int, required=False, default=3)
+    parser.add_argument('--props-index', action='store_true', default=False,
+                        help='Build the props index of each package, as is done after exporting a package')
+    parser.add_argument('--directory', required=False, default=None,
+                        help='The directory to generate the materials in (deleted first), otherwise a temporary one')
+    parser.add_argument('--output', required=False, default=None)
+    parser.add_argument('--baseline', required=False, default=None)
+    parser.add_argument('--tolerance', type=float, required=False, default=0.1)
+    main(parser.parse_args(sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else sys.argv[1:]))
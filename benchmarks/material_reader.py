@@ -0,0 +1,119 @@
+"""
+Micro-benchmark for the material reader.
+
+Measures the throughput of `read_material` (parsing & decoding) and of decoding alone over every material in an
+exports directory (e.g., a repository's `exports` cache directory), as well as the memory held by the decoded
+materials.
+
+Usage:
+    blender --background --factory-startup --python benchmarks/material_reader.py -- <exports_directory> [--passes N]
+"""
+import enum
+import sys
+import time
+import tracemalloc
+import typing
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Any
+
+# Import the addon from this repository rather than from the installed extensions.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bdk_addon.convert_props_txt_to_json import parse_props_txt_file
+from bdk_addon.data import UReference, URotator, UColor
+from bdk_addon.material.data import MaterialTypeRegistry
+from bdk_addon.material.reader import read_material, read_material_from_properties
+
+
+# A verbatim copy of `transform_value` from `material/reader.py` as it was before the decoders were compiled per
+# material type, so that the baseline does not change along with the reader.
+def transform_value(property_type: type, value: Any) -> typing.Optional[Any]:
+    if property_type == int:
+        return int(value)
+    elif property_type == bool:
+        return bool(value)
+    elif property_type == float:
+        return float(value)
+    elif property_type == str:
+        return value
+    elif property_type.__class__ == enum.EnumMeta:
+        return property_type[str(value).split(' ')[0]]
+    elif property_type.__class__ == typing._UnionGenericAlias and len(property_type.__args__) == 2 and \
+            property_type.__args__[1] == type(None):
+        if value is None:
+            return None
+        return transform_value(property_type.__args__[0], value)
+    elif property_type == URotator:
+        rotator = URotator()
+        rotator.Roll = value['Roll']
+        rotator.Pitch = value['Pitch']
+        rotator.Yaw = value['Yaw']
+        return rotator
+    elif property_type == UReference:
+        return UReference.from_string(value)
+    elif property_type == UColor:
+        return UColor(r=value['R'], g=value['G'], b=value['B'], a=value['A'])
+    else:
+        raise RuntimeError(f'Unhandled type: {property_type}')
+
+
+def decode_uncompiled(reference: UReference, properties: dict):
+    """
+    Decodes the material by resolving the type hints & value conversions for every property, as was done before the
+    decoders were compiled per material type. This is used as the baseline.
+    """
+    material_type = MaterialTypeRegistry.get_type_from_string(reference.type_name)
+    material = material_type(reference)
+    type_hints = typing.get_type_hints(material_type)
+    for name, value in properties.items():
+        try:
+            setattr(material, name, transform_value(type_hints[name], value))
+        except KeyError:
+            continue
+    return material
+
+
+def measure(label: str, function, items, passes: int):
+    start_time = time.perf_counter()
+    for _ in range(passes):
+        for item in items:
+            function(*item)
+    duration = time.perf_counter() - start_time
+    count = len(items) * passes
+    print(f'{label:<24} {count / duration:>12.0f} materials/sec ({count} materials in {duration:.3f}s)')
+
+
+def main(args):
+    exports_directory = Path(args.exports_directory).resolve()
+
+    paths = []
+    for type_name in MaterialTypeRegistry._material_type_map.keys():
+        paths.extend(exports_directory.glob(f'**/{type_name}/*.props.txt'))
+
+    if len(paths) == 0:
+        print(f'No materials found in {exports_directory}')
+        return
+
+    print(f'Parsing {len(paths)} materials...')
+    parsed = [(UReference.from_path(path), parse_props_txt_file(str(path))) for path in paths]
+
+    measure('read_material', lambda path: read_material(str(path)), [(path,) for path in paths], args.passes)
+    measure('decode (uncompiled)', decode_uncompiled, parsed, args.passes)
+    measure('decode (compiled)', read_material_from_properties, parsed, args.passes)
+
+    # Measure the memory held by all the materials (and their references) at once, as they would be in the cache.
+    tracemalloc.start()
+    start_size = tracemalloc.get_traced_memory()[0]
+    materials = [read_material(str(path)) for path in paths]
+    size = tracemalloc.get_traced_memory()[0] - start_size
+    tracemalloc.stop()
+    print(f'{"memory":<24} {size / len(materials):>12.0f} bytes/material ({size / 1024 / 1024:.1f} MiB for '
+          f'{len(materials)} materials)')
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('exports_directory')
+    parser.add_argument('--passes', type=int, required=False, default=3)
+    main(parser.parse_args(sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else sys.argv[1:]))
@@ -0,0 +1,305 @@
+"""
+Differential check & micro-benchmark for the .props.txt parser.
+
+Compares the output of the current parser with that of the parser as it was before it was rewritten to parse in a
+single pass (embedded below, verbatim) over a generated corpus and, optionally, over every .props.txt file in an
+exports directory (e.g., a repository's `exports` cache directory). Any difference is reported, and the script exits
+with a non-zero status if there are any. The throughput of both parsers is then measured over the same inputs.
+
+This does not depend on Blender:
+
+    python benchmarks/props_txt_parser.py [<exports_directory>] [--count N] [--passes N]
+"""
+import random
+import re
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import List, Tuple
+
+# Import the parser directly from the addon directory so that we don't import the addon package (and therefore bpy).
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'bdk_addon'))
+
+import convert_props_txt_to_json as current_parser
+
+
+# The parser before it was rewritten, copied verbatim from `convert_props_txt_to_json.py`.
+
+def get_line_key(line):
+    """Get key from line or return None if not found.
+    EG from 'VectorParameterValues[1] = \n' return 'VectorParameterValues[1]',
+    from 'ParameterName = Emissive Color' return 'ParameterName'
+    """
+    res = re.search(r"(?P<key>[a-zA-Z\d\[\]\s]+)=", line)
+    if not res:
+        return None
+    else:
+        return res.group("key").strip()
+
+
+def get_text_until_closing_bracket(lines, lines_starting_index):
+    """
+    Get text from first opening bracket to corresponding closing bracket, return line numbers for this text block
+    """
+    text = ""
+    bracket_detected = False
+    bracket_counter = 0
+    lines_to_skip = []
+
+    for i, line in enumerate(lines):
+        for char in line:
+            if char == "{":
+                bracket_detected = True
+                bracket_counter += 1
+            if char == "}":
+                bracket_counter -= 1
+            text += char
+            if bracket_detected and bracket_counter == 0:
+                lines_to_skip.append(lines_starting_index + i)
+                return text, lines_to_skip
+        lines_to_skip.append(lines_starting_index + i)
+        text += "\n"
+    raise ValueError("Bracket not closed")
+
+
+def strip_brackets_from_string_once_if_needed (string):
+    """
+    Convert string '  { add: {badad: 1313}   }  ' to 'add: {badad: 1313}',
+    raise error if string is '  { add: {badad: 1313}  ' (missing opening or closing bracket)
+    """
+    new_string = string.strip()
+    opening_bracket = False
+    closing_bracket = False
+
+    # Forward pass
+    for i, char in enumerate(new_string):
+        if char == "{":
+            opening_bracket = True
+            new_string = new_string[i + 1:]
+            break
+    # Backward pass
+    for i, char in enumerate(new_string[::-1]):
+        if char == "}":
+            closing_bracket = True
+            new_string = new_string[:len(new_string) - i - 1]
+            break
+    if not closing_bracket and opening_bracket:
+        raise ValueError("Closing bracket missing", string)
+    if not opening_bracket and closing_bracket:
+        raise ValueError("Opening bracket missing", string)
+    else:
+        return new_string
+
+
+def boolify_nullify(s):
+    if s.lower() in ['true']:
+        return True
+    if s.lower() in ['false']:
+        return False
+    if s.lower() in ['none', 'null']:
+        return None
+    raise ValueError(f"Couldn't boolify-nullify {s}")
+
+
+def auto_convert(s):
+    for fn in (boolify_nullify, int, float):
+        try:
+            return fn(s)
+        except ValueError:
+            pass
+    return s
+
+
+def remove_index_from_key(string):
+    return re.search(r"(?P<key>[a-zA-Z\d\s]+)", string).group("key")
+
+
+def parse_inline_value(string):
+    """
+    Parse inline nested structure string, eg, '{ Name=None }' or '{ R=1, G=1, B=1, A=0 }'
+    """
+    if not string.strip():
+        return {}
+    parts = string.split(",")
+    is_object = any(map(lambda x: "=" in x, parts))
+    if is_object:
+        data = {}
+        for part in parts:
+            key, value = part.split("=")
+            key = key.strip()
+            data[key] = auto_convert(value.strip())
+    else:
+        data = []
+        for part in parts:
+            data.append(auto_convert(part.strip()))
+    return data
+
+
+def parse_props_txt_file_content(content):
+    """
+    Parse content similar to
+    '''
+    VectorParameterValues[1] =
+    {
+        VectorParameterValues[0] =
+        {
+            ParameterName = Emissive Color
+            ParameterValue = { R=1, G=1, B=1, A=0 }
+            ParameterInfo = { Name=None }
+        }
+    }
+    Parent = Material3'/EternalCrusade/Content/Materials/Templates/M_Template.M_Template'
+    BasePropertyOverrides =
+    {
+        bOverride_BlendMode = false
+        BlendMode = BLEND_Opaque (0)
+        bOverride_TwoSided = false
+        TwoSided = false
+    }
+    FlattenedTexture = None
+    '''
+    """
+    data = {}
+    lines = content.split("\n")
+
+    lines_to_skip = []
+    for i, line in enumerate(lines):
+        if i in lines_to_skip:
+            continue
+        key = get_line_key(line)
+        if not key:
+            continue
+        value_raw = "=".join(line.split("=")[1:]).strip()
+
+        if not value_raw:
+            # Is nested structure, start from next line
+            content, t_lines_to_skip = get_text_until_closing_bracket(lines[i + 1:], i + 1)
+            # Don't iterate through lines that are inside nested block
+            lines_to_skip += t_lines_to_skip
+
+            content = strip_brackets_from_string_once_if_needed(content)
+            value = parse_props_txt_file_content(content)
+        else:
+            if "{" in value_raw:
+                # Still nested structure, but 1-line
+                content = strip_brackets_from_string_once_if_needed(value_raw)
+                value = parse_inline_value(content)
+            else:
+                value = auto_convert(value_raw)
+        data[key] = value
+
+    return data
+
+
+KEYS = ['Material', 'Material1', 'Material2', 'Mask', 'Diffuse', 'Opacity', 'UClamp', 'VClamp', 'bMasked',
+        'FallbackMaterial', 'Color', 'Rotation', 'Name', 'Key Frames', 'Values[0]', 'Values[1]', 'Scale']
+SCALARS = ['0', '1', '-2', '256', '0.5', '-1.250000', '1e3', 'true', 'False', 'None', 'null', 'TC_Default (0)',
+           "Texture'Package.Group.Name'", "Shader'Some Package.Name-1'", 'CO_Use_Color_From_Material1 (0)', '']
+
+
+def generate_value(depth: int) -> List[str]:
+    """
+    Returns the lines of a random property value, which may be a scalar, an inline structure or a nested block.
+    """
+    kind = random.random()
+    if kind < 0.15 and depth < 3:
+        lines = ['{']
+        for _ in range(random.randint(0, 4)):
+            lines.extend(generate_property(depth + 1))
+        lines.append('}')
+        return lines
+    elif kind < 0.35:
+        if random.random() < 0.5:
+            parts = [f'{random.choice("RGBAXYZ")}={random.choice(SCALARS[:8])}' for _ in range(random.randint(1, 4))]
+        else:
+            parts = [random.choice(SCALARS[:8]) for _ in range(random.randint(0, 3))]
+        return [random.choice(['{ ', '{']) + random.choice([', ', ',']).join(parts) + random.choice([' }', '}'])]
+    return [random.choice(SCALARS)]
+
+
+def generate_property(depth: int) -> List[str]:
+    indent = '    ' * depth
+    key = random.choice(KEYS)
+    value_lines = generate_value(depth)
+    if value_lines[0] == '{':
+        # Nested blocks start on the line after the key, with the closing bracket at the indentation of the key.
+        lines = [f'{indent}{key} =', f'{indent}{{']
+        lines.extend(value_lines[1:-1])
+        lines.append(f'{indent}}}')
+        return lines
+    separator = random.choice([' = ', '=', ' =  '])
+    return [f'{indent}{key}{separator}{value_lines[0]}']
+
+
+def generate_content() -> str:
+    lines = []
+    for _ in range(random.randint(0, 12)):
+        if random.random() < 0.1:
+            # Blank lines & lines without a key are skipped.
+            lines.append(random.choice(['', '    ', '// comment', '}', '{']))
+        lines.extend(generate_property(0))
+    content = '\n'.join(lines)
+    if random.random() < 0.5:
+        content += '\n'
+    if random.random() < 0.05:
+        # Truncate the content to exercise the error handling of unclosed blocks.
+        content = content[:random.randint(0, len(content))]
+    return content
+
+
+def parse(function, content: str):
+    """
+    Returns the result of parsing the content, or the type of the error that was raised.
+    """
+    try:
+        return function(content)
+    except Exception as e:
+        return type(e)
+
+
+def measure(label: str, function, contents: List[str], passes: int):
+    start_time = time.perf_counter()
+    for _ in range(passes):
+        for content in contents:
+            parse(function, content)
+    duration = time.perf_counter() - start_time
+    size = sum(map(len, contents)) * passes
+    print(f'{label:<24} {size / duration / 1024 / 1024:>12.2f} MiB/sec ({len(contents) * passes} files in '
+          f'{duration:.3f}s)')
+
+
+def main(args):
+    random.seed(0)
+    corpus: List[Tuple[str, str]] = [(f'<generated {index}>', generate_content()) for index in range(args.count)]
+
+    if args.exports_directory is not None:
+        for path in Path(args.exports_directory).resolve().glob('**/*.props.txt'):
+            with open(path, 'r') as f:
+                corpus.append((str(path), f.read()))
+
+    print(f'Comparing {len(corpus)} inputs...')
+    difference_count = 0
+    for name, content in corpus:
+        expected = parse(parse_props_txt_file_content, content)
+        actual = parse(current_parser.parse_props_txt_file_content, content)
+        if expected != actual:
+            difference_count += 1
+            if difference_count <= 10:
+                print(f'Difference in {name}:\n{content}\nexpected: {expected!r}\nactual:   {actual!r}\n')
+    print(f'{difference_count} differences')
+
+    contents = [content for _, content in corpus]
+    measure('baseline', parse_props_txt_file_content, contents, args.passes)
+    measure('current', current_parser.parse_props_txt_file_content, contents, args.passes)
+
+    if difference_count > 0:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('exports_directory', nargs='?', default=None)
+    parser.add_argument('--count', type=int, required=False, default=20000)
+    parser.add_argument('--passes', type=int, required=False, default=3)
+    main(parser.parse_args(sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else sys.argv[1:]))
@@ -0,0 +1,98 @@
+"""
+Micro-benchmark for parsing package references.
+
+Measures the throughput of `UReference.from_string` over all the references in a T3D map (or over a synthetic set of
+references shaped like one, if no map is given): without the memo cache, with a cold memo cache and with a warm one.
+
+Usage:
+    blender --background --factory-startup --python benchmarks/reference_parsing.py -- [<t3d_file>] [--passes N]
+"""
+import random
+import re
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Optional
+
+# Import the addon from this repository rather than from the installed extensions.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bdk_addon import data
+from bdk_addon.data import UReference
+
+
+# A verbatim copy of `UReference.from_string` from `data.py` as it was before the fast path & memo cache were added, so
+# that the baseline does not change along with the parser.
+def from_string(string: str) -> Optional['UReference']:
+    if string == 'None' or string == '':
+        return None
+
+    # Test for a type-qualified reference (e.g. StaticMesh'MyPackage.MyGroup.MyName').
+    type_name = None
+    group_name = None
+
+    pattern = r'(\w+)\'([\w\.\d\-\_ ]+)\''
+    match = re.match(pattern, string)
+
+    if match is not None:
+        # Type-qualified reference match succeeded.
+        type_name = match.group(1)
+        object_path = match.group(2)
+    else:
+        # Type-qualified reference match failed, try to parse the incoming string as an object path.
+        object_path = string
+
+    reference_pattern = r'([\w\d\-\_ ]+)'
+    values = re.findall(reference_pattern, object_path)
+    package_name = values[0]
+    object_name = values[-1]
+
+    return UReference.intern(package_name, object_name, type_name=type_name, group_name=group_name)
+
+
+def read_t3d_references(path: Path):
+    with open(path, 'r', errors='ignore') as f:
+        contents = f.read()
+    return re.findall(r'\w+\'[^\'\n]+\'', contents)
+
+
+def generate_references(count: int):
+    # Maps reference a relatively small number of distinct objects many times over.
+    random.seed(0)
+    type_names = ['StaticMesh', 'Texture', 'Shader', 'Combiner', 'FinalBlend', 'Sound']
+    return [f'{random.choice(type_names)}\'Package{random.randint(0, 50)}.Group.Object{random.randint(0, 60)}\''
+            for _ in range(count)]
+
+
+def measure(label: str, function, references, passes: int, before_pass=None):
+    start_time = time.perf_counter()
+    for _ in range(passes):
+        if before_pass is not None:
+            before_pass()
+        for reference in references:
+            function(reference)
+    duration = time.perf_counter() - start_time
+    count = len(references) * passes
+    print(f'{label:<24} {count / duration:>12.0f} references/sec ({count} references in {duration:.3f}s)')
+
+
+def main(args):
+    if args.t3d_file is not None:
+        references = read_t3d_references(Path(args.t3d_file))
+    else:
+        references = generate_references(40000)
+
+    print(f'{len(references)} references ({len(set(references))} distinct)')
+
+    measure('baseline', from_string, references, args.passes)
+    measure('cold memo', UReference.from_string, references, args.passes,
+            before_pass=data._parse_reference_string.cache_clear)
+    measure('warm memo', UReference.from_string, references, args.passes)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('t3d_file', nargs='?', default=None)
+    parser.add_argument('--passes', type=int, required=False, default=5)
+    main(parser.parse_args(sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else sys.argv[1:]))